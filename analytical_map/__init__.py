@@ -1,5 +1,8 @@
 from .cocoAnalyzer import *
 from .cocoEvaluator import *
 from .cocoCalculator import *
+from .cocoComparator import *
+from .cocoStreamEvaluator import *
+from .cocoChunkEvaluator import *
 from .cocoVisualizer import *
 from .params import *
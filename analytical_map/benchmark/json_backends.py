@@ -0,0 +1,173 @@
+import io
+import os
+import json
+import time
+import argparse
+import contextlib
+
+from analytical_map.params import COCOParams
+from analytical_map.tools import json_backend
+from analytical_map.tools.dump_json import dump_json_stream, open_json
+from analytical_map.tools.load_json import load_ground_truth, load_detections, load_middle_file_json
+from analytical_map.benchmark.run import environment
+from analytical_map.benchmark.synthetic import write_synthetic_coco, add_synthetic_arguments, synthetic_kwargs
+
+TASKS = ['load_gt', 'load_dt', 'load_middle_file', 'load_final_results',
+         'dump_middle_file', 'dump_final_results']
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                           'example', 'data', 'coco')
+
+
+def prepare(data_dir: str, result_dir: str) -> dict:
+    """Evaluate and calculate a dataset once, so that its middle file and final results can be loaded and dumped.
+
+    Args:
+        data_dir (str): Directory of gt.json and dt.json
+        result_dir (str): Directory of the middle file and final results
+
+    Returns:
+        dict: Paths of 'gt', 'dt', 'middle_file' and 'final_results'
+    """
+    from analytical_map import COCOEvaluator, COCOCalculator
+
+    files = {'gt': os.path.join(data_dir, 'gt.json'), 'dt': os.path.join(data_dir, 'dt.json'),
+             'middle_file': os.path.join(result_dir, 'middle_file.json'),
+             'final_results': os.path.join(result_dir, 'final_results.json')}
+    if not os.path.isfile(files['final_results']):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cocoEval = COCOEvaluator(
+                files['gt'], files['dt'], result_dir, COCOParams())
+            cocoEval.evaluate()
+            cocoEval.dump_middle_file_json('middle_file.json')
+            cocoCalc = COCOCalculator(
+                files['middle_file'], result_dir, data_dir, COCOParams())
+            cocoCalc.calculate()
+            cocoCalc.dump_final_results_json('final_results.json')
+    return files
+
+
+def best_time(func, repeat: int) -> float:
+    # pycocotools prints while building indexes.
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            tic = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - tic)
+    return round(min(times), 4)
+
+
+def run_backend(backend: str, files: dict, tmp_dir: str, repeat: int = 3) -> dict:
+    """Time loading and dumping the files of a dataset with a backend.
+
+    Documents are dumped by dump_json_stream with indents, like the middle file and final results.
+
+    Args:
+        backend (str): Name of the JSON backend
+        files (dict): Paths of 'gt', 'dt', 'middle_file' and 'final_results'
+        tmp_dir (str): Directory of dumped files
+        repeat (int, optional): Number of runs of each task, and the fastest one is reported. Defaults to 3.
+
+    Returns:
+        dict: Seconds of each task
+    """
+    json_backend.set_backend(backend)
+
+    def load(path):
+        with open_json(path) as fr:
+            return json_backend.load(fr)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cocoGt = load_ground_truth(files['gt'])
+    middle = load(files['middle_file'])
+    final = load(files['final_results'])
+    score_thresh = COCOParams().score_thresh
+
+    return {'load_gt': best_time(lambda: load_ground_truth(files['gt']), repeat),
+            'load_dt': best_time(lambda: load_detections(cocoGt, files['dt'], score_thresh), repeat),
+            'load_middle_file': best_time(lambda: load_middle_file_json(files['middle_file']), repeat),
+            'load_final_results': best_time(lambda: load(files['final_results']), repeat),
+            'dump_middle_file': best_time(lambda: dump_json_stream(middle, os.path.join(tmp_dir, 'middle_file.json')), repeat),
+            'dump_final_results': best_time(lambda: dump_json_stream(final, os.path.join(tmp_dir, 'final_results.json')), repeat)}
+
+
+def argparser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark loading and dumping JSON with each installed backend on the example and a synthetic dataset')
+
+    parser.add_argument('work_dir',
+                        help='directory of the synthetic dataset (synthetic/data/) and results of both datasets')
+    parser.add_argument('--backends', nargs='+', choices=json_backend.BACKENDS, default=None,
+                        help='backends to compare, defaults to all installed ones')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of runs of each task, the fastest one is reported')
+    parser.add_argument('--example_dir', default=EXAMPLE_DIR,
+                        help='directory of gt.json and dt.json of the example, skipped if it does not exist')
+    parser.add_argument('--reuse_data', action='store_true',
+                        help='use the dataset in work_dir/synthetic/data instead of generating it')
+    parser.add_argument('--label', default='',
+                        help='label of this run, e.g. a release or a commit')
+    parser.add_argument('--output', default=None,
+                        help='JSON file which runs are appended to, e.g. bench_json.json')
+    add_synthetic_arguments(parser)
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = argparser()
+    backends = args.backends or json_backend.available_backends()
+    for backend in backends:
+        if backend not in json_backend.available_backends():
+            raise ValueError('JSON backend ' + backend + ' is not installed')
+
+    config = synthetic_kwargs(args)
+    synthetic_dir = os.path.join(args.work_dir, 'synthetic', 'data')
+    if not args.reuse_data:
+        write_synthetic_coco(synthetic_dir, **config)
+        # Results of a former dataset are stale.
+        final_file = os.path.join(
+            args.work_dir, 'synthetic', 'results', 'final_results.json')
+        if os.path.isfile(final_file):
+            os.remove(final_file)
+
+    datasets = {'synthetic': synthetic_dir}
+    if os.path.isfile(os.path.join(args.example_dir, 'gt.json')):
+        datasets = {'example': args.example_dir, **datasets}
+
+    run = {'label': args.label, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(),
+           'config': config if not args.reuse_data else synthetic_dir, 'repeat': args.repeat, 'datasets': {}}
+    for name, data_dir in datasets.items():
+        result_dir = os.path.join(args.work_dir, name, 'results')
+        tmp_dir = os.path.join(args.work_dir, name, 'dumped')
+        os.makedirs(tmp_dir, exist_ok=True)
+        files = prepare(data_dir, result_dir)
+        run['datasets'][name] = {'sizes_mb': {k: round(os.path.getsize(path) / (1 << 20), 3) for k, path in files.items()},
+                                 'seconds': {}}
+        for backend in backends:
+            seconds = run_backend(backend, files, tmp_dir, args.repeat)
+            run['datasets'][name]['seconds'][backend] = seconds
+            print(name, backend, json.dumps(seconds))
+
+        # Speedups are relative to the standard library.
+        if 'json' in backends:
+            base = run['datasets'][name]['seconds']['json']
+            run['datasets'][name]['speedups'] = {backend: {task: round(base[task] / max(seconds[task], 1e-9), 2) for task in TASKS}
+                                                 for backend, seconds in run['datasets'][name]['seconds'].items()}
+            for backend in backends:
+                print(name, backend, 'speedup',
+                      json.dumps(run['datasets'][name]['speedups'][backend]))
+
+    if args.output is not None:
+        runs = []
+        if os.path.isfile(args.output):
+            with open(args.output) as fr:
+                runs = json.load(fr)
+        runs.append(run)
+        with open(args.output, 'w') as fw:
+            json.dump(runs, fw, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+from analytical_map.params import COCOParams
+from analytical_map.tools.profiler import Profiler
+from analytical_map.benchmark.synthetic import write_synthetic_coco, add_synthetic_arguments, synthetic_kwargs
+
+STAGES = ['evaluate', 'calculate', 'visualize']
+
+
+def run_stage(stage: str, data_dir: str, result_dir: str, workers: int = 1, num_samples: int = None, spatial_index: bool = False) -> dict:
+    """Run one stage on the files of the former stages and profile it.
+
+    Args:
+        stage (str): 'evaluate', 'calculate' or 'visualize'
+        data_dir (str): Directory of gt.json, dt.json and images
+        result_dir (str): Directory of the middle file and final results
+        workers (int, optional): Number of processes for evaluation and drawing bounding boxes. Defaults to 1.
+        num_samples (int, optional): Number of images to draw bounding boxes. Defaults to all images.
+        spatial_index (bool, optional): Evaluate with the spatial index. Defaults to False.
+
+    Returns:
+        dict: Time, peak memory, counts and throughputs of the stage, and its profile
+    """
+    from analytical_map import COCOEvaluator, COCOCalculator, COCOVisualizer
+
+    gt_file = os.path.join(data_dir, 'gt.json')
+    dt_file = os.path.join(data_dir, 'dt.json')
+    image_dir = os.path.join(data_dir, 'images')
+    middle_file = os.path.join(result_dir, 'middle_file.json')
+    final_file = os.path.join(result_dir, 'final_results.json')
+
+    profiler = Profiler()
+    # Loading is a part of the stage.
+    with profiler.stage(stage) as record:
+        if stage == 'evaluate':
+            obj = COCOEvaluator(gt_file, dt_file, result_dir, COCOParams())
+            obj.profiler = profiler
+            obj.evaluate(workers=workers, spatial_index=spatial_index)
+            obj.dump_middle_file('middle_file.json')
+        elif stage == 'calculate':
+            obj = COCOCalculator(middle_file, result_dir,
+                                 image_dir, COCOParams())
+            obj.profiler = profiler
+            obj.calculate()
+            obj.dump_final_results_json('final_results.json')
+        else:
+            obj = COCOVisualizer(middle_file, final_file,
+                                 result_dir, image_dir)
+            obj.profiler = profiler
+            obj.visualize(workers=workers, num_samples=num_samples)
+        profiler.count(images=len(obj.cocoGt.getImgIds()),
+                       gts=len(obj.storeGt), dts=len(obj.storeDt))
+
+    counts = record['counts']
+    wall_time = max(record['wall_time'], 1e-9)
+    return {'wall_time': record['wall_time'], 'cpu_time': record['cpu_time'],
+            'cpu_time_children': record['cpu_time_children'],
+            'peak_rss_mb': record['peak_rss_mb'], 'peak_rss_children_mb': record['process_peak_rss_children_mb'],
+            'counts': counts,
+            'images_per_s': round(counts['images'] / wall_time, 1),
+            'anns_per_s': round((counts['gts'] + counts['dts']) / wall_time, 1),
+            'profile': profiler.report()['stages']}
+
+
+def environment() -> dict:
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpus': os.cpu_count()}
+
+
+def argparser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark COCOEvaluator, COCOCalculator and COCOVisualizer on a synthetic dataset')
+
+    parser.add_argument('work_dir',
+                        help='directory of the synthetic dataset (data/) and results (results/)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=['evaluate', 'calculate'],
+                        help='stages to run in this order')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes for evaluation and drawing bounding boxes')
+    parser.add_argument('--num_samples', type=int, default=None,
+                        help='number of images to draw bounding boxes in visualize')
+    parser.add_argument('--spatial_index', action='store_true',
+                        help='evaluate with the spatial index')
+    parser.add_argument('--reuse_data', action='store_true',
+                        help='use the dataset in work_dir/data instead of generating it')
+    parser.add_argument('--label', default='',
+                        help='label of this run, e.g. a release or a commit')
+    parser.add_argument('--output', default=None,
+                        help='JSON file which runs are appended to, e.g. bench_results.json')
+    parser.add_argument('--stage', choices=STAGES,
+                        help='run one stage in this process')
+    add_synthetic_arguments(parser)
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = argparser()
+    data_dir = os.path.join(args.work_dir, 'data')
+    result_dir = os.path.join(args.work_dir, 'results')
+
+    if args.stage is not None:
+        print(json.dumps(run_stage(args.stage, data_dir,
+              result_dir, args.workers, args.num_samples, args.spatial_index)))
+        return
+
+    config = synthetic_kwargs(args)
+    if not args.reuse_data:
+        tic = time.time()
+        write_synthetic_coco(data_dir, write_images='visualize' in args.stages,
+                             **config)
+        print('Generated data in', round(time.time() - tic, 2), 's')
+
+    run = {'label': args.label, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(),
+           'config': config if not args.reuse_data else data_dir, 'workers': args.workers,
+           'spatial_index': args.spatial_index, 'stages': {}}
+    for stage in args.stages:
+        # Each stage runs in its own process so that peak RSS is not shared.
+        cmd = [sys.executable, '-m', 'analytical_map.benchmark.run', args.work_dir, '--stage', stage,
+               '--workers', str(args.workers)]
+        if args.num_samples is not None:
+            cmd += ['--num_samples', str(args.num_samples)]
+        if args.spatial_index:
+            cmd += ['--spatial_index']
+        out = subprocess.run(cmd, capture_output=True,
+                             text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        run['stages'][stage] = result
+        print(stage, json.dumps({k: v for k, v in result.items() if k != 'profile'}))
+
+    if args.output is not None:
+        runs = []
+        if os.path.isfile(args.output):
+            with open(args.output) as fr:
+                runs = json.load(fr)
+        runs.append(run)
+        with open(args.output, 'w') as fw:
+            json.dump(runs, fw, indent=2)
+
+
+if __name__ == '__main__':
+    main()
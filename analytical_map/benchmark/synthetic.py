@@ -0,0 +1,156 @@
+import json
+import os
+import argparse
+import numpy as np
+from typing import Tuple
+
+
+def make_synthetic_coco(num_images: int = 1000, objs_per_image: float = 7.0, num_cats: int = 10,
+                        recall: float = 0.8, loc_noise: float = 0.1, cls_noise: float = 0.05, fps_per_image: float = 2.0,
+                        score_dist: str = 'beta', width: int = 640, height: int = 480, seed: int = 0) -> Tuple[dict, list]:
+    """Make a synthetic COCO ground truth and detections.
+
+    Gts are random boxes, whose number per image is Poisson distributed. Dts are gts detected with probability of recall,
+    whose boxes are jittered and categories are flipped, and random boxes as false positives.
+
+    Args:
+        num_images (int, optional): Number of images. Defaults to 1000.
+        objs_per_image (float, optional): Mean number of gts per image. Defaults to 7.0.
+        num_cats (int, optional): Number of categories. Defaults to 10.
+        recall (float, optional): Probability that a gt is detected. Defaults to 0.8.
+        loc_noise (float, optional): Standard deviation of the jitter of boxes relative to their sizes. Defaults to 0.1.
+        cls_noise (float, optional): Probability that the category of a detected gt is wrong. Defaults to 0.05.
+        fps_per_image (float, optional): Mean number of random boxes per image in dts. Defaults to 2.0.
+        score_dist (str, optional): 'beta' for higher scores of detected gts than random boxes, or 'uniform'. Defaults to 'beta'.
+        width (int, optional): Width of images. Defaults to 640.
+        height (int, optional): Height of images. Defaults to 480.
+        seed (int, optional): Seed. Defaults to 0.
+
+    Returns:
+        Tuple[dict, list]: COCO ground truth and detections
+    """
+    assert score_dist in ['beta', 'uniform']
+    rng = np.random.default_rng(seed)
+
+    def random_boxes(num):
+        # Sizes of objects are log-normal, from small to large.
+        wh = np.exp(rng.normal(3.5, 1.0, (num, 2)))
+        wh = np.minimum(np.maximum(wh, 2), [width, height])
+        xy = rng.uniform(0, 1, (num, 2)) * ([width, height] - wh)
+        return np.concatenate([xy, wh], axis=1)
+
+    img_ids = np.arange(1, num_images + 1)
+    gt_imgs = np.repeat(img_ids, rng.poisson(objs_per_image, num_images))
+    gt_bbs = random_boxes(len(gt_imgs))
+    gt_cats = rng.integers(1, num_cats + 1, len(gt_imgs))
+
+    # Detected gts
+    is_detected = rng.random(len(gt_imgs)) < recall
+    det_imgs = gt_imgs[is_detected]
+    det_bbs = gt_bbs[is_detected]
+    det_bbs = det_bbs + rng.normal(0, loc_noise, det_bbs.shape) * \
+        np.tile(det_bbs[:, 2:], 2)
+    det_bbs[:, 2:] = np.maximum(det_bbs[:, 2:], 1)
+    det_cats = gt_cats[is_detected]
+    is_flipped = rng.random(len(det_cats)) < cls_noise
+    det_cats[is_flipped] = rng.integers(1, num_cats + 1, is_flipped.sum())
+
+    # Random boxes
+    fp_imgs = np.repeat(img_ids, rng.poisson(fps_per_image, num_images))
+    fp_bbs = random_boxes(len(fp_imgs))
+    fp_cats = rng.integers(1, num_cats + 1, len(fp_imgs))
+
+    if score_dist == 'beta':
+        det_scores = rng.beta(5, 2, len(det_imgs))
+        fp_scores = rng.beta(2, 5, len(fp_imgs))
+    else:
+        det_scores = rng.random(len(det_imgs))
+        fp_scores = rng.random(len(fp_imgs))
+
+    dt_imgs = np.concatenate([det_imgs, fp_imgs])
+    dt_bbs = np.round(np.concatenate([det_bbs, fp_bbs]), 2)
+    dt_cats = np.concatenate([det_cats, fp_cats])
+    dt_scores = np.round(np.concatenate([det_scores, fp_scores]), 5)
+    gt_bbs = np.round(gt_bbs, 2)
+
+    cocoGt = {'info': {'description': 'synthetic'}, 'licenses': [],
+              'images': [{'id': int(i), 'file_name': str(i) + '.jpg', 'width': width, 'height': height} for i in img_ids],
+              'categories': [{'id': i, 'name': 'cat' + str(i), 'supercategory': 'cat'} for i in range(1, num_cats + 1)],
+              'annotations': [{'id': i + 1, 'image_id': int(img), 'category_id': int(cat), 'bbox': bb,
+                               'area': round(bb[2] * bb[3], 2), 'iscrowd': 0}
+                              for i, (img, cat, bb) in enumerate(zip(gt_imgs, gt_cats, gt_bbs.tolist()))]}
+    cocoDt = [{'image_id': int(img), 'category_id': int(cat), 'bbox': bb, 'score': float(score)}
+              for img, cat, bb, score in zip(dt_imgs, dt_cats, dt_bbs.tolist(), dt_scores)]
+    return cocoGt, cocoDt
+
+
+def write_synthetic_coco(data_dir: str, write_images: bool = False, **kwargs) -> Tuple[str, str, str]:
+    """Write a synthetic COCO ground truth and detections as gt.json and dt.json.
+
+    Args:
+        data_dir (str): Output directory
+        write_images (bool, optional): Write blank images for drawing bounding boxes. Defaults to False.
+        kwargs: Arguments of make_synthetic_coco
+
+    Returns:
+        Tuple[str, str, str]: Paths of the ground truth, the detections and the image directory
+    """
+    cocoGt, cocoDt = make_synthetic_coco(**kwargs)
+    image_dir = os.path.join(data_dir, 'images')
+    os.makedirs(image_dir, exist_ok=True)
+    gt_file = os.path.join(data_dir, 'gt.json')
+    dt_file = os.path.join(data_dir, 'dt.json')
+    with open(gt_file, 'w') as fw:
+        json.dump(cocoGt, fw)
+    with open(dt_file, 'w') as fw:
+        json.dump(cocoDt, fw)
+
+    if write_images:
+        import cv2
+        for img in cocoGt['images']:
+            cv2.imwrite(os.path.join(image_dir, img['file_name']),
+                        np.zeros((img['height'], img['width'], 3), dtype=np.uint8))
+    return gt_file, dt_file, image_dir
+
+
+def add_synthetic_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--images', type=int, default=1000,
+                        help='number of images')
+    parser.add_argument('--objs_per_image', type=float, default=7.0,
+                        help='mean number of gts per image')
+    parser.add_argument('--cats', type=int, default=10,
+                        help='number of categories')
+    parser.add_argument('--recall', type=float, default=0.8,
+                        help='probability that a gt is detected')
+    parser.add_argument('--loc_noise', type=float, default=0.1,
+                        help='standard deviation of the jitter of detected boxes relative to their sizes')
+    parser.add_argument('--cls_noise', type=float, default=0.05,
+                        help='probability that the category of a detected gt is wrong')
+    parser.add_argument('--fps_per_image', type=float, default=2.0,
+                        help='mean number of random boxes per image in detections')
+    parser.add_argument('--score_dist', choices=['beta', 'uniform'], default='beta',
+                        help='distribution of scores')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def synthetic_kwargs(args: argparse.Namespace) -> dict:
+    return {'num_images': args.images, 'objs_per_image': args.objs_per_image, 'num_cats': args.cats,
+            'recall': args.recall, 'loc_noise': args.loc_noise, 'cls_noise': args.cls_noise,
+            'fps_per_image': args.fps_per_image, 'score_dist': args.score_dist, 'seed': args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Write a synthetic COCO ground truth and detections')
+    parser.add_argument('data_dir')
+    parser.add_argument('--write_images', action='store_true',
+                        help='write blank images for drawing bounding boxes')
+    add_synthetic_arguments(parser)
+    args = parser.parse_args()
+
+    write_synthetic_coco(args.data_dir, args.write_images,
+                         **synthetic_kwargs(args))
+
+
+if __name__ == '__main__':
+    main()
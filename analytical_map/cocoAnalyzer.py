@@ -7,22 +7,26 @@ from analytical_map.params import COCOParams
 from analytical_map.tools.dump_json import dump_middle_file_json as _dump_middle_file_json
 from analytical_map.cocoEvaluator import COCOEvaluator
 from analytical_map.cocoCalculator import COCOCalculator
-from analytical_map.cocoVisualizer import COCOVisualizer
+from analytical_map.cocoVisualizer import COCOVisualizer, FIG_KINDS
+from analytical_map.tools.profiler import Profiler
+from analytical_map.tools import json_backend
 from analytical_map.params import COCOParams
 
 import argparse    # 1. argparseをインポート
 
 
 class COCOAnalyzer(COCOEvaluator, COCOCalculator, COCOVisualizer):
-    def __init__(self, cocoGt_file: str, cocoDt_file: str, result_dir: str, image_dir: str, params: COCOParams) -> None:
+    def __init__(self, cocoGt_file: str, cocoDt_file: str, result_dir: str, image_dir: str, params: COCOParams, profiler: Profiler = None, load_workers: int = 1) -> None:
         """Init
 
         Args:
-            cocoGt_file (str): COCO ground truth path
-            cocoDt_file (str): COCO detection file path
+            cocoGt_file (str): COCO ground truth path, a directory of shards or a glob pattern
+            cocoDt_file (str): COCO detection file path, '.jsonl' file, a directory of shards or a glob pattern
             result_dir (str): Output path
             image_dir (str): Image directory path
             params (COCOParams): Parameters for evaluation
+            profiler (Profiler, optional): Profiler which records stages from loading. Defaults to None.
+            load_workers (int, optional): Number of processes to parse shards, not the ones of evaluate and visualize. Defaults to 1.
         """
 
         self.params = params
@@ -30,9 +34,13 @@ class COCOAnalyzer(COCOEvaluator, COCOCalculator, COCOVisualizer):
         # Input
         self.cocoGt = None
         self.cocoDt = None
+        self.indexGt = None
+        self.indexDt = None
         self.cats = None
+        self.profiler = profiler
+        self.cache = None
 
-        assert self.init_coco(cocoGt_file, cocoDt_file)
+        assert self.init_coco(cocoGt_file, cocoDt_file, load_workers)
 
         self.result_dir = result_dir
         self.image_dir = image_dir
@@ -61,10 +69,48 @@ def argparser():
         description='cocoAnalyzer')    # 2. パーサを作る
 
 # 3. parser.add_argumentで受け取る引数を追加していく
-    parser.add_argument('gt')    # 必須の引数を追加
-    parser.add_argument('dt')
+    parser.add_argument('gt', help='COCO ground truth, a directory of shards or a glob pattern')    # 必須の引数を追加
+    parser.add_argument('dt', help='COCO detections, .jsonl, a directory of shards or a glob pattern, e.g. "dts/*.jsonl"')
     parser.add_argument('result_dir')
     parser.add_argument('image_dir')    # オプション引数（指定しなくても良い引数）を追加
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes for evaluation and drawing bounding boxes and figures')
+    parser.add_argument('--load_workers', type=int, default=1,
+                        help='number of processes for parsing shards of the gt and dt')
+    parser.add_argument('--only_not_TP', action='store_true',
+                        help='draw bounding boxes only in images which have boxes other than TP')
+    parser.add_argument('--num_samples', type=int, default=None,
+                        help='draw bounding boxes only in this number of randomly sampled images')
+    parser.add_argument('--figures', nargs='+', choices=FIG_KINDS, default=None,
+                        help='kinds of figures to draw, all kinds by default')
+    parser.add_argument('--categories', nargs='+', default=None,
+                        help='category names to draw figures, e.g. person single_category')
+    parser.add_argument('--areas', nargs='+', default=None,
+                        help='area names to draw AP figures, e.g. area_all')
+    parser.add_argument('--page_size', type=int, default=None,
+                        help='maximum number of figures in one HTML page')
+    parser.add_argument('--iou_threshs', type=float, nargs='+', default=None,
+                        help='IoU thresholds evaluated in addition to 0.5, e.g. 0.5 0.55 ... 0.95')
+    parser.add_argument('--score_threshs', type=float, nargs='+', default=None,
+                        help='score thresholds to calculate precisions, recalls and the best F1 point at, e.g. 0.1 0.2 ... 0.9')
+    parser.add_argument('--spatial_index', action='store_true',
+                        help='calculate IoU only for overlapping boxes, for images with thousands of boxes')
+    parser.add_argument('--middle_file', default='middle_file.json',
+                        help='middle file name, npz if it ends with .npz, gzipped JSON if it ends with .gz')
+    parser.add_argument('--prev_middle_file', default=None,
+                        help='middle file of a previous evaluation, only images whose gts or dts differ from it are evaluated')
+    parser.add_argument('--compact', action='store_true',
+                        help='write the middle file and final results without indents')
+    parser.add_argument('--bootstrap', type=int, default=0,
+                        help='number of resamples of images for 95%% confidence intervals, 0 to skip')
+    parser.add_argument('--cache', action='store_true',
+                        help='reuse the evaluation and final results of the same gt, dt and params from result_dir/cache')
+    parser.add_argument('--cache_mb', type=float, default=1024,
+                        help='maximum size of the cache in MB, least recently used entries are evicted')
+    parser.add_argument('--profile', action='store_true',
+                        help='write time, CPU time, peak memory and counts of each stage into profile.json')
+    parser.add_argument('--json_backend', choices=json_backend.BACKENDS, default=None,
+                        help='JSON parser and writer, defaults to the fastest installed one of orjson, simdjson, ujson and json')
 
     args = parser.parse_args()
     return args
@@ -72,17 +118,29 @@ def argparser():
 
 def main():
     args = argparser()
+    json_backend.set_backend(args.json_backend)
 
     p = COCOParams(iou_thresh=0.5, iou_loc=0.2, recall_inter=np.arange(
-        0, 1.01, 0.1), area_rng=np.array([[0, 1024], [1024, 9216], [9216, 10000000000.0]]))
+        0, 1.01, 0.1), area_rng=np.array([[0, 1024], [1024, 9216], [9216, 10000000000.0]]),
+        iou_threshs=np.array(args.iou_threshs) if args.iou_threshs is not None else None,
+        score_threshs=np.array(args.score_threshs) if args.score_threshs is not None else None)
     # p = cocoParams(iou_thresh=0.5, iou_loc=0.2, recall_inter=np.arange(0, 1.01, 0.1), area_rng=[])
+    profiler = Profiler() if args.profile else None
     cocoAnal = COCOAnalyzer(args.gt, args.dt,
-                            args.result_dir, args.image_dir, p)
-    cocoAnal.evaluate()
-    cocoAnal.dump_middle_file_json('middle_file.json')
+                            args.result_dir, args.image_dir, p, profiler, args.load_workers)
+    if args.cache:
+        cocoAnal.use_cache(max_mb=args.cache_mb)
+    cocoAnal.evaluate(workers=args.workers, spatial_index=args.spatial_index,
+                      prev_middle_file=args.prev_middle_file)
+    cocoAnal.dump_middle_file(args.middle_file, args.compact)
     cocoAnal.calculate()
-    cocoAnal.dump_final_results_json('final_results.json')
-    cocoAnal.visualize()
+    if args.bootstrap > 0:
+        cocoAnal.bootstrap_calculate(num_resamples=args.bootstrap)
+    cocoAnal.dump_final_results_json('final_results.json', args.compact)
+    cocoAnal.visualize(workers=args.workers, only_not_TP=args.only_not_TP, num_samples=args.num_samples,
+                       kinds=args.figures, categories=args.categories, areas=args.areas, page_size=args.page_size)
+    if profiler is not None:
+        profiler.dump(args.result_dir, 'profile.json')
 
 
 if __name__ == '__main__':
@@ -1,14 +1,16 @@
-import json
-from pycocotools.coco import COCO
 import numpy as np
 import os
-import copy
 from nptyping import NDArray
-from typing import Tuple
 
 from analytical_map.params import COCOParams
 from analytical_map.tools.dump_json import dump_final_results_json as _dump_final_results_json
 from analytical_map.tools.draw_chart import *
+from analytical_map.tools.load_json import load_middle_file
+from analytical_map.tools.matching import TYPES, MATCH, LC, DC, CLS, LOC, BKG, MISS, NONE, TP
+from analytical_map.tools.metrics import count_results, ap_result, ap_sweep_result, score_sweep_result, confusion_result, area_names
+from analytical_map.tools.cat_area_index import CatAreaIndex
+from analytical_map.tools.bootstrap import resample_weights, group_sums, weighted_ap_per_type, ap_ratio_batch, percentile_ci
+from analytical_map.tools.profiler import profiled, profile_count
 
 
 class COCOCalculator():
@@ -24,6 +26,13 @@ class COCOCalculator():
 
         self.cocoGt = None
         self.cocoDt = None
+        self.storeGt = None
+        self.storeDt = None
+        self.indexGt = None
+        self.indexDt = None
+        self.profiler = None
+        self.cache = None
+        self.is_evaluated = False
         assert self.read_middle_file(middle_file)
 
         self.result_dir = result_dir
@@ -40,11 +49,11 @@ class COCOCalculator():
         self.is_ap_calculated = False
         self.is_precision_calculated = False
         self.is_recall_calculated = False
-        self.is_evaluated = False
         self.params = params
         self.params.area_rng = np.insert(
             params.area_rng, 0, self.area_all, axis=0)
 
+    @profiled
     def read_middle_file(self, middle_file: str) -> bool:
         """Initialize cocoGt and cocoDt with a midddle file
 
@@ -56,89 +65,88 @@ class COCOCalculator():
         """
         if middle_file is not None:
             if os.path.isfile(middle_file):
-                cocoGt = COCO(middle_file)
-                _cocoDt = json.load(open(middle_file))['detections']
-                cocoDt = cocoGt.loadRes(_cocoDt)
-                self.is_evaluated = self.evaluation_check(cocoGt, cocoDt)
+                # Both gts and dts are indexed from a single parse, and evaluations are checked while building the stores.
+                middle = load_middle_file(middle_file)
+                self.is_evaluated = middle is not None
                 if self.is_evaluated == False:
                     return False
-                self.cocoGt = cocoGt
-                self.cocoDt = cocoDt
+                self.cocoGt, self.cocoDt, self.storeGt, self.storeDt = middle
                 self.cats = self.cocoGt.loadCats(self.cocoGt.getCatIds())
                 return True
         else:
             print('ERROR:Could not read files')
             return False
 
-    def evaluation_check(self, cocoGt: COCO, cocoDT: COCO) -> bool:
-        """Check whether middle file is evaluated.
-
-        Args:
-            cocoGt (COCO):  Ground truth
-            cocoDT (COCO):  Detections
-
-        Returns:
-            bool: True if both cocoGt and cocoDT were evaluated.
-        """
-        gts = cocoGt.loadAnns(cocoGt.getAnnIds())
-        dts = cocoDT.loadAnns(cocoDT.getAnnIds())
-        is_evaluated_gts = all([True if 'eval' in gt.keys()
-                                else False for gt in gts])
-        is_evaluated_dts = all([True if 'eval' in dt.keys()
-                                else False for dt in dts])
-        return is_evaluated_gts and is_evaluated_dts
-
+    @profiled
     def calculate(self) -> None:
         """Calculate precisions, recalls, and APs, and dump them as final results.
 
+        If the cache is used, cached results of the same evaluation and params are loaded instead.
+
         Args:
             final_file (str, optional): A name of the final results. Defaults to 'final_results.json'.
         """
         if self.is_evaluated == False:
             return False
-        self.precision_calculate()
-        self.recall_calculate()
-        self.ap_calculate()
+        profile_count(self, gts=len(self.storeGt), dts=len(self.storeDt))
+        cache = getattr(self, 'cache', None)
+        results = cache.load_results() if cache is not None else None
+        if results is not None:
+            profile_count(self, cached=1)
+            self.results = results
+        else:
+            self.index_calculate()
+            self.precision_calculate()
+            self.recall_calculate()
+            self.ap_calculate()
+            self.ap_sweep_calculate()
+            self.score_sweep_calculate()
+            self.confusion_calculate()
+            if cache is not None:
+                cache.save_results(self.results)
         self.is_precision_calculated = True
         self.is_recall_calculated = True
         self.is_ap_calculated = True
 
         return True
 
+    def index_calculate(self) -> None:
+        """Bucket gts and dts by category and area range once for precisions, recalls and APs.
+        """
+        cat_ids = self.cocoGt.getCatIds()
+        if self.indexGt is None:
+            self.indexGt = CatAreaIndex(
+                self.storeGt.category_id, self.storeGt.area, cat_ids, self.params.area_rng)
+        if self.indexDt is None:
+            # Dts are ordered by score in descending order for AP.
+            self.indexDt = CatAreaIndex(self.storeDt.category_id, self.storeDt.area, cat_ids, self.params.area_rng,
+                                        order=np.argsort(-self.storeDt.score, kind='mergesort'))
+
+    @profiled
     def precision_calculate(self) -> None:
         """Calculate precision
         """
+        self.index_calculate()
 
         cat_list = [id for id in self.cocoDt.getCatIds()]
         cat_list.append(self.cocoDt.getCatIds())
         category_names = [
             self.cats[cat-1]['name'] if not isinstance(cat, list) else 'single_category' for cat in cat_list]
 
-        for id_cat, cat in enumerate(cat_list):
-
-            dt_ids = self.cocoDt.getAnnIds(catIds=cat)
-            dts = self.cocoDt.loadAnns(ids=dt_ids)
-            counts = {'Match': 0, 'Loc': 0, 'DC': 0, 'LC': 0,
-                      'Cls': 0, 'Bkg': 0, 'Miss': 0}
-            num_dts = len(dts)
-
-            for t in self.type:
-                _count = len(
-                    [dt for dt in dts if dt['eval']['type'] == t])
-                counts[t] = _count
-
-            precision = round(counts['Match'] / num_dts, 3)
+        # The last range has no area limit.
+        type_counts = self.indexDt.count(
+            self.storeDt.type, len(TYPES))[:, -1]
+        num_dts = self.indexDt.count()[:, -1, 0]
 
-            ratio = {k: round(v / num_dts, 3)
-                     for k, v in counts.items()}
-            self.results['precision'].append({
-                'category': category_names[id_cat], 'score': precision, 'ratio': ratio})
-
-            self.is_precision_calculated = True
+        self.results['precision'].extend(
+            count_results(category_names, type_counts, num_dts))
+        self.is_precision_calculated = True
 
+    @profiled
     def recall_calculate(self) -> None:
         """Calculate recall
         """
+        self.index_calculate()
 
         cat_list = [id for id in self.cocoGt.getCatIds()]
         cat_list.append(self.cocoGt.getCatIds())
@@ -146,133 +154,265 @@ class COCOCalculator():
         category_names = [
             self.cats[cat-1]['name'] if not isinstance(cat, list) else 'single_category' for cat in cat_list]
 
-        for id_cat, cat in enumerate(cat_list):
-
-            gt_ids = self.cocoGt.getAnnIds(catIds=cat)
-            gts = self.cocoGt.loadAnns(ids=gt_ids)
-            counts = {'Match': 0, 'Loc': 0, 'DC': 0, 'LC': 0,
-                      'Cls': 0, 'Bkg': 0, 'Miss': 0}
-            num_gts = len(gts)
-
-            for t in self.type:
-                _count = len(
-                    [gt for gt in gts if gt['eval']['type'] == t])
-                counts[t] = _count
-
-            recall = round(counts['Match'] / num_gts, 3)
-            ratio = {k: round(v / num_gts, 3)
-                     for k, v in counts.items()}
+        # The last range has no area limit.
+        type_counts = self.indexGt.count(
+            self.storeGt.type, len(TYPES))[:, -1]
+        num_gts = self.indexGt.count()[:, -1, 0]
 
-            self.results['recall'].append({
-                'category': category_names[id_cat], 'score': recall, 'ratio': ratio})
-
-            self.is_recall_calculated = True
+        self.results['recall'].extend(
+            count_results(category_names, type_counts, num_gts))
+        self.is_recall_calculated = True
 
+    @profiled
     def ap_calculate(self) -> None:
         """Calculate APs
         """
+        self.index_calculate()
 
-        def calc_ap(gts: dict, dts: dict, recall_inter: NDArray) -> Tuple[list, list, list, list]:
-            """_summary_
-
-            Args:
-                gts (dict): _description_
-                dts (dict): _description_
-                recall_inter (NDArray): _description_
+        cat_list = [id for id in self.cocoGt.getCatIds()]
+        cat_list.append(self.cocoGt.getCatIds())
 
-            Returns:
-                Tuple[list, list, list, list]: score, precision, recall, precision_inter
-            """
-            num_gts = len(gts)
+        category_names = [
+            self.cats[cat-1]['name'] if not isinstance(cat, list) else 'single_category' for cat in cat_list]
+        rng_names = area_names(self.params.area_rng, self.area_all)
+        num_gts = self.indexGt.count()[:, :, 0]
 
-            inds = np.argsort([-d['score'] for d in dts], kind='mergesort')
-            dts = [dts[i] for i in inds]
+        for id_cat, cat in enumerate(cat_list):
 
-            x_score = np.zeros(len(dts))
-            y_prec = np.zeros(len(dts))
-            y_recall = np.zeros(len(dts))
-            y_prec_inter = np.zeros(recall_inter.shape)
+            for id_area, area in enumerate(self.params.area_rng):
 
-            if num_gts != 0:
-                count_TP = 0
-                for id, dt in enumerate(dts):
-                    if dt['eval']['count'] == 'TP':
-                        count_TP += 1
-                    x_score[id] = dt['score']
-                    y_prec[id] = count_TP / (id + 1)
-                    y_recall[id] = count_TP / num_gts
+                dt_rows = self.indexDt.rows(id_cat, id_area)
+                self.results['ap'].append(ap_result(category_names[id_cat], rng_names[id_area], int(num_gts[id_cat, id_area]),
+                                                    self.storeDt.score[dt_rows], self.storeDt.count[dt_rows], self.storeDt.type[dt_rows], self.params.recall_inter))
 
-                _y_prec = np.concatenate([[1], y_prec, [0]])
-                _y_recall = np.concatenate([[0], y_recall, [1]])
+        self.is_ap_calculated = True
 
-                ids = np.searchsorted(_y_recall, recall_inter, side='left')
-                for i, id in enumerate(ids):
-                    y_prec_inter[i] = _y_prec[id]
-                y_prec_inter = np.maximum.accumulate(y_prec_inter[::-1])[::-1]
+    @profiled
+    def ap_sweep_calculate(self) -> None:
+        """Calculate APs and their type ratios for each IoU threshold of COCOParams.iou_threshs, if the middle file has them.
+        """
+        if self.storeDt.type_sweep is None:
+            return
+        self.index_calculate()
 
-            return x_score.tolist(), y_prec.tolist(), y_recall.tolist(), y_prec_inter.tolist()
+        iou_threshs = self.params.iou_threshs
+        if iou_threshs is None:
+            # Thresholds of the evaluation in the middle file
+            iou_threshs = self.cocoGt.dataset['params']['iou_threshs']
+        assert len(iou_threshs) == self.storeDt.type_sweep.shape[1], \
+            'iou_threshs are different from the ones of the evaluation'
 
         cat_list = [id for id in self.cocoGt.getCatIds()]
         cat_list.append(self.cocoGt.getCatIds())
 
         category_names = [
             self.cats[cat-1]['name'] if not isinstance(cat, list) else 'single_category' for cat in cat_list]
-        area_names = ['area_' + str(area[0]) + '_' + str(area[1]) if not np.all(area == self.area_all)
-                      else 'area_all' for area in self.params.area_rng]
+        rng_names = area_names(self.params.area_rng, self.area_all)
+        num_gts = self.indexGt.count()[:, :, 0]
 
+        self.results['ap_sweep'] = []
         for id_cat, cat in enumerate(cat_list):
 
             for id_area, area in enumerate(self.params.area_rng):
 
-                dt_ids = self.cocoDt.getAnnIds(catIds=cat, areaRng=area)
-                gt_ids = self.cocoGt.getAnnIds(catIds=cat, areaRng=area)
-                dts = self.cocoDt.loadAnns(ids=dt_ids)
-                gts = self.cocoGt.loadAnns(ids=gt_ids)
-
-                ap = dict.fromkeys(self.type, 0)
+                dt_rows = self.indexDt.rows(id_cat, id_area)
+                self.results['ap_sweep'].append(ap_sweep_result(category_names[id_cat], rng_names[id_area], iou_threshs, int(num_gts[id_cat, id_area]),
+                                                                self.storeDt.score[dt_rows], self.storeDt.type_sweep[dt_rows], self.params.recall_inter))
 
-                for t in self.type:
-                    _dts = copy.deepcopy(dts)
-                    _gts = copy.deepcopy(gts)
-                    if t != 'Match':
-                        for gt in _gts:
-                            if gt['eval']['type'] == t:
-                                gt['eval']['count'] = 'TP'
+    @profiled
+    def score_sweep_calculate(self, score_threshs: NDArray = None) -> None:
+        """Calculate precisions, recalls and their type ratios for each score threshold, and the best F1 point of each category,
+        if the middle file has the scores which decide types of gts.
 
-                        for dt in _dts:
-                            if dt['eval']['type'] == t:
-                                dt['eval']['count'] = 'TP'
+        Dts of a score threshold or more keep their types, and types of gts are decided by 'type_scores' of the middle file,
+        so that any thresholds can be calculated without evaluating again.
 
-                    score, prec_raw, recall_raw, prec_inter = calc_ap(
-                        _gts, _dts, self.params.recall_inter)
+        Args:
+            score_threshs (NDArray, optional): Thresholds for scores. Defaults to COCOParams.score_threshs or the ones of the evaluation.
+        """
+        if self.storeGt.type_scores is None:
+            return
+        if score_threshs is None:
+            score_threshs = self.params.score_threshs
+        if score_threshs is None:
+            # Thresholds of the evaluation in the middle file
+            score_threshs = self.cocoGt.dataset['params'].get('score_threshs')
+        if score_threshs is None:
+            return
+        self.index_calculate()
 
-                    # Anotehr way of calculating mAP.
-                    # for i in range(1, len(prec_inter)):
-                    #     ap[t] += prec_inter[i]*(self.params.recall_inter[i] -
-                    #                               self.params.recall_inter[i-1])
+        cat_list = [id for id in self.cocoGt.getCatIds()]
+        cat_list.append(self.cocoGt.getCatIds())
 
-                    # AP = 1/N sum(prec_inter)
-                    ap[t] = np.average(prec_inter)
+        category_names = [
+            self.cats[cat-1]['name'] if not isinstance(cat, list) else 'single_category' for cat in cat_list]
 
-                ap_ratio = {k: round(v - ap['Match'], 3) if k != 'Match' else round(ap['Match'], 3)
-                            for k, v in ap.items()}
-                ap_ratio_normalized = {k: v/sum(ap_ratio.values()) if v != 0 else 0
-                                       for k, v in ap_ratio.items()}
+        # The last range has no area limit.
+        num_threshs = len(score_threshs)
+        dt_type_counts = np.zeros(
+            (len(cat_list), num_threshs, len(TYPES)), dtype=np.int64)
+        gt_type_counts = np.zeros_like(dt_type_counts)
+        num_dts = np.zeros((len(cat_list), num_threshs), dtype=np.int64)
+        type_scores = self.storeGt.type_scores
+        for id_thresh, thresh in enumerate(score_threshs):
+            keep = self.storeDt.score >= thresh
+            dt_type_counts[:, id_thresh] = self.indexDt.count(
+                np.where(keep, self.storeDt.type, NONE), len(TYPES))[:, -1]
+            num_dts[:, id_thresh] = self.indexDt.count(
+                np.where(keep, 0, -1))[:, -1, 0]
+
+            gt_type = np.select([type_scores[:, 0] >= thresh, type_scores[:, 1] >= thresh, type_scores[:, 2] >= thresh, type_scores[:, 3] >= thresh],
+                                [MATCH, LC, CLS, LOC], MISS)
+            gt_type = np.where(self.storeGt.type == NONE, NONE, gt_type)
+            gt_type_counts[:, id_thresh] = self.indexGt.count(
+                gt_type, len(TYPES))[:, -1]
+        num_gts = self.indexGt.count()[:, -1, 0]
+
+        self.results['score_sweep'] = []
+        for id_cat, cat in enumerate(cat_list):
+            dt_rows = self.indexDt.rows(id_cat, self.indexDt.num_rngs - 1)
+            self.results['score_sweep'].append(score_sweep_result(category_names[id_cat], score_threshs, dt_type_counts[id_cat], num_dts[id_cat],
+                                                                  gt_type_counts[id_cat], int(num_gts[id_cat]),
+                                                                  self.storeDt.score[dt_rows], self.storeDt.count[dt_rows] == TP))
+
+    @profiled
+    def confusion_calculate(self) -> None:
+        """Calculate a confusion matrix of categories for each area range.
+
+        A dt of 'Match', 'DC' or 'Cls' is counted in the row of the category of its corresponding gt, and the other dts of
+        'Loc' and 'Bkg' are in the 'Bkg' row. Gts of 'Loc' and 'Miss', which no dt overlaps by iou_thresh, are in the 'Miss' column.
+        Dts are in the area ranges of their areas, and gts of theirs, like APs. Cells are counted by codes of
+        (row, column) pairs at once and kept sparse, so thousands of categories do not need a dense matrix.
+        """
+        if self.storeDt.corr_id is None:
+            # Middle files of COCOChunkEvaluator do not have corresponding boxes.
+            return
+        self.index_calculate()
+
+        cat_ids = self.cocoGt.getCatIds()
+        num_cats = len(cat_ids)
+        category_names = [self.cats[cat-1]['name'] for cat in cat_ids]
+        rng_names = area_names(self.params.area_rng, self.area_all)
+
+        # Rows of the gts corresponding to dts
+        dt_type = self.storeDt.type
+        is_linked = np.isin(dt_type, [MATCH, DC, CLS])
+        gt_order = np.argsort(self.storeGt.id, kind='stable')
+        gt_rows = gt_order[np.searchsorted(
+            self.storeGt.id[gt_order], self.storeDt.corr_id[is_linked])]
+
+        dt_row = np.full(len(dt_type), -1, dtype=np.int64)
+        dt_row[is_linked] = self.indexGt.cat_index[gt_rows]
+        dt_row[np.isin(dt_type, [LOC, BKG])] = num_cats
+        dt_col = self.indexDt.cat_index
+        dt_codes = np.where((dt_row >= 0) & (dt_col >= 0),
+                            dt_row * (num_cats + 1) + dt_col, -1)
+
+        gt_row = self.indexGt.cat_index
+        gt_codes = np.where((gt_row >= 0) & np.isin(self.storeGt.type, [LOC, MISS]),
+                            gt_row * (num_cats + 1) + num_cats, -1)
+
+        self.results['confusion'] = []
+        dt_counts = self.indexDt.count_sparse(dt_codes)
+        gt_counts = self.indexGt.count_sparse(gt_codes)
+        for id_area, name in enumerate(rng_names):
+            # Dts are not in the 'Miss' column, and gts are only in it, so their cells are disjoint.
+            codes = np.concatenate([dt_counts[id_area][0], gt_counts[id_area][0]])
+            counts = np.concatenate([dt_counts[id_area][1], gt_counts[id_area][1]])
+            order = np.argsort(codes, kind='stable')
+            self.results['confusion'].append(confusion_result(
+                name, category_names, codes[order], counts[order]))
+
+    @profiled
+    def bootstrap_calculate(self, num_resamples: int = 100, alpha: float = 0.05, seed: int = 0) -> bool:
+        """Add bootstrap confidence intervals over images to precisions, recalls, APs and their ratios as 'ci'.
+
+        A resample of images is the weights of their gts and dts, the number of times each image is drawn,
+        so that evaluations are reused without matching again, and resamples are calculated in batches.
 
-                self.results['ap'].append({
-                    'category': category_names[id_cat], 'area': area_names[id_area], 'ap': round(ap['Match'], 3), 'ratio': ap_ratio_normalized,
-                    'score': score, 'recall_raw': recall_raw, 'prec_raw': prec_raw, 'recall_inter': self.params.recall_inter.tolist(), 'prec_inter': prec_inter})
+        Args:
+            num_resamples (int, optional): Number of resamples. Defaults to 100.
+            alpha (float, optional): 1 - confidence level. Defaults to 0.05.
+            seed (int, optional): Seed of the resampling. Defaults to 0.
 
-        self.is_ap_calculated = True
+        Returns:
+            bool: True if confidence intervals are calculated.
+        """
+        if not (self.is_precision_calculated and self.is_recall_calculated and self.is_ap_calculated):
+            return False
+        if self.storeGt.image_id is None:
+            print('ERROR:The middle file does not have images to resample')
+            return False
+        self.index_calculate()
+
+        img_ids = np.array(self.cocoGt.getImgIds())
+        sorter = np.argsort(img_ids)
+        gt_imgs = sorter[np.searchsorted(
+            img_ids, self.storeGt.image_id, sorter=sorter)]
+        dt_imgs = sorter[np.searchsorted(
+            img_ids, self.storeDt.image_id, sorter=sorter)]
+        num_cats = len(self.cocoGt.getCatIds())
+        num_types = len(TYPES)
+
+        # A batch of weights of dts has 2^23 elements at most, over the curves of all types.
+        batch_size = max(
+            1, min(num_resamples, (1 << 23) // max(1, num_types * len(self.storeDt))))
+        samples = {'precision': [], 'recall': [], 'ap': []}
+        for weights in resample_weights(len(img_ids), num_resamples, batch_size, seed):
+
+            for key, store, index, imgs in [('precision', self.storeDt, self.indexDt, dt_imgs), ('recall', self.storeGt, self.indexGt, gt_imgs)]:
+                ann_weights = weights[:, imgs]
+                valid = index.cat_index >= 0
+                totals = group_sums(
+                    ann_weights[:, valid], index.cat_index[valid], num_cats)
+                valid = valid & (store.type != NONE)
+                type_counts = group_sums(ann_weights[:, valid], index.cat_index[valid] * num_types + store.type[valid],
+                                         num_cats * num_types).reshape(-1, num_cats, num_types)
+                # The last category is 'single_category'.
+                totals = np.concatenate(
+                    [totals, totals.sum(axis=1, keepdims=True)], axis=1)
+                type_counts = np.concatenate(
+                    [type_counts, type_counts.sum(axis=1, keepdims=True)], axis=1)
+                samples[key].append(np.divide(type_counts, totals[..., None], out=np.zeros_like(
+                    type_counts), where=totals[..., None] > 0))
+
+            cells = []
+            for id_cat in range(num_cats + 1):
+                for id_area in range(len(self.params.area_rng)):
+                    dt_rows = self.indexDt.rows(id_cat, id_area)
+                    num_gts = weights[:, gt_imgs[self.indexGt.rows(
+                        id_cat, id_area)]].sum(axis=1)
+                    ap = weighted_ap_per_type(num_gts, weights[:, dt_imgs[dt_rows]], self.storeDt.score[dt_rows],
+                                              self.storeDt.count[dt_rows], self.storeDt.type[dt_rows], self.params.recall_inter)
+                    ratio = ap_ratio_batch(ap)
+                    cells.append(np.stack([ap['Match']] + [ratio[t]
+                                 for t in TYPES], axis=1))
+            samples['ap'].append(np.stack(cells, axis=1))
+
+        for key in ['precision', 'recall']:
+            # num_cats + 1 x num_types x 2
+            cis = percentile_ci(np.concatenate(samples[key]), alpha).tolist()
+            for result, ci in zip(self.results[key], cis):
+                result['ci'] = {'score': ci[MATCH], 'ratio': {
+                    t: ci[TYPES.index(t)] for t in result['ratio'].keys()}}
+
+        # cells x 1 + num_types x 2
+        cis = percentile_ci(np.concatenate(samples['ap']), alpha).tolist()
+        for result, ci in zip(self.results['ap'], cis):
+            result['ci'] = {'ap': ci[0], 'ratio': {
+                t: ci[1 + TYPES.index(t)] for t in result['ratio'].keys()}}
+        return True
 
-    def dump_final_results_json(self, final_file: str = 'final_results.json') -> None:
+    @profiled
+    def dump_final_results_json(self, final_file: str = 'final_results.json', compact: bool = False) -> None:
         """Dump final results
 
         Args:
-            final_file (str, optional): Final result file's name. Defaults to 'final_results.json'.
+            final_file (str, optional): Final result file's name, gzipped if it ends with '.gz'. Defaults to 'final_results.json'.
+            compact (bool, optional): Write without indents and spaces. Defaults to False.
         """
         _dump_final_results_json(
-            self.cocoGt, self.params, self.results, self.result_dir, final_file)
+            self.cocoGt, self.params, self.results, self.result_dir, final_file, compact)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,171 @@
+from pycocotools.coco import COCO
+import numpy as np
+import os
+import copy
+import argparse
+
+from analytical_map.params import COCOParams
+from analytical_map.cocoEvaluator import COCOEvaluator
+from analytical_map.cocoCalculator import COCOCalculator
+from analytical_map.tools.ann_store import AnnStore
+from analytical_map.tools.dump_json import categories as _categories, param2dict
+from analytical_map.tools.load_json import iter_annotations, iter_image_chunks, expand_paths
+from analytical_map.tools.middle_file_npz import NpzColumnWriter, to_bytes
+from analytical_map.tools import json_backend
+from analytical_map.tools.profiler import profiled, profile_count
+
+# Columns spilled to the middle file. They are enough for COCOCalculator, and boxes, ids and corresponding boxes are discarded.
+SPILL_COLUMNS = {'gt': ['category_id', 'area', 'count', 'type', 'type_sweep', 'type_scores'],
+                 'dt': ['category_id', 'area', 'score', 'count', 'type', 'type_sweep']}
+
+
+class COCOChunkEvaluator(COCOEvaluator):
+    def __init__(self, cocoGt_file: str, cocoDt_file: str, categories: list, result_dir: str, params: COCOParams) -> None:
+        """Init
+
+        Gts and dts are read by chunks of images, and each chunk is evaluated and discarded,
+        so that datasets larger than memory can be evaluated. Only the columns of the evaluations which COCOCalculator needs
+        are spilled to an npz middle file, and the middle file can not be visualized.
+
+        Args:
+            cocoGt_file (str): Gts sorted by image id, '.jsonl' file of one annotation per line or JSON file of an array of annotations.
+                A directory of shards or a glob pattern is read in the order of expand_paths.
+            cocoDt_file (str): Dts sorted by image id, in the same formats as cocoGt_file
+            categories (list): Categories in COCO format
+            result_dir (str): Output path
+            params (COCOParams): Parameters for evaluations
+        """
+        assert all([len(expand_paths(f)) > 0 and all([os.path.isfile(shard) for shard in expand_paths(f)])
+                    for f in [cocoGt_file, cocoDt_file]]), 'Could not read files'
+
+        # User variables
+        self.params = params
+
+        # Input, images and annotations are not kept.
+        self.cocoGt = COCO()
+        self.cocoGt.dataset['categories'] = copy.deepcopy(categories)
+        self.cocoGt.createIndex()
+        self.cocoDt = None
+        self.storeGt = None
+        self.storeDt = None
+        self.cats = self.cocoGt.loadCats(self.cocoGt.getCatIds())
+        self.cocoGt_file = cocoGt_file
+        self.cocoDt_file = cocoDt_file
+        self.profiler = None
+        self.cache = None
+
+        self.result_dir = result_dir
+        self.middle_file = None
+
+        # Fixed variables
+        self.type = ['Match', 'LC', 'DC', 'Cls', 'Loc', 'Bkg', 'Miss']
+        self.type_order = {'Match': 0, 'LC': 1, 'DC': 1,
+                           'Cls': 2, 'Loc': 3, 'Bkg': 4, 'Miss': 4, None: 5}
+
+        self.is_evaluated = False
+
+    @profiled
+    def evaluate(self, middle_file: str = 'middle_file.npz', chunk_size: int = 1000, workers: int = 1, spatial_index: bool = False) -> None:
+        """Evaluate chunks of images one by one, and spill their evaluations to an npz middle file.
+
+        Args:
+            middle_file (str, optional): Middle file name. Defaults to 'middle_file.npz'.
+            chunk_size (int, optional): Number of images per chunk. Defaults to 1000.
+            workers (int, optional): Number of processes to evaluate a chunk. Defaults to 1.
+            spatial_index (bool, optional): Calculate IoU only for overlapping boxes found with a grid. Defaults to False.
+        """
+        if self.is_evaluated:
+            return
+        os.makedirs(self.result_dir, exist_ok=True)
+        self.middle_file = os.path.join(self.result_dir, middle_file)
+        writer = NpzColumnWriter(self.middle_file)
+
+        gts = (gt for path in expand_paths(self.cocoGt_file)
+               for gt in iter_annotations(path))
+        dts = (dt for path in expand_paths(self.cocoDt_file) for dt in iter_annotations(path)
+               if dt['score'] >= self.params.score_thresh)  # remove low scores
+        num_imgs, num_gts, num_dts, num_chunks = 0, 0, 0, 0
+        self.is_evaluated = True
+        for img_ids, chunk_gts, chunk_dts in iter_image_chunks(gts, dts, chunk_size):
+            # Same areas and ids as build_detections, numbered over all chunks.
+            for id, dt in enumerate(chunk_dts, num_dts + 1):
+                dt['area'] = dt['bbox'][2] * dt['bbox'][3]
+                dt['id'] = id
+
+            storeGt = AnnStore.from_anns(chunk_gts)
+            storeDt = AnnStore.from_anns(chunk_dts)
+            if self.eval_images(storeGt, storeDt, img_ids, workers, spatial_index) == False:
+                self.is_evaluated = False
+                break
+            self.spill(writer, storeGt, storeDt)
+
+            num_imgs += len(img_ids)
+            num_gts += len(storeGt)
+            num_dts += len(storeDt)
+            num_chunks += 1
+
+        header = {"licenses": "", "info": "", "categories": _categories(self.cocoGt), "images": [],
+                  "params": param2dict(self.params), "segment_info": ""}
+        writer.close({'header': to_bytes(header)})
+        profile_count(self, images=num_imgs, gts=num_gts,
+                      dts=num_dts, chunks=num_chunks)
+
+    def spill(self, writer: NpzColumnWriter, storeGt: AnnStore, storeDt: AnnStore) -> None:
+        """Append the columns of the evaluations of a chunk to the middle file.
+
+        Args:
+            writer (NpzColumnWriter): Writer of the middle file
+            storeGt (AnnStore): Ground truth store of the chunk
+            storeDt (AnnStore): Detection store of the chunk
+        """
+        # A chunk without images to sweep still has the columns of the sweeps, so that all chunks have the same columns.
+        if self.params.iou_threshs is not None:
+            for store in [storeGt, storeDt]:
+                store.update_eval_sweep(np.zeros(0, dtype=np.int64), np.zeros(
+                    (0, len(self.params.iou_threshs)), dtype=np.int8))
+        if getattr(self.params, 'score_threshs', None) is not None:
+            storeGt.update_type_scores(
+                np.zeros(0, dtype=np.int64), np.zeros((0, 4)))
+
+        for prefix, store in [('gt', storeGt), ('dt', storeDt)]:
+            for column in SPILL_COLUMNS[prefix]:
+                if getattr(store, column) is not None:
+                    writer.append(prefix + '_' + column, getattr(store, column))
+
+
+def argparser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('gt', help='gts sorted by image id, .jsonl or JSON array')
+    parser.add_argument('dt', help='dts sorted by image id, .jsonl or JSON array')
+    parser.add_argument('categories', help='JSON file which has "categories", e.g. a small COCO ground truth')
+    parser.add_argument('result_dir')
+    parser.add_argument('--chunk_size', type=int, default=1000,
+                        help='number of images evaluated at once')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes to evaluate a chunk')
+    parser.add_argument('--spatial_index', action='store_true',
+                        help='calculate IoU only for overlapping boxes, for images with thousands of boxes')
+    parser.add_argument('--middle_file', default='middle_file.npz',
+                        help='middle file name, always npz')
+    return parser.parse_args()
+
+
+def main():
+    args = argparser()
+    with open(args.categories) as fr:
+        cats = json_backend.load(fr)['categories']
+
+    p = COCOParams(iou_thresh=0.5, iou_loc=0.2)
+    cocoChunk = COCOChunkEvaluator(
+        args.gt, args.dt, cats, args.result_dir, p)
+    cocoChunk.evaluate(args.middle_file, args.chunk_size,
+                       args.workers, args.spatial_index)
+
+    cocoCalc = COCOCalculator(os.path.join(
+        args.result_dir, args.middle_file), args.result_dir, args.result_dir, COCOParams())
+    cocoCalc.calculate()
+    cocoCalc.dump_final_results_json()
+
+
+if __name__ == '__main__':
+    main()
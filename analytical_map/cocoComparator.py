@@ -0,0 +1,194 @@
+import numpy as np
+import os
+import copy
+import argparse
+
+from analytical_map.params import COCOParams
+from analytical_map.tools.dump_json import dump_final_results_json as _dump_final_results_json
+from analytical_map.tools.ann_store import AnnStore
+from analytical_map.tools.load_json import load_ground_truth, load_detections, expand_paths
+from analytical_map.cocoEvaluator import COCOEvaluator
+from analytical_map.cocoCalculator import COCOCalculator
+from analytical_map.cocoVisualizer import COCOVisualizer
+
+
+class COCOComparator(COCOEvaluator, COCOCalculator):
+    def __init__(self, cocoGt_file: str, cocoDt_files: dict, result_dir: str, params: COCOParams, load_workers: int = 1) -> None:
+        """Init
+
+        Ground truth is loaded and indexed once, and shared by all models.
+
+        Args:
+            cocoGt_file (str): COCO ground truth path, a directory of shards or a glob pattern
+            cocoDt_files (dict): {model name: COCO detection file path, a directory of shards or a glob pattern}. The first model is the baseline of deltas.
+            result_dir (str): Output path
+            params (COCOParams): Parameters for evaluations and calculations
+            load_workers (int, optional): Number of processes to parse shards of the ground truth and of each model. Defaults to 1.
+        """
+
+        self.params = params
+
+        # Input
+        assert all([os.path.isfile(f) for f in expand_paths(cocoGt_file)])
+        assert all([len(expand_paths(f)) > 0 and all([os.path.isfile(shard) for shard in expand_paths(f)])
+                    for f in cocoDt_files.values()])
+        self.load_workers = load_workers
+        self.cocoGt = load_ground_truth(cocoGt_file, load_workers)
+        self.cocoDt = None
+        self.cats = self.cocoGt.loadCats(self.cocoGt.getCatIds())
+        # Evaluations of gts are copied from this store for each model.
+        self.storeGt_init = AnnStore.from_anns(
+            self.cocoGt.dataset['annotations'])
+        self.storeGt = None
+        self.storeDt = None
+        # Categories and areas of gts are the same for all models, so indexGt is shared.
+        self.indexGt = None
+        self.indexDt = None
+        self.profiler = None
+        self.cache = None
+        self.cocoDt_files = cocoDt_files
+
+        self.result_dir = result_dir
+
+        # Fixed variables
+        self.type = ['Match', 'LC', 'DC', 'Cls', 'Loc', 'Bkg', 'Miss']
+        self.type_order = {'Match': 0, 'LC': 1, 'DC': 1,
+                           'Cls': 2, 'Loc': 3, 'Bkg': 4, 'Miss': 4, None: 5}
+        self.area_all = [0, 10000000000.0]
+        self.results = {'precision': [], 'recall': [], 'ap': []}
+        self.model_results = {}
+
+        self.is_evaluated = False
+        self.is_ap_calculated = False
+        self.is_precision_calculated = False
+        self.is_recall_calculated = False
+
+        self.params.area_rng = np.insert(
+            params.area_rng, 0, self.area_all, axis=0)
+
+    def compare(self, workers: int = 1, dump_per_model: bool = False) -> dict:
+        """Evaluate and calculate all models against the shared ground truth.
+
+        Args:
+            workers (int, optional): Number of processes to evaluate each model. Defaults to 1.
+            dump_per_model (bool, optional): Dump the middle file and final results of each model into result_dir/<model name>. Defaults to False.
+
+        Returns:
+            dict: Comparison results
+        """
+        for name, cocoDt_file in self.cocoDt_files.items():
+            self.cocoDt = load_detections(
+                self.cocoGt, cocoDt_file, self.params.score_thresh, self.load_workers)
+            self.storeGt = copy.deepcopy(self.storeGt_init)
+            self.storeDt = AnnStore.from_anns(
+                self.cocoDt.dataset['annotations'])
+            self.indexDt = None
+
+            self.is_evaluated = False
+            self.evaluate(workers=workers)
+            self.results = {'precision': [], 'recall': [], 'ap': []}
+            self.calculate()
+            self.model_results[name] = self.results
+
+            if dump_per_model:
+                # Dump functions write into self.result_dir.
+                result_dir = self.result_dir
+                self.result_dir = os.path.join(result_dir, name)
+                self.dump_middle_file('middle_file.json')
+                self.dump_final_results_json('final_results.json')
+                self.result_dir = result_dir
+
+        self.results = self.compare_results()
+        return self.results
+
+    def compare_results(self) -> dict:
+        """Put the results of models side by side with their deltas from the first model.
+
+        Returns:
+            dict: {'models', 'baseline', 'precision', 'recall', 'ap'}
+        """
+        names = list(self.model_results.keys())
+        base = names[0]
+        comparison = {'models': names, 'baseline': base}
+
+        for key in ['precision', 'recall']:
+            comparison[key] = []
+            for id_row, row in enumerate(self.model_results[base][key]):
+                rows = {name: self.model_results[name][key][id_row]
+                        for name in names}
+                comparison[key].append({'category': row['category'],
+                                        'score': {name: r['score'] for name, r in rows.items()},
+                                        'ratio': {name: r['ratio'] for name, r in rows.items()},
+                                        'score_delta': {name: round(r['score'] - row['score'], 3) for name, r in rows.items()},
+                                        'ratio_delta': {name: {t: round(v - row['ratio'][t], 3) for t, v in r['ratio'].items()} for name, r in rows.items()}})
+
+        comparison['ap'] = []
+        for id_row, row in enumerate(self.model_results[base]['ap']):
+            rows = {name: self.model_results[name]['ap'][id_row]
+                    for name in names}
+            comparison['ap'].append({'category': row['category'], 'area': row['area'],
+                                     'ap': {name: r['ap'] for name, r in rows.items()},
+                                     'ratio': {name: r['ratio'] for name, r in rows.items()},
+                                     'ap_delta': {name: round(r['ap'] - row['ap'], 3) for name, r in rows.items()},
+                                     'ratio_delta': {name: {t: round(v - row['ratio'][t], 3) for t, v in r['ratio'].items()} for name, r in rows.items()},
+                                     'recall_inter': row['recall_inter'],
+                                     'prec_inter': {name: r['prec_inter'] for name, r in rows.items()}})
+        return comparison
+
+    def dump_comparison_results_json(self, comparison_file: str = 'comparison_results.json') -> None:
+        """Dump comparison results
+
+        Args:
+            comparison_file (str, optional): Comparison result file's name. Defaults to 'comparison_results.json'.
+        """
+        _dump_final_results_json(
+            self.cocoGt, self.params, self.results, self.result_dir, comparison_file)
+
+
+def argparser():
+    parser = argparse.ArgumentParser(
+        description='cocoComparator')
+
+    parser.add_argument('gt')
+    parser.add_argument('result_dir')
+    parser.add_argument('dts', nargs='+',
+                        help='detection files, or name=path. The first one is the baseline.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of processes for evaluation and drawing figures')
+    parser.add_argument('--load_workers', type=int, default=1,
+                        help='number of processes for parsing shards of the gt and dts')
+    parser.add_argument('--dump_per_model', action='store_true',
+                        help='dump the middle file and final results of each model')
+    parser.add_argument('--page_size', type=int, default=None,
+                        help='maximum number of figures in one HTML, pages are linked from the first HTML')
+
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = argparser()
+
+    cocoDt_files = {}
+    for dt in args.dts:
+        name, path = dt.split('=', 1) if '=' in dt else (
+            os.path.splitext(os.path.basename(dt))[0], dt)
+        assert name not in cocoDt_files, 'Duplicate model name ' + name
+        cocoDt_files[name] = path
+
+    p = COCOParams(iou_thresh=0.5, iou_loc=0.2, recall_inter=np.arange(
+        0, 1.01, 0.1), area_rng=np.array([[0, 1024], [1024, 9216], [9216, 10000000000.0]]))
+    cocoComp = COCOComparator(
+        args.gt, cocoDt_files, args.result_dir, p, args.load_workers)
+    cocoComp.compare(workers=args.workers,
+                     dump_per_model=args.dump_per_model)
+    cocoComp.dump_comparison_results_json('comparison_results.json')
+
+    # The comparison results are drawn by COCOVisualizer like final results.
+    cocoVis = COCOVisualizer(None, os.path.join(
+        args.result_dir, 'comparison_results.json'), args.result_dir, None)
+    cocoVis.visualize(workers=args.workers, page_size=args.page_size)
+
+
+if __name__ == '__main__':
+    main()
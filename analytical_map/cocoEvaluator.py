@@ -1,29 +1,56 @@
-from pycocotools.coco import COCO
 import numpy as np
 import os
 from nptyping import NDArray
-import copy
+from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor
 from analytical_map.params import COCOParams
 from analytical_map.tools.dump_json import dump_middle_file_json as _dump_middle_file_json
+from analytical_map.tools.matching import match_per_img, match_per_img_sweep, match_per_img_scores, MATCH, FP, FN
+from analytical_map.tools.ann_store import AnnStore
+from analytical_map.tools.load_json import load_ground_truth, load_detections, load_middle_file, expand_paths
+from analytical_map.tools.middle_file_npz import dump_middle_file_npz as _dump_middle_file_npz
+from analytical_map.tools.profiler import profiled, profile_stage, profile_count, num_iou_pairs
+from analytical_map.tools.result_cache import ResultCache, EVAL_PARAMS, eval_params
+from analytical_map.tools.fingerprint import unchanged_images, corresponding_rows, copy_evaluations
+
+
+def _match_per_img(task: tuple) -> tuple:
+    return match_per_img(*task)
+
+
+def _match_per_img_sweep(task: tuple) -> tuple:
+    return match_per_img_sweep(*task)
+
+
+def _match_per_img_scores(task: tuple) -> tuple:
+    return match_per_img_scores(*task)
 
 
 class COCOEvaluator():
-    def __init__(self, cocoGt_file: str, cocoDt_file: str, result_dir: str, params: COCOParams) -> None:
+    def __init__(self, cocoGt_file: str, cocoDt_file: str, result_dir: str, params: COCOParams, load_workers: int = 1) -> None:
         """Init
 
         Args:
-            cocoGt_file (str): COCO ground truth path
-            cocoDt_file (str): COCO detection file path
+            cocoGt_file (str): COCO ground truth path, a directory of shards or a glob pattern
+            cocoDt_file (str): COCO detection file path, '.jsonl' file, a directory of shards or a glob pattern
             result_dir (str): Output path
             params (COCOParams): Parameters for evaluations
+            load_workers (int, optional): Number of processes to parse shards, not the ones of evaluate. Defaults to 1.
         """
 
+        # User variables
+        self.params = params
+
         # Input
         self.cocoGt = None
         self.cocoDt = None
+        self.storeGt = None
+        self.storeDt = None
         self.cats = None
+        self.profiler = None
+        self.cache = None
         assert self.init_coco(
-            cocoGt_file, cocoDt_file)
+            cocoGt_file, cocoDt_file, load_workers)
 
         self.result_dir = result_dir
 
@@ -34,37 +61,35 @@ class COCOEvaluator():
 
         self.is_evaluated = False
 
-        # User variables
-        self.params = params
-
-    def init_coco(self, cocoGt_file: str, cocoDt_file: str) -> bool:
+    @profiled
+    def init_coco(self, cocoGt_file: str, cocoDt_file: str, load_workers: int = 1) -> bool:
         """Initialize coco data
 
         Args:
-            cocoGt_file (str): COCO ground truth path
-            cocoDt_file (str): COCO detection file path
+            cocoGt_file (str): COCO ground truth path, a directory of shards or a glob pattern
+            cocoDt_file (str): COCO detection file path, '.jsonl' file, a directory of shards or a glob pattern
+            load_workers (int, optional): Number of processes to parse shards, not the ones of evaluate. Defaults to 1.
 
         Returns:
             boo: True if cocoGt and cocoDt exist.
         """
         if cocoGt_file is not None and cocoDt_file is not None:
-            if os.path.isfile(cocoGt_file) and os.path.isfile(cocoDt_file):
-                cocoGt = COCO(cocoGt_file)
-                _cocoDt = cocoGt.loadRes(cocoDt_file)
-                dts_tmp = [dt for dt in _cocoDt.dataset['annotations']
-                           if dt['score'] >= self.params.score_thresh]  # remove low scores
-                cocoDt = cocoGt.loadRes(dts_tmp)
-
-                eval_dict = {'eval': {'count': None,
-                                      'type': None, 'corr_id': None, 'iou': None}}
-                _gts = cocoGt.loadAnns(cocoGt.getAnnIds())
-                _dts = cocoDt.loadAnns(cocoDt.getAnnIds())
-                # print(_dts)
-                _ = [g.update(eval_dict) for g in _gts]
-                _ = [d.update(eval_dict) for d in _dts]
+            gt_files, dt_files = expand_paths(cocoGt_file), expand_paths(cocoDt_file)
+            if len(gt_files) > 0 and len(dt_files) > 0 and all([os.path.isfile(f) for f in gt_files + dt_files]):
+                cocoGt = load_ground_truth(cocoGt_file, load_workers)
+                cocoDt = load_detections(
+                    cocoGt, cocoDt_file, self.params.score_thresh, load_workers)
+
                 self.cocoGt = cocoGt
                 self.cocoDt = cocoDt
+                self.cocoGt_file = cocoGt_file
+                self.cocoDt_file = cocoDt_file
+                # Evaluations are kept in columnar stores, not in the annotation dicts.
+                self.storeGt = AnnStore.from_anns(cocoGt.dataset['annotations'])
+                self.storeDt = AnnStore.from_anns(cocoDt.dataset['annotations'])
                 self.cats = self.cocoGt.loadCats(self.cocoGt.getCatIds())
+                profile_count(self, images=len(cocoGt.getImgIds()), gts=len(self.storeGt),
+                              dts=len(self.storeDt))
                 return True
             else:
                 print('ERROR:Could not read files')
@@ -73,30 +98,191 @@ class COCOEvaluator():
             print('ERROR:Could not read files')
             return False
 
-    def evaluate(self) -> None:
+    def use_cache(self, cache_dir: str = None, max_mb: float = 1024) -> None:
+        """Cache evaluations and final results keyed by hashes of the ground truth, the detections and the params.
+
+        Args:
+            cache_dir (str, optional): Cache directory. Defaults to result_dir/cache.
+            max_mb (float, optional): Maximum size of the cache directory in MB. Defaults to 1024.
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(self.result_dir, 'cache')
+        self.cache = ResultCache(cache_dir, self.cocoGt_file,
+                                 self.cocoDt_file, self.params, max_mb)
+
+    @profiled
+    def evaluate(self, workers: int = 1, spatial_index: bool = False, prev_middle_file: str = None) -> None:
         """ Evaluate all images by repeating eval_per_img for all images.
+
+        If the cache is used, a cached evaluation of the same files and params is loaded instead.
+
+        Args:
+            workers (int, optional): Number of processes. Images are sharded across a process pool if it is more than 1. Defaults to 1.
+            spatial_index (bool, optional): Calculate IoU only for overlapping boxes found with a grid, for dense images. Results are the same. Defaults to False.
+            prev_middle_file (str, optional): Middle file of a previous evaluation. Evaluations of images whose gts and dts are the same are copied from it,
+                and only the other images are evaluated. Defaults to None.
         """
         if self.is_evaluated == False:
+            cache = getattr(self, 'cache', None)
+            if cache is not None and cache.load_evaluation(self.storeGt, self.storeDt):
+                profile_count(self, cached=1)
+                self.is_evaluated = True
+                return
             img_ids = self.cocoGt.getImgIds()
-            for img_id in img_ids:
-                if self.eval_per_img(self.cocoGt, self.cocoDt, img_id,
-                                     self.type_order, self.params.iou_thresh, self.params.iou_loc) == False:
-                    self.is_evaluated = False
-                    break
-            self.is_evaluated = True
+            if prev_middle_file is not None:
+                img_ids = self.reuse_evaluations(prev_middle_file, img_ids)
+            if getattr(self, 'profiler', None) is not None:
+                gt_image_ids, dt_image_ids = self.storeGt.image_id, self.storeDt.image_id
+                if prev_middle_file is not None:
+                    # IoUs are calculated only for the images which are evaluated again.
+                    gt_image_ids = gt_image_ids[np.isin(gt_image_ids, img_ids)]
+                    dt_image_ids = dt_image_ids[np.isin(dt_image_ids, img_ids)]
+                profile_count(self, images=len(img_ids), gts=len(self.storeGt), dts=len(self.storeDt),
+                              iou_pairs=num_iou_pairs(gt_image_ids, dt_image_ids))
+            with profile_stage(self, 'eval_per_img'):
+                self.is_evaluated = self.eval_images(
+                    self.storeGt, self.storeDt, img_ids, workers, spatial_index)
+            if cache is not None and self.is_evaluated:
+                cache.save_evaluation(self.storeGt, self.storeDt)
         else:
             print("Already evaluated")
 
-    def eval_per_img(self, cocoGt: COCO, cocoDt: COCO, imgId: list, type_order: dict, iou_thresh: float, iou_loc: float) -> bool:
+    @profiled
+    def reuse_evaluations(self, prev_middle_file: str, img_ids: list) -> list:
+        """Copy evaluations of unchanged images from a previous middle file.
+
+        Images are compared by fingerprints of their gts and dts, and nothing is copied if the params of the evaluation differ.
+
+        Args:
+            prev_middle_file (str): Path of the previous middle file
+            img_ids (list): Image Ids
+
+        Returns:
+            list: Image Ids which have to be evaluated
+        """
+        middle = load_middle_file(prev_middle_file)
+        if middle is None:
+            print('ERROR:Previous middle file is not evaluated', prev_middle_file)
+            return img_ids
+        prevGt, prevDt = middle[0], middle[1]
+        prevStoreGt, prevStoreDt = middle[2], middle[3]
+
+        params, prev_params = eval_params(
+            self.params), prevGt.dataset.get('params', {})
+        is_same = all([params[k] == prev_params.get(k) for k in EVAL_PARAMS]) and \
+            params['type_scores'] == (prevStoreGt.type_scores is not None)
+        if not is_same:
+            print('Params differ from the previous middle file, evaluating all images')
+            return img_ids
+
+        unchanged = unchanged_images(self.storeGt, self.storeDt,
+                                     prevStoreGt, prevStoreDt, img_ids)
+        gt_rows, prev_gt_rows = corresponding_rows(
+            self.storeGt, prevStoreGt, unchanged)
+        dt_rows, prev_dt_rows = corresponding_rows(
+            self.storeDt, prevStoreDt, unchanged)
+        copy_evaluations(self.storeGt, prevStoreGt, gt_rows, prev_gt_rows,
+                         self.storeDt, prevStoreDt, dt_rows, prev_dt_rows)
+        copy_evaluations(self.storeDt, prevStoreDt, dt_rows, prev_dt_rows,
+                         self.storeGt, prevStoreGt, gt_rows, prev_gt_rows)
+
+        unchanged = set(unchanged)
+        changed = [img_id for img_id in img_ids if img_id not in unchanged]
+        profile_count(self, images=len(changed), reused=len(unchanged))
+        return changed
+
+    def eval_images(self, storeGt: AnnStore, storeDt: AnnStore, imgIds: list, workers: int = 1, spatial_index: bool = False) -> bool:
+        """Evaluate images with the params, serially or with a process pool.
+
+        Args:
+            storeGt (AnnStore): Ground truth store
+            storeDt (AnnStore): Detection store
+            imgIds (list): Image Ids
+            workers (int, optional): Number of processes. Defaults to 1.
+            spatial_index (bool, optional): Calculate IoU only for overlapping boxes. Defaults to False.
+
+        Returns:
+            bool: True if all images are evaluated correctly.
+        """
+        # Gts record the scores which decide their types at score thresholds.
+        score_sweep = getattr(self.params, 'score_threshs', None) is not None
+        if workers > 1:
+            return self.eval_parallel(storeGt, storeDt, imgIds, self.type_order,
+                                      self.params.iou_thresh, self.params.iou_loc, workers, self.params.iou_threshs, spatial_index, score_sweep)
+        for img_id in imgIds:
+            if self.eval_per_img(storeGt, storeDt, img_id,
+                                 self.type_order, self.params.iou_thresh, self.params.iou_loc, self.params.iou_threshs, spatial_index, score_sweep) == False:
+                return False
+        return True
+
+    def eval_parallel(self, storeGt: AnnStore, storeDt: AnnStore, imgIds: list, type_order: dict, iou_thresh: float, iou_loc: float, workers: int, iou_threshs: NDArray = None, spatial_index: bool = False, score_sweep: bool = False) -> bool:
+        """Evaluate images with a process pool.
+
+        Each worker receives only box and category arrays of its images, and the results are
+        written back in the order of imgIds, so that the results are the same as eval_per_img.
+
+        Args:
+            storeGt (AnnStore): Ground truth store
+            storeDt (AnnStore): Detection store
+            imgIds (list): Image Ids
+            type_order (dict): type_order
+            iou_thresh (float): Threshold for IoU
+            iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+            workers (int): Number of processes
+            iou_threshs (NDArray, optional): Thresholds for IoU to sweep. Defaults to None.
+            spatial_index (bool, optional): Calculate IoU only for overlapping boxes. Defaults to False.
+            score_sweep (bool, optional): Record the scores which decide types of gts at score thresholds. Defaults to False.
+
+        Returns:
+            bool: True if all images are evaluated correctly.
+        """
+        if type_order != {'Match': 0, 'LC': 1, 'DC': 1, 'Cls': 2, 'Loc': 3, 'Bkg': 4, 'Miss': 4, None: 5}:
+            print('ERROR:Eval parallel, type order', type_order)
+            return False
+
+        anns_per_img = [self.load_per_img(storeGt, storeDt, img_id)
+                        for img_id in imgIds]
+        if score_sweep:
+            match = _match_per_img_scores
+            tasks = [arrays + (iou_thresh, iou_loc, iou_threshs, spatial_index)
+                     for _, _, arrays in anns_per_img]
+        elif iou_threshs is None:
+            match = _match_per_img
+            tasks = [arrays + (iou_thresh, iou_loc, spatial_index)
+                     for _, _, arrays in anns_per_img]
+        else:
+            match = _match_per_img_sweep
+            tasks = [arrays + (iou_thresh, iou_loc, iou_threshs, spatial_index)
+                     for _, _, arrays in anns_per_img]
+
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(match, tasks, chunksize=chunksize)
+            for (gt_rows, dt_rows, _), result in zip(anns_per_img, results):
+                if score_sweep:
+                    self.update_per_img(
+                        storeGt, storeDt, gt_rows, dt_rows, *result)
+                elif iou_threshs is None:
+                    self.update_per_img(
+                        storeGt, storeDt, gt_rows, dt_rows, result)
+                else:
+                    self.update_per_img(
+                        storeGt, storeDt, gt_rows, dt_rows, result[0], result[1:])
+        return True
+
+    def eval_per_img(self, storeGt: AnnStore, storeDt: AnnStore, imgId: int, type_order: dict, iou_thresh: float, iou_loc: float, iou_threshs: NDArray = None, spatial_index: bool = False, score_sweep: bool = False) -> bool:
         """Evaluate bounding boxes in one image.
 
         Args:
-            cocoGt (COCO): COCO ground truth instance
-            cocoDt (COCO): COCO detection instance
-            imgId (list): Image Id
+            storeGt (AnnStore): Ground truth store
+            storeDt (AnnStore): Detection store
+            imgId (int): Image Id
             type_order (dict): type_order
             iou_thresh (float): Threshold for IoU
             iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+            iou_threshs (NDArray, optional): Thresholds for IoU to sweep. Defaults to None.
+            spatial_index (bool, optional): Calculate IoU only for overlapping boxes. Defaults to False.
+            score_sweep (bool, optional): Record the scores which decide types of gts at score thresholds. Defaults to False.
 
         Returns:
             bool: True if eval_per_img is done correctly.
@@ -106,156 +292,93 @@ class COCOEvaluator():
             print('ERROR:Eval per image, type order', type_order)
             return False
 
-        # Load all gts and dts in the image.
-        Id_gts = cocoGt.getAnnIds(imgIds=imgId, iscrowd=None)
-        Id_dts = cocoDt.getAnnIds(imgIds=imgId, iscrowd=None)
-        gts = cocoGt.loadAnns(Id_gts)
-        dts = cocoDt.loadAnns(Id_dts)
-
-        # Sort detections by score
-        inds = np.argsort([-d['score'] for d in dts], kind='mergesort')
-        dts = [dts[i] for i in inds]
-
-        exist_gts = bool(gts)
-        exist_dts = bool(dts)
-
-        if exist_gts and exist_dts:
-
-            for gt in gts:
-
-                bb_gt = np.array(gt["bbox"])
-                bb_dts = np.array([dt["bbox"] for dt in dts])
-
-                # Calculate IoU of one gt and all dts in the image.
-                # iou : np.array(NUM_DTS)
-                iou = self.iou_per_single_gt(bb_gt, bb_dts)
-
-                # Match boolean for all categories.
-                bool_iou_all = iou >= iou_thresh
-                # Loc boolean for all categories.
-                bool_loc_all = np.logical_and(
-                    iou >= iou_loc, iou < iou_thresh)
-
-                # Category match boolean. bool_cat_all:np.array(NUM_DTS)
-                cat_gt = np.array(gt['category_id'])
-                cat_dts = np.array([dt['category_id'] for dt in dts])
-                bool_cat_all = cat_dts == cat_gt
-
-                # Matched ids
-                Match_boolean = np.logical_and(
-                    bool_cat_all, bool_iou_all)
-
-                # loc ids
-                Loc_boolean = np.logical_and(
-                    bool_loc_all, bool_cat_all)
-
-                # Category match ids
-                Cat_boolean = np.logical_and(
-                    bool_iou_all, np.logical_not(Match_boolean))
-
-                # Match, DC, FC
-                id_dets_match = np.where(Match_boolean == True)[0]
-                for id_det in id_dets_match:
-                    dt = dts[id_det]
-                    # TP if gt is not assinged and dt is not TP-
-                    if gt['eval']['type'] != "Match" and dt['eval']['type'] != "Match":
-                        dt['eval'] = {"count": "TP", "type": "Match",
-                                      "corr_id": gt['id'], 'iou': iou[id_det]}
-                        gt['eval'] = {"count": "TP", "type": "Match",
-                                      "corr_id": dt['id'], 'iou': iou[id_det]}
-                        continue
-                    # Double count if gt_assigned is assigned
-                    elif gt['eval']['type'] == "Match" and dt['eval']['type'] != "Match":
-                        dt['eval'] = {"count": "FP", "type": "DC",
-                                      "corr_id": gt['id'], 'iou': iou[id_det]}
-                    # Less count(LC) if all detections are already assigned
-                    if id_det == id_dets_match[-1]:
-                        if gt['eval']['type'] != "Match" and dt['eval']['type'] == "Match":
-                            gt['eval'] = {
-                                "count": "FN", "type": "LC", "corr_id": dts[id_dets_match[0]]['id'], 'iou': iou[id_det]}
-
-                # Cls
-                id_dets_cat = np.where(Cat_boolean == True)[0]
-                for id_det in id_dets_cat:
-                    dt = dts[id_det]
-                    if type_order[dt['eval']['type']] > type_order['Cls']:
-                        dt['eval'] = {"count": "FP", "type": "Cls",
-                                      "corr_id": gt['id'], 'iou': iou[id_det]}
-                    if type_order[gt['eval']['type']] > type_order['Cls']:
-                        gt['eval'] = {"count": "FN", "type": "Cls",
-                                      "corr_id": dt['id'], 'iou': iou[id_det]}
-
-                # Loc
-                id_dets_loc = np.where(Loc_boolean == True)[0]
-                for id_det in id_dets_loc:
-                    dt = dts[id_det]
-                    if type_order[dt['eval']['type']] > type_order['Loc']:
-                        dt['eval'] = {"count": "FP", "type": "Loc",
-                                      "corr_id": gt['id'], 'iou': iou[id_det]}
-                    if type_order[gt['eval']['type']] > type_order['Loc']:
-                        gt['eval'] = {"count": "FN", "type": "Loc",
-                                      "corr_id": dt['id'], 'iou': iou[id_det]}
-
-                # No match
-                if type_order[gt['eval']['type']] >= type_order[None]:
-                    gt['eval'] = {"count": "FN", "type": "Miss",
-                                  "corr_id": None, 'iou': None}
-
-            # Bkg, if detections are not assigned yet
-            for dt in dts:
-                if type_order[dt['eval']['type']] > type_order[None]:
-                    dt['eval'] = {"count": "FP", "type": "Bkg",
-                                  "corr_id": None, 'iou': None}
-
+        gt_rows, dt_rows, arrays = self.load_per_img(storeGt, storeDt, imgId)
+        if score_sweep:
+            self.update_per_img(storeGt, storeDt, gt_rows, dt_rows, *match_per_img_scores(
+                *arrays, iou_thresh, iou_loc, iou_threshs, spatial_index))
+        elif iou_threshs is None:
+            self.update_per_img(storeGt, storeDt, gt_rows, dt_rows, match_per_img(
+                *arrays, iou_thresh, iou_loc, spatial_index))
         else:
-            # Miss if there are gts but no dts exist.
-            if exist_gts and not exist_dts:
-                for gt in gts:
-                    gt['eval'] = {"count": "FN", "type": "Miss",
-                                  "corr_id": None, 'iou': None}
-            # Bkg, if dts exist but no gts exist.
-            elif not exist_gts and exist_dts:
-                for dt in dts:
-                    dt['eval'] = {"count": "FP", "type": "Bkg",
-                                  "corr_id": None, 'iou': None}
+            result, gt_types, dt_types = match_per_img_sweep(
+                *arrays, iou_thresh, iou_loc, iou_threshs, spatial_index)
+            self.update_per_img(storeGt, storeDt, gt_rows,
+                                dt_rows, result, (gt_types, dt_types))
         return True
 
-    def iou_per_single_gt(self, gt_bb: NDArray, dt_bbs: NDArray) -> NDArray:
-        """Calculate IoU between one gt and multiple dts.
+    def load_per_img(self, storeGt: AnnStore, storeDt: AnnStore, imgId: int) -> Tuple[NDArray, NDArray, tuple]:
+        """Find gts and dts in one image, and build their box and category arrays.
 
         Args:
-            gt_bb (NDArray): 1x1 Bounding boxes of gts
-            dt_bbs (NDArray): NUM_dts Bounding boxes of dts
+            storeGt (AnnStore): Ground truth store
+            storeDt (AnnStore): Detection store
+            imgId (int): Image Id
 
         Returns:
-            NDArray: IoU(Num_dts)
+            Tuple[NDArray, NDArray, tuple]: Rows of gts, rows of dts sorted by score, and (gt_bbs, gt_cats, dt_bbs, dt_cats)
         """
+        gt_rows = storeGt.rows_per_img(imgId)
+        dt_rows = storeDt.rows_per_img(imgId)
 
-        gt_area = (gt_bb[2] + 1) \
-            * (gt_bb[3] + 1)
+        # Sort detections by score
+        inds = np.argsort(-storeDt.score[dt_rows], kind='mergesort')
+        dt_rows = dt_rows[inds]
 
-        dt_areas = (dt_bbs[:, 2] + 1) \
-            * (dt_bbs[:, 3] + 1)
+        return gt_rows, dt_rows, (storeGt.bbox[gt_rows], storeGt.category_id[gt_rows],
+                                  storeDt.bbox[dt_rows], storeDt.category_id[dt_rows])
 
-        abx_min = np.maximum(gt_bb[0], dt_bbs[:, 0])  # xmin
-        aby_min = np.maximum(gt_bb[1], dt_bbs[:, 1])  # ymin
-        abx_max = np.minimum(gt_bb[0] + gt_bb[2],
-                             dt_bbs[:, 0] + dt_bbs[:, 2])  # xmax
-        aby_max = np.minimum(gt_bb[1] + gt_bb[3],
-                             dt_bbs[:, 1] + dt_bbs[:, 3])  # ymax
+    def update_per_img(self, storeGt: AnnStore, storeDt: AnnStore, gt_rows: NDArray, dt_rows: NDArray, result: tuple, types_sweep: tuple = None, gt_type_dts: NDArray = None) -> None:
+        """Write the result of match_per_img into the stores.
 
-        w = np.maximum(0, abx_max - abx_min + 1)
-        h = np.maximum(0, aby_max - aby_min + 1)
-        intersect = w*h
+        Args:
+            storeGt (AnnStore): Ground truth store
+            storeDt (AnnStore): Detection store
+            gt_rows (NDArray): Rows of gts in one image
+            dt_rows (NDArray): Rows of dts in one image sorted by score
+            result (tuple): Result of match_per_img
+            types_sweep (tuple, optional): Type codes of gts and dts for IoU thresholds of a sweep. Defaults to None.
+            gt_type_dts (NDArray, optional): Dts which make gts LC, Cls and Loc, the result of type_dts_pairs. Defaults to None.
+        """
+        gt_type, gt_corr, gt_iou, dt_type, dt_corr, dt_iou = result
+
+        storeGt.update_eval(gt_rows, gt_type, FN,
+                            storeDt.id[dt_rows], gt_corr, gt_iou)
+        storeDt.update_eval(dt_rows, dt_type, FP,
+                            storeGt.id[gt_rows], dt_corr, dt_iou)
+
+        if types_sweep is not None:
+            storeGt.update_eval_sweep(gt_rows, types_sweep[0])
+            storeDt.update_eval_sweep(dt_rows, types_sweep[1])
+
+        if gt_type_dts is not None:
+            # -1 indexes the appended nan.
+            dt_scores = np.append(storeDt.score[dt_rows], np.nan)
+            match_dts = np.where(gt_type == MATCH, gt_corr, -1)
+            storeGt.update_type_scores(gt_rows, dt_scores[np.column_stack(
+                [match_dts, gt_type_dts])])
+
+    @profiled
+    def dump_middle_file_json(self, middle_file: str = 'middle_file.json', compact: bool = False):
+        """Dump a middle file containing dts, gts with count and types. It is gzipped if the name ends with '.gz',
+        and written without indents and spaces if compact.
+        """
+        _dump_middle_file_json(self.cocoGt, self.cocoDt, self.storeGt, self.storeDt,
+                               self.params, self.result_dir, middle_file, compact)
 
-        iou = intersect / (gt_area + dt_areas - intersect)
-        return iou
+    @profiled
+    def dump_middle_file_npz(self, middle_file: str = 'middle_file.npz'):
+        """Dump a middle file as columnar arrays, which can be memory-mapped.
+        """
+        _dump_middle_file_npz(self.cocoGt, self.cocoDt, self.storeGt, self.storeDt,
+                              self.params, self.result_dir, middle_file)
 
-    def dump_middle_file_json(self, middle_file: str = 'middle_file.json'):
-        """Dump a middle file containing dts, gts with count and types.
+    def dump_middle_file(self, middle_file: str = 'middle_file.json', compact: bool = False):
+        """Dump a middle file. The format is selected by the extension, '.npz', '.json' or '.json.gz'.
         """
-        _dump_middle_file_json(self.cocoGt, self.cocoDt,
-                               self.params, self.result_dir, middle_file)
+        if os.path.splitext(middle_file)[1] == '.npz':
+            self.dump_middle_file_npz(middle_file)
+        else:
+            self.dump_middle_file_json(middle_file, compact)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,198 @@
+from pycocotools.coco import COCO
+import numpy as np
+import os
+import copy
+
+from analytical_map.params import COCOParams
+from analytical_map.tools.dump_json import dump_final_results_json as _dump_final_results_json
+from analytical_map.tools.matching import match_per_img, TYPES, MATCH, NONE, TP, FP
+from analytical_map.tools.cat_area_index import CatAreaIndex
+from analytical_map.tools.metrics import count_results, ap_result, area_names
+
+
+class COCOStreamEvaluator():
+    def __init__(self, categories: list, params: COCOParams) -> None:
+        """Init
+
+        Images are evaluated one by one with add_image, and the results of COCOCalculator can be calculated at any time.
+
+        Args:
+            categories (list): Categories in COCO format
+            params (COCOParams): Parameters for evaluations and calculations
+        """
+        self.area_all = [0, 10000000000.0]
+        # Same as COCOCalculator, area_all is the first area range.
+        self.params = copy.copy(params)
+        self.params.area_rng = np.insert(
+            params.area_rng, 0, self.area_all, axis=0)
+
+        self.cocoGt = COCO()
+        self.cocoGt.dataset['categories'] = copy.deepcopy(categories)
+        self.cocoGt.createIndex()
+        self.cat_ids = self.cocoGt.getCatIds()
+        self.category_names = [cat['name'] for cat in self.cocoGt.loadCats(
+            self.cat_ids)] + ['single_category']
+
+        # Running counters, (num_cats + 1) x num_rngs (x len(TYPES)). The last range has no area limit.
+        num_cats = len(self.cat_ids) + 1
+        num_rngs = len(self.params.area_rng) + 1
+        self.gt_type_counts = np.zeros(
+            (num_cats, num_rngs, len(TYPES)), dtype=np.int64)
+        self.dt_type_counts = np.zeros(
+            (num_cats, num_rngs, len(TYPES)), dtype=np.int64)
+        self.num_gts = np.zeros((num_cats, num_rngs), dtype=np.int64)
+        self.num_dts = np.zeros((num_cats, num_rngs), dtype=np.int64)
+
+        # Dts sorted by score in descending order, and by id for the same score as COCOCalculator.
+        self.dts = {'score': np.zeros(0, dtype=np.float64), 'id': np.zeros(0, dtype=np.int64), 'count': np.zeros(0, dtype=np.int8),
+                    'type': np.zeros(0, dtype=np.int8), 'category_id': np.zeros(0, dtype=np.int64),
+                    'area': np.zeros(0, dtype=np.float64)}
+        self.pending_dts = []
+
+        self.num_imgs = 0
+        self.num_arrived_dts = 0
+        self.results = None
+
+    def add_image(self, img: dict, gts: list, dts: list) -> None:
+        """Evaluate one image and add it to the running counters.
+
+        Dts of the same score are ordered by 'id', which are the ones of COCO.loadRes, i.e. the order in the detection file.
+        Dts without 'id' are numbered in order of arrival.
+
+        Args:
+            img (dict): Image in COCO format
+            gts (list): Ground truth of the image in COCO format
+            dts (list): Detections of the image in COCO format
+        """
+        assert all([ann['image_id'] == img['id'] for ann in gts + dts]), \
+            'Annotations do not correspond to the image'
+
+        dts = [dt for dt in dts if dt['score'] >=
+               self.params.score_thresh]  # remove low scores
+
+        gt_bbs = np.array([gt['bbox'] for gt in gts],
+                          dtype=np.float64).reshape(-1, 4)
+        gt_cats = np.array([gt['category_id'] for gt in gts], dtype=np.int64)
+        gt_areas = np.array([gt['area'] for gt in gts], dtype=np.float64)
+
+        # Sort detections by score, and by id for the same score
+        dt_scores = np.array([dt['score'] for dt in dts], dtype=np.float64)
+        dt_ids = np.array([dt.get('id', self.num_arrived_dts + i + 1)
+                           for i, dt in enumerate(dts)], dtype=np.int64)
+        self.num_arrived_dts += len(dts)
+        inds = np.lexsort((dt_ids, -dt_scores))
+        dt_scores = dt_scores[inds]
+        dt_ids = dt_ids[inds]
+        dt_bbs = np.array([dt['bbox'] for dt in dts],
+                          dtype=np.float64).reshape(-1, 4)[inds]
+        dt_cats = np.array([dt['category_id']
+                           for dt in dts], dtype=np.int64)[inds]
+        # Same as the area of COCO.loadRes
+        dt_areas = dt_bbs[:, 2] * dt_bbs[:, 3]
+
+        gt_type, _, _, dt_type, _, _ = match_per_img(
+            gt_bbs, gt_cats, dt_bbs, dt_cats, self.params.iou_thresh, self.params.iou_loc)
+        dt_count = np.where(dt_type == NONE, NONE, np.where(
+            dt_type == MATCH, TP, FP)).astype(np.int8)
+
+        indexGt = CatAreaIndex(gt_cats, gt_areas, self.cat_ids,
+                               self.params.area_rng)
+        self.gt_type_counts += indexGt.count(gt_type, len(TYPES))
+        self.num_gts += indexGt.count()[:, :, 0]
+        indexDt = CatAreaIndex(dt_cats, dt_areas, self.cat_ids,
+                               self.params.area_rng)
+        self.dt_type_counts += indexDt.count(dt_type, len(TYPES))
+        self.num_dts += indexDt.count()[:, :, 0]
+
+        self.pending_dts.append({'score': dt_scores, 'id': dt_ids, 'count': dt_count, 'type': dt_type,
+                                 'category_id': dt_cats, 'area': dt_areas})
+        self.num_imgs += 1
+        self.results = None
+
+    def merge_pending_dts(self) -> None:
+        """Merge dts added after the last merge into the score-sorted dts.
+        """
+        if len(self.pending_dts) == 0:
+            return
+        new = {k: np.concatenate([dts[k] for dts in self.pending_dts])
+               for k in self.dts.keys()}
+        self.pending_dts = []
+
+        inds = np.lexsort((new['id'], -new['score']))
+        pos = np.searchsorted(-self.dts['score'],
+                              -new['score'][inds], side='left')
+        # New dts of the same score as earlier dts are placed by id.
+        # Earlier dts are ascending in (group of score, id), which is one integer key.
+        tied = pos < len(self.dts['score'])
+        tied[tied] = self.dts['score'][pos[tied]] == new['score'][inds][tied]
+        if np.any(tied):
+            group = np.cumsum(
+                np.diff(self.dts['score'], prepend=np.nan) != 0)
+            min_id = min(self.dts['id'].min(), new['id'].min())
+            width = max(self.dts['id'].max(), new['id'].max()) - min_id + 1
+            pos[tied] = np.searchsorted(group * width + self.dts['id'] - min_id,
+                                        group[pos[tied]] * width + new['id'][inds][tied] - min_id, side='left')
+        self.dts = {k: np.insert(v, pos, new[k][inds])
+                    for k, v in self.dts.items()}
+
+    def calculate(self) -> dict:
+        """Calculate precisions, recalls, and APs of the images added so far.
+
+        Returns:
+            dict: {'precision', 'recall', 'ap'} in the same format as COCOCalculator.results
+        """
+        if self.results is not None:
+            return self.results
+        self.merge_pending_dts()
+
+        results = {'precision': count_results(self.category_names, self.dt_type_counts[:, -1], self.num_dts[:, -1]),
+                   'recall': count_results(self.category_names, self.gt_type_counts[:, -1], self.num_gts[:, -1]),
+                   'ap': []}
+
+        # Dts are already sorted by score.
+        indexDt = CatAreaIndex(self.dts['category_id'], self.dts['area'],
+                               self.cat_ids, self.params.area_rng)
+        rng_names = area_names(self.params.area_rng, self.area_all)
+        for id_cat, category_name in enumerate(self.category_names):
+            for id_area, area_name in enumerate(rng_names):
+                dt_rows = indexDt.rows(id_cat, id_area)
+                results['ap'].append(ap_result(category_name, area_name, int(self.num_gts[id_cat, id_area]),
+                                               self.dts['score'][dt_rows], self.dts['count'][dt_rows], self.dts['type'][dt_rows], self.params.recall_inter))
+
+        self.results = results
+        return self.results
+
+    def dump_final_results_json(self, result_dir: str, final_file: str = 'final_results.json') -> None:
+        """Dump final results of the images added so far
+
+        Args:
+            result_dir (str): Path of a result directory
+            final_file (str, optional): Final result file's name. Defaults to 'final_results.json'.
+        """
+        _dump_final_results_json(
+            self.cocoGt, self.params, self.calculate(), result_dir, final_file)
+
+
+if __name__ == '__main__':
+    from analytical_map.tools.load_json import load_coco
+    from analytical_map.tools import json_backend
+    path_to_coco_dir = "example/data/"
+    path_to_result_dir = "example/results/"
+    path_to_gt = os.path.join(path_to_coco_dir, 'coco', 'gt.json')
+    path_to_dt = os.path.join(path_to_coco_dir, 'coco', 'dt.json')
+
+    cocoGt = load_coco(path_to_gt)
+    with open(path_to_dt) as fr:
+        dts = json_backend.load(fr)
+    # Same ids as COCO.loadRes
+    for id, dt in enumerate(dts):
+        dt['id'] = id+1
+
+    cocoStream = COCOStreamEvaluator(
+        cocoGt.loadCats(cocoGt.getCatIds()), COCOParams(iou_thresh=0.5, iou_loc=0.2))
+    for img in cocoGt.loadImgs(cocoGt.getImgIds()):
+        cocoStream.add_image(img, cocoGt.imgToAnns[img['id']], [
+                             dt for dt in dts if dt['image_id'] == img['id']])
+        print(img['id'], cocoStream.calculate()['ap'][0]['ap'])
+    cocoStream.dump_final_results_json(
+        path_to_result_dir, final_file='final_results_stream.json')
@@ -1,5 +1,4 @@
-import json
-from pycocotools.coco import COCO
+import numpy as np
 import os
 import cv2
 from bokeh.io import save, output_file, export_png
@@ -7,42 +6,275 @@ from bokeh.plotting import figure, show
 from bokeh.layouts import gridplot
 import pandas as pd
 import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
 
 from analytical_map.params import COCOParams
-from analytical_map.tools.dump_json import dump_final_results_json as _dump_final_results_json
+from analytical_map.tools.dump_json import dump_final_results_json as _dump_final_results_json, open_json
 from analytical_map.tools.draw_chart import *
+from analytical_map.tools.load_json import load_middle_file
+from analytical_map.tools import json_backend
+from analytical_map.tools.ann_store import TYPE_NAMES, COUNT_NAMES
+from analytical_map.tools.matching import TP, NONE
+from analytical_map.tools.profiler import profiled, profile_stage, profile_count
+
+
+def draw_bbs_per_img(image_file: str, save_file: str, gt_bbs: list, gt_types: list, dt_bbs: list, dt_types: list, type_color: dict) -> None:
+    """Draw bounding boxes and types of gts and dts in one image.
+
+    Args:
+        image_file (str): Path of the image
+        save_file (str): Path of the image with bounding boxes
+        gt_bbs (list): Bounding boxes of gts
+        gt_types (list): Types of gts
+        dt_bbs (list): Bounding boxes of dts
+        dt_types (list): Types of dts
+        type_color (dict): Colors of types
+    """
+    img_cv2 = cv2.imread(image_file)
+
+    for bbox, t in zip(gt_bbs, gt_types):
+
+        x_min = int(bbox[0])
+        y_min = int(bbox[1])
+        x_max = int(bbox[0]) + int(bbox[2])
+        y_max = int(bbox[1]) + int(bbox[3])
+
+        cv2.rectangle(img_cv2, (x_min, y_min),
+                      (x_max, y_max), type_color[t], thickness=2)
+        cv2.putText(img_cv2, str(t),
+                    org=(x_min, y_min-5),
+                    fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                    fontScale=0.5,
+                    color=type_color[t],
+                    thickness=2,
+                    lineType=cv2.LINE_4)
+
+    for bbox, t in zip(dt_bbs, dt_types):
+        x_min = int(bbox[0])
+        y_min = int(bbox[1])
+        x_max = int(bbox[0]) + int(bbox[2])
+        y_max = int(bbox[1]) + int(bbox[3])
+
+        cv2.rectangle(img_cv2, (x_min, y_min), (x_max, y_max), tuple(
+            [1.3*c for c in type_color[t]]))
+        cv2.putText(img_cv2,  str(t),
+                    org=(x_min, y_min-5),
+                    fontFace=cv2.FONT_HERSHEY_SIMPLEX,
+                    fontScale=0.5,
+                    color=type_color[t],
+                    thickness=1,
+                    lineType=cv2.LINE_4)
+
+    cv2.imwrite(save_file, img_cv2)
+
+
+def _draw_bbs_per_img(task: tuple) -> None:
+    draw_bbs_per_img(*task)
+
+
+# Kinds of figures drawn by visualize
+FIG_KINDS = ['bounding_boxes', 'precision', 'recall',
+             'pairplot', 'ap_ratio', 'pr_score', 'pr_curve', 'confusion']
+# Kinds of figures of comparison results, and the keys of their entries
+COMPARISON_KINDS = {'precision': 'precision', 'precision_ratio': 'precision', 'recall': 'recall', 'recall_ratio': 'recall',
+                    'ap': 'ap', 'ap_ratio': 'ap', 'pr_curve': 'ap'}
+
+
+def draw_figure(kind: str, entry: dict, recall_inter: list):
+    """Draw a figure of one entry of the final results.
+
+    Args:
+        kind (str): 'precision', 'recall', 'ap_ratio', 'pr_score' or 'pr_curve', or 'comparison_' and a kind of COMPARISON_KINDS
+        entry (dict): Entry of results['precision'], results['recall'] or results['ap']
+        recall_inter (list): Points of recall to calculate AP
+
+    Returns:
+        Bokeh figure
+    """
+    if kind.startswith('comparison_'):
+        return draw_comparison_figure(kind[len('comparison_'):], entry)
+    if kind in ['precision', 'recall']:
+        return draw_pi_chart(entry['category'] + "_precision_ratio",
+                             entry['ratio'].values(), entry['ratio'].keys())
+    fig_title = entry['category'] + '_' + entry['area'] + '_' + kind
+    if kind == 'ap_ratio':
+        return draw_pi_chart(fig_title, entry['ratio'].values(), entry['ratio'].keys())
+    if kind == 'pr_score':
+        return draw_pr_score(fig_title, entry['score'], entry['prec_raw'], entry['recall_raw'])
+    return draw_pr_curve(fig_title, entry['recall_raw'], entry['prec_raw'], recall_inter, entry['prec_inter'])
+
+
+def draw_comparison_figure(kind: str, entry: dict):
+    """Draw a figure of one entry of comparison results, where the models are side by side.
+
+    Args:
+        kind (str): Kind of COMPARISON_KINDS
+        entry (dict): Entry of comparison results['precision'], results['recall'] or results['ap']
+
+    Returns:
+        Bokeh figure
+    """
+    names = list(entry['ratio'].keys())
+    fig_title = entry['category'] + \
+        ('_' + entry['area'] if 'area' in entry else '') + '_' + kind
+    if kind in ['precision', 'recall']:
+        return draw_bar_chart(fig_title, [entry['score'][name] for name in names], names)
+    if kind == 'ap':
+        return draw_bar_chart(fig_title, [entry['ap'][name] for name in names], names)
+    if kind == 'pr_curve':
+        return draw_pr_curves(fig_title, entry['recall_inter'], entry['prec_inter'])
+    types = list(entry['ratio'][names[0]].keys())
+    return draw_stacked_bar_chart(fig_title, {t: [entry['ratio'][name][t] for name in names] for t in types}, names)
+
+
+def draw_grid_page(kind: str, entries: list, ncols: int, recall_inter: list, html_file: str) -> None:
+    """Draw figures of entries in a grid, and save it as HTML.
+
+    Args:
+        kind (str): Kind of the figures
+        entries (list): Entries of the final results
+        ncols (int): Number of columns, or None for one row
+        recall_inter (list): Points of recall to calculate AP
+        html_file (str): Path of the HTML
+    """
+    figs = [draw_figure(kind, entry, recall_inter) for entry in entries]
+    grid = gridplot([figs]) if ncols is None else gridplot(figs, ncols=ncols)
+    save(grid, html_file)
+
+
+def _draw_grid_page(task: tuple) -> None:
+    draw_grid_page(*task)
+
+
+def grid_pages(kind: str, entries: list, ncols: int, recall_inter: list, html_file: str, page_size: int = None) -> list:
+    """Split a grid into pages of at most page_size figures.
+
+    If there is more than one page, pages are saved as <name>_<page>.html and html_file links them.
+
+    Args:
+        kind (str): Kind of the figures
+        entries (list): Entries of the final results
+        ncols (int): Number of columns, or None for one row
+        recall_inter (list): Points of recall to calculate AP
+        html_file (str): Path of the HTML
+        page_size (int, optional): Maximum number of figures per page. Defaults to all figures in one page.
+
+    Returns:
+        list: Tasks of draw_grid_page
+    """
+    if len(entries) == 0:
+        return []
+    if page_size is None or len(entries) <= page_size:
+        return [(kind, entries, ncols, recall_inter, html_file)]
+    if ncols is not None:
+        # Rows are not split across pages.
+        page_size = max(ncols, page_size // ncols * ncols)
+    pages = [entries[i:i + page_size]
+             for i in range(0, len(entries), page_size)]
+    root, ext = os.path.splitext(html_file)
+    page_files = [root + '_' + str(i + 1) + ext for i in range(len(pages))]
+
+    with open(html_file, 'w') as fw:
+        fw.write('<html><body>\n')
+        for i, (page, page_file) in enumerate(zip(pages, page_files)):
+            fw.write('<p><a href="' + os.path.basename(page_file) + '">Page ' + str(i + 1) + '</a>: ' +
+                     page[0]['category'] + ' - ' + page[-1]['category'] + '</p>\n')
+        fw.write('</body></html>\n')
+    return [(kind, page, ncols, recall_inter, page_file) for page, page_file in zip(pages, page_files)]
+
+
+def draw_confusion_page(entry: dict, categories: list, html_file: str) -> None:
+    """Draw a confusion matrix of one area range as a heatmap, and save it as HTML.
+
+    Args:
+        entry (dict): Entry of results['confusion']
+        categories (list): Category names to draw, or None for all categories
+        html_file (str): Path of the HTML
+    """
+    rows, cols = entry['rows'], entry['cols']
+    cells = [(rows[row], cols[col], count) for row, col, count in zip(entry['row'], entry['col'], entry['count'])
+             if categories is None or rows[row] in categories or cols[col] in categories]
+    # Only labels of drawn cells are on the axes, in the order of the matrix.
+    y_labels = [label for label in rows if label in {y for y, _, _ in cells}]
+    x_labels = [label for label in cols if label in {x for _, x, _ in cells}]
+    p = draw_heatmap('confusion_' + entry['area'], x_labels, y_labels,
+                     [x for _, x, _ in cells], [y for y, _, _ in cells], [count for _, _, count in cells])
+    save(p, html_file)
+
+
+def _draw_confusion_page(task: tuple) -> None:
+    draw_confusion_page(*task)
+
+
+def draw_pairplot(objs: dict, hue_order: list, png_file: str) -> None:
+    """Draw a pairplot of gts or dts colored by types.
+
+    Args:
+        objs (dict): Columns of gts or dts
+        hue_order (list): Types
+        png_file (str): Path of the image
+    """
+    df = pd.DataFrame(data=objs)
+    pg = sns.pairplot(df, hue='type', kind='scatter',
+                      diag_kind='hist', hue_order=hue_order)
+    pg.savefig(png_file)
+
+
+def _draw_pairplot(task: tuple) -> None:
+    draw_pairplot(*task)
+
+
+def run_tasks(func, tasks: list, executor: ProcessPoolExecutor = None) -> list:
+    """Run tasks now, or submit them to executor.
+
+    Returns:
+        list: Futures of the tasks, empty if they are done.
+    """
+    if executor is None:
+        for task in tasks:
+            func(task)
+        return []
+    return [executor.submit(func, task) for task in tasks]
 
 
 class COCOVisualizer():
     def __init__(self, middle_file: str, results_file: str, result_dir: str, image_dir: str) -> None:
         """Init
 
+        Comparison results of COCOComparator are drawn without a middle file and images.
+
         Args:
-            middle_file (str): Path of a middle file.
-            results_file (str): Path of a result file
+            middle_file (str): Path of a middle file, None for comparison results.
+            results_file (str): Path of a result file, or of comparison results
             result_dir (str): Path of a result directory
-            image_dir (str): Path of an image directory
+            image_dir (str): Path of an image directory, None for comparison results.
         """
 
         self.cocoGt = None
         self.cocoDt = None
+        self.storeGt = None
+        self.storeDt = None
+        self.profiler = None
         self.is_precision_calculated = False
         self.is_recall_calculated = False
         self.is_ap_calculated = False
         self.is_evaluated = False
+        self.is_compared = False
 
-        assert self.read_middle_file(middle_file)
         assert self.read_result_file(results_file)
+        if not self.is_compared:
+            assert self.read_middle_file(middle_file)
 
         self.result_dir = result_dir
         self.image_dir = image_dir
-        assert os.path.isdir(self.image_dir)
+        assert self.is_compared or os.path.isdir(self.image_dir)
 
         # Default variables
         self.type = ['Match', 'LC', 'DC', 'Cls', 'Loc', 'Bkg', 'Miss']
         self.type_color = {'Match': (10, 20, 190), 'LC': (100, 20, 190), 'DC': (30, 140, 140),
                            'Cls': (190, 20, 100), 'Loc': (190, 30, 30), 'Bkg': (50, 50, 50), 'Miss': (80, 20, 170)}
-        self.cats = self.cocoGt.loadCats(self.cocoGt.getCatIds())
+        self.cats = self.cocoGt.loadCats(
+            self.cocoGt.getCatIds()) if self.cocoGt is not None else None
 
     def read_middle_file(self, middle_file: str) -> bool:
         """ Read a middle file and generate cocoGt and COCOdt
@@ -55,161 +287,235 @@ class COCOVisualizer():
         """
         if middle_file is not None:
             if os.path.isfile(middle_file):
-                cocoGt = COCO(middle_file)
-                _cocoDt = json.load(open(middle_file))['detections']
-                cocoDt = cocoGt.loadRes(_cocoDt)
-                self.is_evaluated = self.evaluation_check(cocoGt, cocoDt)
+                # Both gts and dts are indexed from a single parse, and evaluations are checked while building the stores.
+                middle = load_middle_file(middle_file)
+                self.is_evaluated = middle is not None
                 if self.is_evaluated == False:
                     return False
-                self.cocoGt = cocoGt
-                self.cocoDt = cocoDt
+                self.cocoGt, self.cocoDt, self.storeGt, self.storeDt = middle
                 return True
         else:
             print('ERROR:Could not read files')
             return False
 
-    def evaluation_check(self, cocoGt: COCO, cocoDT: COCO) -> bool:
-        """Check whether middle file is evaluated.
-
-        Args:
-            cocoGt (COCO):  Ground truth
-            cocoDT (COCO):  Detections
-
-        Returns:
-            bool: True if both cocoGt and cocoDT were evaluated.
-        """
-        gts = cocoGt.loadAnns(cocoGt.getAnnIds())
-        dts = cocoDT.loadAnns(cocoDT.getAnnIds())
-        is_evaluated_gts = all([True if 'eval' in gt.keys()
-                                else False for gt in gts])
-        is_evaluated_dts = all([True if 'eval' in dt.keys()
-                                else False for dt in dts])
-        return is_evaluated_gts and is_evaluated_dts
-
     def read_result_file(self, result_file: str) -> None:
         """Read a result file
 
         Args:
-            result_file (str): Path of the result file
+            result_file (str): Path of the result file, gzipped if it ends with '.gz'
         """
         if os.path.isfile(result_file):
-            self.results = json.load(open(result_file))['results']
-            params_dict = json.load(open(result_file))['params']
+            with open_json(result_file) as fr:
+                js = json_backend.load(fr)
+            self.results = js['results']
+            params_dict = js['params']
             self.params = COCOParams(**params_dict)
-            self.is_precision_calculated = True
-            self.is_recall_calculated = True
-            self.is_ap_calculated = True
+            # Comparison results have the models side by side, and are drawn only by draw_comparison_figs.
+            self.is_compared = 'models' in self.results
+            self.is_precision_calculated = not self.is_compared
+            self.is_recall_calculated = not self.is_compared
+            self.is_ap_calculated = not self.is_compared
             return True
         else:
             return False
 
-    def visualize(self) -> None:
+    @profiled
+    def visualize(self, workers: int = 1, only_not_TP: bool = False, num_samples: int = None, kinds: list = None, categories: list = None, areas: list = None, page_size: int = None) -> None:
         """Viualize the results by drwawing bounding boxes, precision and recall curves, and APs.
+
+        Args:
+            workers (int, optional): Number of processes for drawing bounding boxes and figures. Defaults to 1.
+            only_not_TP (bool, optional): Draw bounding boxes only in images which have boxes other than TP. Defaults to False.
+            num_samples (int, optional): Draw bounding boxes only in this number of randomly sampled images. Defaults to all images.
+            kinds (list, optional): Kinds of figures in FIG_KINDS, or in COMPARISON_KINDS for comparison results, to draw. Defaults to all kinds.
+            categories (list, optional): Category names to draw, e.g. ['person', 'single_category']. Defaults to all categories.
+            areas (list, optional): Area names to draw APs, e.g. ['area_all']. Defaults to all areas.
+            page_size (int, optional): Maximum number of figures in one HTML. Defaults to all figures in one HTML.
         """
-        if self.is_evaluated:
-            self.draw_bounding_boxes()
-        if self.is_precision_calculated:
-            self.draw_precision_figs()
-            self.pairplot(prec_or_recall='precision')
-        if self.is_recall_calculated:
-            self.draw_recall_figs()
-            self.pairplot(prec_or_recall='recall')
-        if self.is_ap_calculated:
-            self.draw_ap_figs()
-
-    def draw_precision_figs(self) -> None:
-        """Draw precision figures.
+        comparison_kinds = list(COMPARISON_KINDS.keys()) if kinds is None else [
+            kind for kind in kinds if kind in COMPARISON_KINDS]
+        kinds = FIG_KINDS if kinds is None else kinds
+        if self.is_evaluated and 'bounding_boxes' in kinds:
+            self.draw_bounding_boxes(
+                workers=workers, only_not_TP=only_not_TP, num_samples=num_samples)
+
+        # Figures are independent, so all kinds and pages are drawn in one process pool.
+        executor = ProcessPoolExecutor(
+            max_workers=workers) if workers > 1 else None
+        futures = []
+        try:
+            # Pairplots take the longest, so they are submitted first.
+            if 'pairplot' in kinds:
+                if self.is_precision_calculated:
+                    futures += self.pairplot('precision', categories, executor)
+                if self.is_recall_calculated:
+                    futures += self.pairplot('recall', categories, executor)
+            if self.is_precision_calculated and 'precision' in kinds:
+                futures += self.draw_precision_figs(categories,
+                                                    page_size, executor)
+            if self.is_recall_calculated and 'recall' in kinds:
+                futures += self.draw_recall_figs(categories,
+                                                 page_size, executor)
+            ap_kinds = [kind for kind in ['ap_ratio', 'pr_score', 'pr_curve']
+                        if kind in kinds]
+            if self.is_ap_calculated and len(ap_kinds) > 0:
+                futures += self.draw_ap_figs(categories, areas,
+                                             page_size, executor, ap_kinds)
+            if 'confusion' in kinds and 'confusion' in self.results:
+                futures += self.draw_confusion_figs(categories,
+                                                    areas, executor)
+            if 'models' in self.results:
+                futures += self.draw_comparison_figs(categories, areas,
+                                                     page_size, executor, comparison_kinds)
+            with profile_stage(self, 'draw_figures', tasks=len(futures)):
+                for future in futures:
+                    future.result()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def select_entries(self, entries: list, categories: list = None, areas: list = None) -> list:
+        """Entries of the final results of the categories and areas.
         """
+        return [entry for entry in entries
+                if (categories is None or entry['category'] in categories)
+                and (areas is None or entry.get('area') in areas)]
 
-        precisions = self.results['precision']
+    @profiled
+    def draw_precision_figs(self, categories: list = None, page_size: int = None, executor: ProcessPoolExecutor = None) -> list:
+        """Draw precision figures.
+
+        Args:
+            categories (list, optional): Category names to draw. Defaults to all categories.
+            page_size (int, optional): Maximum number of figures in one HTML. Defaults to all figures in one HTML.
+            executor (ProcessPoolExecutor, optional): Pool to draw pages. Defaults to drawing them now.
 
+        Returns:
+            list: Futures of pages
+        """
         dir_fig_precision = os.path.join(
             self.result_dir, 'figures/precision')
         os.makedirs(dir_fig_precision, exist_ok=True)
-        precision_lists = []
-        for prec in precisions:
-
-            # save each charts
-            fig_title = prec['category'] + "_precision_ratio"
 
-            p = draw_pi_chart(fig_title,
-                              prec['ratio'].values(), prec['ratio'].keys())
-            precision_lists.append(p)
+        precisions = self.select_entries(self.results['precision'], categories)
+        tasks = grid_pages('precision', precisions, None, None,
+                           os.path.join(dir_fig_precision, 'precision_all.html'), page_size)
+        return run_tasks(_draw_grid_page, tasks, executor)
 
-        grid_precision = gridplot(
-            [precision_lists])
-        save(grid_precision, os.path.join(
-            dir_fig_precision, 'precision_all.html'))
-
-    def draw_recall_figs(self) -> None:
+    @profiled
+    def draw_recall_figs(self, categories: list = None, page_size: int = None, executor: ProcessPoolExecutor = None) -> list:
         """Draw recall figures
-        """
 
-        recalls = self.results['recall']
+        Args:
+            categories (list, optional): Category names to draw. Defaults to all categories.
+            page_size (int, optional): Maximum number of figures in one HTML. Defaults to all figures in one HTML.
+            executor (ProcessPoolExecutor, optional): Pool to draw pages. Defaults to drawing them now.
 
+        Returns:
+            list: Futures of pages
+        """
         dir_fig_recall = os.path.join(
             self.result_dir, 'figures', 'recall')
         os.makedirs(dir_fig_recall, exist_ok=True)
 
-        recall_lists = []
-        for rec in recalls:
-
-            # save each charts
-            fig_title = rec['category'] + "_precision_ratio"
+        recalls = self.select_entries(self.results['recall'], categories)
+        tasks = grid_pages('recall', recalls, None, None,
+                           os.path.join(dir_fig_recall, 'recall_all.html'), page_size)
+        return run_tasks(_draw_grid_page, tasks, executor)
 
-            p = draw_pi_chart(fig_title,
-                              rec['ratio'].values(), rec['ratio'].keys())
-            recall_lists.append(p)
+    @profiled
+    def draw_ap_figs(self, categories: list = None, areas: list = None, page_size: int = None, executor: ProcessPoolExecutor = None, kinds: list = None) -> list:
+        """Draw ap figures
 
-        grid_recall = gridplot(
-            [recall_lists])
-        save(grid_recall, os.path.join(
-            dir_fig_recall, 'recall_all.html'))
+        Args:
+            categories (list, optional): Category names to draw. Defaults to all categories.
+            areas (list, optional): Area names to draw. Defaults to all areas.
+            page_size (int, optional): Maximum number of figures in one HTML. Defaults to all figures in one HTML.
+            executor (ProcessPoolExecutor, optional): Pool to draw pages. Defaults to drawing them now.
+            kinds (list, optional): Kinds of figures. Defaults to ['ap_ratio', 'pr_score', 'pr_curve'].
 
-    def draw_ap_figs(self) -> None:
-        """Draw ap figures
+        Returns:
+            list: Futures of pages
         """
-
+        if kinds is None:
+            kinds = ['ap_ratio', 'pr_score', 'pr_curve']
         dir_fig_ap = os.path.join(self.result_dir, 'figures', 'ap')
         os.makedirs(dir_fig_ap, exist_ok=True)
 
-        aps = self.results['ap']
-        pi_lists_all = []
-        pr_curve_all = []
-        pr_score_all = []
-
-        for ap in aps:
-            pi_fig_title = ap['category'] + '_' + ap['area'] + "_ap_ratio"
-            pr_curve_fig_title = ap['category'] + \
-                '_' + ap['area'] + "_pr_curve"
-            pr_score_fig_title = ap['category'] + \
-                '_' + ap['area'] + "_pr_score"
-
-            # _ratio = {k: v for k, v in ap['ratio'].items() if v != 0}
-            p = draw_pi_chart(pi_fig_title,
-                              ap['ratio'].values(), ap['ratio'].keys())
-            pi_lists_all.append(p)
-
-            p = draw_pr_score(pr_score_fig_title,
-                              ap['score'], ap['prec_raw'], ap['recall_raw'])
-            pr_score_all.append(p)
-
-            p = draw_pr_curve(pr_curve_fig_title,
-                              ap['recall_raw'], ap['prec_raw'], self.params.recall_inter, ap['prec_inter'])
-            pr_curve_all.append(p)
-
-        grid_pi_all = gridplot(
-            pi_lists_all, ncols=len(self.params.area_rng))
-        save(grid_pi_all, os.path.join(dir_fig_ap, 'ap_ratio_all.html'))
-        grid_pr_score_all = gridplot(
-            pr_score_all, ncols=len(self.params.area_rng))
-        save(grid_pr_score_all, os.path.join(dir_fig_ap, 'pr_score_all.html'))
-        grid_pr_curve_all = gridplot(
-            pr_curve_all, ncols=len(self.params.area_rng))
-        save(grid_pr_curve_all, os.path.join(dir_fig_ap, 'pr_curve_all.html'))
-
-    def draw_bounding_boxes(self) -> None:
+        aps = self.select_entries(self.results['ap'], categories, areas)
+        # A row has all areas of a category.
+        ncols = len(self.params.area_rng) if areas is None else len(
+            {ap['area'] for ap in aps})
+        tasks = []
+        for kind in kinds:
+            tasks += grid_pages(kind, aps, ncols, self.params.recall_inter,
+                                os.path.join(dir_fig_ap, kind + '_all.html'), page_size)
+        return run_tasks(_draw_grid_page, tasks, executor)
+
+    @profiled
+    def draw_confusion_figs(self, categories: list = None, areas: list = None, executor: ProcessPoolExecutor = None) -> list:
+        """Draw confusion matrices of area ranges as heatmaps.
+
+        Args:
+            categories (list, optional): Category names to draw cells of their rows and columns. Defaults to all categories.
+            areas (list, optional): Area names to draw. Defaults to all areas.
+            executor (ProcessPoolExecutor, optional): Pool to draw pages. Defaults to drawing them now.
+
+        Returns:
+            list: Futures of pages
+        """
+        dir_fig_confusion = os.path.join(
+            self.result_dir, 'figures', 'confusion')
+        os.makedirs(dir_fig_confusion, exist_ok=True)
+
+        confusions = self.select_entries(self.results['confusion'], None, areas)
+        tasks = [(entry, categories, os.path.join(dir_fig_confusion, 'confusion_' + entry['area'] + '.html'))
+                 for entry in confusions]
+        return run_tasks(_draw_confusion_page, tasks, executor)
+
+    @profiled
+    def draw_comparison_figs(self, categories: list = None, areas: list = None, page_size: int = None, executor: ProcessPoolExecutor = None, kinds: list = None) -> list:
+        """Draw scores, APs, ratios of types and precision-recall curves of the models of comparison results side by side.
+
+        Args:
+            categories (list, optional): Category names to draw. Defaults to all categories.
+            areas (list, optional): Area names to draw APs. Defaults to all areas.
+            page_size (int, optional): Maximum number of figures in one HTML. Defaults to all figures in one HTML.
+            executor (ProcessPoolExecutor, optional): Pool to draw pages. Defaults to drawing them now.
+            kinds (list, optional): Kinds of COMPARISON_KINDS. Defaults to all kinds.
+
+        Returns:
+            list: Futures of pages
+        """
+        if kinds is None:
+            kinds = list(COMPARISON_KINDS.keys())
+        dir_fig_comparison = os.path.join(
+            self.result_dir, 'figures', 'comparison')
+        os.makedirs(dir_fig_comparison, exist_ok=True)
+
+        tasks = []
+        for kind in kinds:
+            key = COMPARISON_KINDS[kind]
+            entries = self.select_entries(
+                self.results[key], categories, areas if key == 'ap' else None)
+            # A row of APs has all areas of a category, and scores are in one row.
+            ncols = None
+            if key == 'ap':
+                ncols = len(self.params.area_rng) if areas is None else len(
+                    {entry['area'] for entry in entries})
+            tasks += grid_pages('comparison_' + kind, entries, ncols, self.params.recall_inter,
+                                os.path.join(dir_fig_comparison, kind + '_all.html'), page_size)
+        return run_tasks(_draw_grid_page, tasks, executor)
+
+    @profiled
+    def draw_bounding_boxes(self, workers: int = 1, only_not_TP: bool = False, num_samples: int = None, seed: int = 0) -> None:
         """Visualize all bounding boxes and types in images.
+
+        Args:
+            workers (int, optional): Number of processes. Images are drawn in a process pool if it is more than 1. Defaults to 1.
+            only_not_TP (bool, optional): Draw only images which have boxes other than TP. Defaults to False.
+            num_samples (int, optional): Draw only this number of randomly sampled images. Defaults to all images.
+            seed (int, optional): Seed of the sampling. Defaults to 0.
         """
 
         dir_TP = os.path.join(self.result_dir, 'draw_bbs', 'TP')
@@ -218,91 +524,81 @@ class COCOVisualizer():
         os.makedirs(dir_not_TP, exist_ok=True)
 
         img_ids = self.cocoGt.getImgIds()
+        tasks = []
         for img_id in img_ids:
             img = self.cocoGt.loadImgs(ids=img_id)[0]
 
-            img_cv2 = cv2.imread(os.path.join(
-                self.image_dir, img["file_name"]))
-            gts_ids = self.cocoGt.getAnnIds(imgIds=img['id'],  iscrowd=None)
-            dts_ids = self.cocoDt.getAnnIds(imgIds=img['id'],  iscrowd=None)
-
-            gts_per_img = self.cocoGt.loadAnns(gts_ids)
-            dts_per_img = self.cocoDt.loadAnns(dts_ids)
-
-            is_all_TPs = True
-            for gt in gts_per_img:
-
-                if gt['eval']['count'] != 'TP':
-                    is_all_TPs = False
-
-                x_min = int(gt["bbox"][0])
-                y_min = int(gt["bbox"][1])
-                x_max = int(gt["bbox"][0]) + int(gt["bbox"][2])
-                y_max = int(gt["bbox"][1]) + int(gt["bbox"][3])
-
-                cv2.rectangle(img_cv2, (x_min, y_min),
-                              (x_max, y_max), self.type_color[gt['eval']['type']], thickness=2)
-                cv2.putText(img_cv2, str(gt['eval']['type']),
-                            org=(x_min, y_min-5),
-                            fontFace=cv2.FONT_HERSHEY_SIMPLEX,
-                            fontScale=0.5,
-                            color=self.type_color[gt['eval']['type']],
-                            thickness=2,
-                            lineType=cv2.LINE_4)
-
-            for dt in dts_per_img:
-                if dt['eval']['count'] != 'TP':
-                    is_all_TPs = False
-                x_min = int(dt["bbox"][0])
-                y_min = int(dt["bbox"][1])
-                x_max = int(dt["bbox"][0]) + int(dt["bbox"][2])
-                y_max = int(dt["bbox"][1]) + int(dt["bbox"][3])
-
-                cv2.rectangle(img_cv2, (x_min, y_min), (x_max, y_max), tuple(
-                    [1.3*c for c in self.type_color[dt['eval']['type']]]))
-                cv2.putText(img_cv2,  str(dt['eval']['type']),
-                            org=(x_min, y_min-5),
-                            fontFace=cv2.FONT_HERSHEY_SIMPLEX,
-                            fontScale=0.5,
-                            color=self.type_color[dt['eval']['type']],
-                            thickness=1,
-                            lineType=cv2.LINE_4)
+            gt_rows = self.storeGt.rows_per_img(img['id'])
+            dt_rows = self.storeDt.rows_per_img(img['id'])
+
+            is_all_TPs = bool(np.all(self.storeGt.count[gt_rows] == TP)) and bool(
+                np.all(self.storeDt.count[dt_rows] == TP))
+            if only_not_TP and is_all_TPs:
+                continue
 
             save_dir = dir_TP if is_all_TPs else dir_not_TP
-            cv2.imwrite(os.path.join(save_dir, img["file_name"]), img_cv2)
+            # Boxes without types, e.g. dts which are not assigned in images with gts, have no colors.
+            gt_rows = gt_rows[self.storeGt.type[gt_rows] != NONE]
+            dt_rows = dt_rows[self.storeDt.type[dt_rows] != NONE]
+            tasks.append((os.path.join(self.image_dir, img["file_name"]), os.path.join(save_dir, img["file_name"]),
+                          self.storeGt.bbox[gt_rows].tolist(), TYPE_NAMES[self.storeGt.type[gt_rows]].tolist(),
+                          self.storeDt.bbox[dt_rows].tolist(), TYPE_NAMES[self.storeDt.type[dt_rows]].tolist(),
+                          self.type_color))
+
+        if num_samples is not None and num_samples < len(tasks):
+            # Sampled images are drawn in the order of image ids.
+            inds = np.sort(np.random.default_rng(seed).choice(
+                len(tasks), num_samples, replace=False))
+            tasks = [tasks[i] for i in inds]
+        profile_count(self, images=len(tasks))
+
+        if workers > 1:
+            # Images are independent, so reading, drawing and writing them are pipelined over processes.
+            chunksize = max(1, len(tasks) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for _ in executor.map(_draw_bbs_per_img, tasks, chunksize=chunksize):
+                    pass
+        else:
+            for task in tasks:
+                draw_bbs_per_img(*task)
 
-    def pairplot(self, prec_or_recall):
+    def pairplot(self, prec_or_recall, categories: list = None, executor: ProcessPoolExecutor = None) -> list:
+        """Draw a pairplot of dts for precision or gts for recall.
+
+        Args:
+            prec_or_recall (str): 'precision' or 'recall'
+            categories (list, optional): Category names to draw. Defaults to all categories.
+            executor (ProcessPoolExecutor, optional): Pool to draw the pairplot. Defaults to drawing it now.
+
+        Returns:
+            list: Future of the pairplot
+        """
         os.makedirs(os.path.join(self.result_dir, 'figures',
                                  prec_or_recall), exist_ok=True)
         if prec_or_recall == 'precision':
-            obj_ids = self.cocoDt.getAnnIds()
-            objs = self.cocoDt.loadAnns(obj_ids)
+            store = self.storeDt
         elif prec_or_recall == 'recall':
-            obj_ids = self.cocoGt.getAnnIds()
-            objs = self.cocoGt.loadAnns(obj_ids)
+            store = self.storeGt
         else:
             return False
 
-        for obj in objs:
-            del obj['attributes']
-            del obj['iscrowd']
-            del obj['segmentation']
-            del obj['id']
-            del obj['image_id']
-            obj['count'] = obj['eval']['count']
-            obj['type'] = obj['eval']['type']
-            obj['iou'] = obj['eval']['iou']
-            obj['bb_cx'] = obj['bbox'][0] + obj['bbox'][2]/2
-            obj['bb_cy'] = obj['bbox'][1] + obj['bbox'][3]/2
-            del obj['bbox']
-            del obj['eval']
-
-        df = pd.DataFrame(data=objs)
-        pg = sns.pairplot(df, hue='type', kind='scatter',
-                          diag_kind='hist', hue_order=self.type)
-        pg.savefig(os.path.join(self.result_dir, 'figures',
-                                prec_or_recall, 'pairplot.png'))
+        rows = np.arange(len(store))
+        if categories is not None and 'single_category' not in categories:
+            cat_ids = [cat['id'] for cat in self.cats if cat['name'] in categories]
+            rows = rows[np.isin(store.category_id, cat_ids)]
 
+        objs = {'category_id': store.category_id[rows], 'area': store.area[rows]}
+        if prec_or_recall == 'precision':
+            objs['score'] = store.score[rows]
+        objs['count'] = COUNT_NAMES[store.count[rows]]
+        objs['type'] = TYPE_NAMES[store.type[rows]]
+        objs['iou'] = store.iou[rows]
+        objs['bb_cx'] = store.bbox[rows, 0] + store.bbox[rows, 2]/2
+        objs['bb_cy'] = store.bbox[rows, 1] + store.bbox[rows, 3]/2
+
+        with profile_stage(self, 'pairplot_' + prec_or_recall, points=len(rows)):
+            return run_tasks(_draw_pairplot, [(objs, self.type, os.path.join(self.result_dir, 'figures',
+                                                                             prec_or_recall, 'pairplot.png'))], executor)
 
 if __name__ == '__main__':
     path_to_coco_dir = "example/data/"
@@ -11,3 +11,8 @@ class COCOParams:
     recall_inter: np.arange = np.arange(0, 1.01, 0.1)
     area_rng: np.array = np.array(
         [[0, 1024], [1024, 9216], [9216, 10000000000.0]])
+    # IoU thresholds evaluated in addition to iou_thresh, e.g. np.arange(0.5, 0.96, 0.05) for AP@[.5:.95]
+    iou_threshs: np.array = None
+    # Score thresholds to calculate precisions, recalls and types at, e.g. np.arange(0.1, 1.0, 0.1).
+    # If it is set, the evaluation records the scores which decide types of gts, so that thresholds can be changed without evaluating again.
+    score_threshs: np.array = None
@@ -0,0 +1,177 @@
+from dataclasses import dataclass, field
+import numpy as np
+from nptyping import NDArray
+
+from analytical_map.tools.matching import TYPES, COUNTS, NONE, MATCH, TP
+
+# Names of type and count codes. NONE(-1) indexes the last element, None.
+TYPE_NAMES = np.array(TYPES + [None], dtype=object)
+COUNT_NAMES = np.array(COUNTS + [None], dtype=object)
+
+
+@dataclass
+class AnnStore:
+    """Columnar store of gts or dts and their evaluations.
+
+    Each column is a numpy array whose i-th element belongs to the i-th annotation of the source list.
+    Evaluations are kept as codes, 'count' and 'type' are indices of COUNTS and TYPES (NONE if not evaluated),
+    'corr_id' is the id of the corresponding box (-1 if none) and 'iou' is the IoU with it (nan if none).
+    'type_sweep' is None, or type codes for each IoU threshold of COCOParams.iou_threshs (NUM x NUM_threshs).
+    'type_scores' is None, or the highest scores of dts which make each gt Match, LC, Cls and Loc (NUM x 4, nan if none),
+    which decide the types of gts at score thresholds of COCOParams.score_threshs.
+    """
+
+    id: NDArray
+    image_id: NDArray
+    category_id: NDArray
+    bbox: NDArray
+    area: NDArray
+    score: NDArray
+    count: NDArray
+    type: NDArray
+    corr_id: NDArray
+    iou: NDArray
+    type_sweep: NDArray = None
+    type_scores: NDArray = None
+
+    _img_ids: NDArray = field(default=None, init=False, repr=False)
+    _img_order: NDArray = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_anns(cls, anns: list, require_eval: bool = False) -> 'AnnStore':
+        """Build a store from annotation dicts.
+
+        'eval' of the annotations is moved into the store if it exists.
+
+        Args:
+            anns (list): Annotations in COCO format
+            require_eval (bool, optional): Raise ValueError if an annotation does not have 'eval'. Defaults to False.
+
+        Returns:
+            AnnStore: Columnar store of the annotations
+        """
+        num = len(anns)
+        store = cls(id=np.array([ann['id'] for ann in anns], dtype=np.int64),
+                    image_id=np.array([ann['image_id']
+                                      for ann in anns], dtype=np.int64),
+                    category_id=np.array([ann['category_id']
+                                         for ann in anns], dtype=np.int64),
+                    bbox=np.array([ann['bbox'] for ann in anns],
+                                  dtype=np.float64).reshape(-1, 4),
+                    area=np.array([ann['area'] for ann in anns],
+                                  dtype=np.float64),
+                    score=np.array([ann.get('score', np.nan)
+                                   for ann in anns], dtype=np.float64),
+                    count=np.full(num, NONE, dtype=np.int8),
+                    type=np.full(num, NONE, dtype=np.int8),
+                    corr_id=np.full(num, -1, dtype=np.int64),
+                    iou=np.full(num, np.nan, dtype=np.float64))
+
+        count_codes = {name: code for code, name in enumerate(COUNTS)}
+        type_codes = {name: code for code, name in enumerate(TYPES)}
+        for row, ann in enumerate(anns):
+            ev = ann.pop('eval', None)
+            if ev is None:
+                if require_eval:
+                    raise ValueError('Annotation ' + str(ann['id']) + ' is not evaluated')
+                continue
+            store.count[row] = count_codes.get(ev['count'], NONE)
+            store.type[row] = type_codes.get(ev['type'], NONE)
+            if ev['corr_id'] is not None:
+                store.corr_id[row] = ev['corr_id']
+            if ev['iou'] is not None:
+                store.iou[row] = ev['iou']
+            if 'type_sweep' in ev:
+                if store.type_sweep is None:
+                    store.type_sweep = np.full(
+                        (num, len(ev['type_sweep'])), NONE, dtype=np.int8)
+                store.type_sweep[row] = [type_codes.get(
+                    t, NONE) for t in ev['type_sweep']]
+            if 'type_scores' in ev:
+                if store.type_scores is None:
+                    store.type_scores = np.full((num, 4), np.nan)
+                store.type_scores[row] = [
+                    score if score is not None else np.nan for score in ev['type_scores']]
+        return store
+
+    def __len__(self) -> int:
+        # Middle files of COCOChunkEvaluator do not have ids.
+        return len(self.type)
+
+    def rows_per_img(self, img_id: int) -> NDArray:
+        """Rows of the annotations in one image, in the order of the source list.
+
+        Args:
+            img_id (int): Image Id
+
+        Returns:
+            NDArray: Row indices
+        """
+        if self._img_order is None:
+            self._img_order = np.argsort(self.image_id, kind='stable')
+            self._img_ids = self.image_id[self._img_order]
+        start, end = np.searchsorted(self._img_ids, [img_id, img_id + 1])
+        return self._img_order[start:end]
+
+    def update_eval(self, rows: NDArray, types: NDArray, miss_count: int, corr_ids: NDArray, corrs: NDArray, ious: NDArray) -> None:
+        """Write evaluations of some annotations. Annotations whose type is NONE are left as they are.
+
+        Args:
+            rows (NDArray): Row indices
+            types (NDArray): Type codes
+            miss_count (int): Count code of types other than Match, FN for gts and FP for dts.
+            corr_ids (NDArray): Ids of the candidates of the corresponding boxes
+            corrs (NDArray): Indices of corr_ids (-1 if none)
+            ious (NDArray): IoUs with the corresponding boxes
+        """
+        is_evaluated = types != NONE
+        rows = rows[is_evaluated]
+        types = types[is_evaluated]
+        self.type[rows] = types
+        self.count[rows] = np.where(types == MATCH, TP, miss_count)
+        # -1 of corrs indexes the appended -1.
+        self.corr_id[rows] = np.append(corr_ids, -1)[corrs[is_evaluated]]
+        self.iou[rows] = ious[is_evaluated]
+
+    def update_eval_sweep(self, rows: NDArray, types: NDArray) -> None:
+        """Write type codes for IoU thresholds of a sweep.
+
+        Args:
+            rows (NDArray): Row indices
+            types (NDArray): Type codes, NUM_rows x NUM_threshs
+        """
+        if self.type_sweep is None:
+            self.type_sweep = np.full(
+                (len(self), types.shape[1]), NONE, dtype=np.int8)
+        self.type_sweep[rows] = types
+
+    def update_type_scores(self, rows: NDArray, scores: NDArray) -> None:
+        """Write the highest scores of dts which make gts Match, LC, Cls and Loc.
+
+        Args:
+            rows (NDArray): Row indices
+            scores (NDArray): Scores, NUM_rows x 4
+        """
+        if self.type_scores is None:
+            self.type_scores = np.full((len(self), 4), np.nan)
+        self.type_scores[rows] = scores
+
+    def eval_dict(self, row: int) -> dict:
+        """Materialize the evaluation of one annotation as an 'eval' dict of the middle file.
+
+        Args:
+            row (int): Row index
+
+        Returns:
+            dict: {'count', 'type', 'corr_id', 'iou'}, and 'type_sweep' and 'type_scores' if the store has them
+        """
+        corr_id = int(self.corr_id[row])
+        iou = float(self.iou[row])
+        ev = {'count': COUNT_NAMES[self.count[row]], 'type': TYPE_NAMES[self.type[row]],
+              'corr_id': corr_id if corr_id >= 0 else None, 'iou': iou if not np.isnan(iou) else None}
+        if self.type_sweep is not None:
+            ev['type_sweep'] = TYPE_NAMES[self.type_sweep[row]].tolist()
+        if self.type_scores is not None:
+            ev['type_scores'] = [score if not np.isnan(score) else None
+                                 for score in self.type_scores[row].tolist()]
+        return ev
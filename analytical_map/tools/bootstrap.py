@@ -0,0 +1,166 @@
+import numpy as np
+from nptyping import NDArray
+from typing import Iterator
+
+from analytical_map.tools.matching import TYPES, MATCH, TP
+
+
+def resample_weights(num_imgs: int, num_resamples: int, batch_size: int, seed: int = 0) -> Iterator[NDArray]:
+    """Draw bootstrap resamples of images as weights.
+
+    The weight of an image is the number of times it is drawn, so that a resample is evaluated
+    by weighting the per-image evaluations instead of copying them.
+
+    Args:
+        num_imgs (int): Number of images
+        num_resamples (int): Number of resamples
+        batch_size (int): Number of resamples in one batch
+        seed (int, optional): Seed. Defaults to 0.
+
+    Yields:
+        Iterator[NDArray]: Weights, batch_size x num_imgs (the last batch can be smaller)
+    """
+    rng = np.random.default_rng(seed)
+    pvals = np.full(num_imgs, 1 / num_imgs)
+    for start in range(0, num_resamples, batch_size):
+        size = min(batch_size, num_resamples - start)
+        yield rng.multinomial(num_imgs, pvals, size=size).astype(np.float64)
+
+
+def group_sums(weights: NDArray, keys: NDArray, num_groups: int) -> NDArray:
+    """Sum weights of each group for each resample.
+
+    Args:
+        weights (NDArray): Weights of elements, num_resamples x num_elements
+        keys (NDArray): Group of each element
+        num_groups (int): Number of groups
+
+    Returns:
+        NDArray: num_resamples x num_groups
+    """
+    sums = np.zeros((len(weights), num_groups))
+    if len(keys) == 0:
+        return sums
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    sums[:, keys[starts]] = np.add.reduceat(
+        weights[:, order], starts, axis=1)
+    return sums
+
+
+def weighted_ap(num_gts: NDArray, weights: NDArray, is_tps: NDArray, recall_inter: NDArray) -> NDArray:
+    """Calculate AP of each resample, where dts are weighted by the number of times their images are drawn.
+
+    The result is the same as metrics.pr_curve on the resample with the copies of dts.
+    A dt of weight k is k points of the curve, so a point of the copies is interpolated from the cumulative sums.
+    All curves of all resamples are searched at once: each curve is offset by a constant larger than its counts,
+    so that the curves are one ascending array.
+
+    Args:
+        num_gts (NDArray): Weighted number of gts of each resample
+        weights (NDArray): Weights of dts, num_resamples x num_dts. Dts are sorted by score in descending order.
+        is_tps (NDArray): True if the dt is TP, num_dts, or num_curves x num_dts for curves of several definitions of TP
+        recall_inter (NDArray): Points of recall to calculate average precision
+
+    Returns:
+        NDArray: AP of each resample, num_resamples, or num_curves x num_resamples
+    """
+    is_batch = np.ndim(is_tps) == 2
+    is_tps = np.atleast_2d(is_tps)
+    num_curves, num_resamples = len(is_tps), len(weights)
+    num_points = weights.shape[1] + 1
+
+    # The first column is the start point of the curve.
+    count_TP = np.cumsum(np.pad(weights[None] * is_tps[:, None], ((0, 0), (0, 0), (1, 0))), axis=2)
+    count_dts = np.cumsum(np.pad(weights, ((0, 0), (1, 0))), axis=1)
+
+    # The least number of TPs whose recall is recall_inter or more, as the comparison of pr_curve.
+    # The product is rounded either way, so ceil is corrected in both directions.
+    has_gts = num_gts > 0
+    denom = np.where(has_gts, num_gts, 1)[:, None]
+    num_tps = np.ceil(recall_inter[None] * denom)
+    num_tps += num_tps / denom < recall_inter
+    num_tps -= (num_tps - 1) / denom >= recall_inter
+    num_tps = np.maximum(num_tps, 0)
+
+    # Counts are integers, so offsets keep them exact. A number of TPs beyond a curve is found at the end of it.
+    offset = max(count_TP[..., -1].max(initial=0), num_tps.max(initial=0)) + 1
+    rows = np.arange(num_curves * num_resamples).reshape(num_curves, num_resamples, 1)
+    ids = np.searchsorted((count_TP + rows * offset).ravel(),
+                          (num_tps[None] + rows * offset).ravel(), side='left')
+    # The first dt which reaches num_tps, and the counts before it.
+    prev = np.maximum(ids.reshape(num_curves, num_resamples, -1) - rows * num_points - 1, 0)
+    prev_TP = np.take_along_axis(count_TP, prev, axis=2)
+    prev_dts = count_dts[np.arange(num_resamples)[None, :, None], prev]
+
+    # Precision of the copy of the dt which reaches num_tps.
+    # Recall 0 is the start point of the curve, and unreachable recalls are the end point.
+    prec = np.where(num_tps == 0, 1.0, np.where(num_tps > count_TP[..., -1:], 0.0,
+                                                num_tps / np.maximum(prev_dts + num_tps - prev_TP, 1)))
+    prec_inter = np.maximum.accumulate(prec[..., ::-1], axis=2)[..., ::-1]
+    aps = np.where(has_gts, prec_inter.mean(axis=2), 0.0)
+    return aps if is_batch else aps[0]
+
+
+def weighted_ap_per_type(num_gts: NDArray, weights: NDArray, scores: NDArray, counts: NDArray, types: NDArray, recall_inter: NDArray) -> dict:
+    """Calculate AP, and AP when each type is regarded as TP, of each resample. Same as metrics.ap_per_type.
+
+    The curves of all types are calculated in one call of weighted_ap.
+
+    Args:
+        num_gts (NDArray): Weighted number of gts of each resample
+        weights (NDArray): Weights of dts, num_resamples x num_dts
+        scores (NDArray): Scores of dts
+        counts (NDArray): Count codes of dts
+        types (NDArray): Type codes of dts
+        recall_inter (NDArray): Points of recall to calculate average precision
+
+    Returns:
+        dict: {type: AP of each resample}
+    """
+    inds = np.argsort(-scores, kind='mergesort')
+    weights = weights[:, inds]
+    is_tps = counts[inds] == TP
+    types = types[inds]
+
+    # Types without dts have the same curve as Match.
+    codes = [code for code in range(len(TYPES))
+             if code != MATCH and np.any(types == code)]
+    aps = weighted_ap(num_gts, weights, np.stack(
+        [is_tps] + [is_tps | (types == code) for code in codes]), recall_inter)
+    ap = dict.fromkeys(TYPES, aps[0])
+    for code, ap_type in zip(codes, aps[1:]):
+        ap[TYPES[code]] = ap_type
+    return ap
+
+
+def ap_ratio_batch(ap: dict) -> dict:
+    """Normalized ratio of the AP and the AP improvement of each type for each resample. Same as metrics.ap_ratio.
+
+    Args:
+        ap (dict): {type: AP of each resample}
+
+    Returns:
+        dict: {type: ratio of each resample}
+    """
+    ap_ratio = {k: np.round(v - ap['Match'], 3) if k != 'Match' else np.round(ap['Match'], 3)
+                for k, v in ap.items()}
+    total = sum(ap_ratio.values())
+    return {k: np.divide(v, total, out=np.zeros_like(v), where=v != 0)
+            for k, v in ap_ratio.items()}
+
+
+def percentile_ci(samples: NDArray, alpha: float) -> NDArray:
+    """Percentile confidence intervals.
+
+    Args:
+        samples (NDArray): Bootstrap samples, num_resamples x ...
+        alpha (float): 1 - confidence level
+
+    Returns:
+        NDArray: Lower and upper bounds, ... x 2
+    """
+    bounds = np.percentile(
+        samples, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    return np.round(np.moveaxis(bounds, 0, -1), 3)
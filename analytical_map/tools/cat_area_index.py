@@ -0,0 +1,129 @@
+import numpy as np
+from nptyping import NDArray
+
+
+class CatAreaIndex:
+    """Index of annotations by category and area range.
+
+    Each annotation is bucketed once into a category index and an elementary area cell.
+    Area ranges may overlap (e.g. 'area_all'), so a range is a set of elementary cells, which are the open intervals
+    between all range boundaries and the boundaries themselves. Like COCO.getAnnIds, a range (lo, hi) contains areas
+    with lo < area < hi.
+
+    The last category index is 'single_category', which contains all categories in cat_ids,
+    and the last range index has no area limit.
+    """
+
+    def __init__(self, category_id: NDArray, area: NDArray, cat_ids: list, area_rng: NDArray, order: NDArray = None) -> None:
+        """Init
+
+        Args:
+            category_id (NDArray): Category ids of annotations
+            area (NDArray): Areas of annotations
+            cat_ids (list): Category ids in the order of the results
+            area_rng (NDArray): Area ranges in the order of the results
+            order (NDArray, optional): Order of rows returned by rows(), e.g. score order. Defaults to the row order.
+        """
+        self.num_cats = len(cat_ids)
+        rngs = np.concatenate(
+            [np.asarray(area_rng, dtype=np.float64).reshape(-1, 2), [[-np.inf, np.inf]]])
+        self.num_rngs = len(rngs)
+
+        # Category index, -1 if the category is not in cat_ids.
+        # The appended -1 is the index of unknown categories.
+        cat_ids = np.append(np.asarray(cat_ids, dtype=np.int64), -1)
+        sorter = np.argsort(cat_ids[:-1], kind='stable')
+        pos = np.searchsorted(cat_ids[:-1], category_id, sorter=sorter)
+        cat_index = np.append(sorter, -1)[pos]
+        self.cat_index = np.where(
+            cat_ids[cat_index] == category_id, cat_index, -1)
+
+        # Elementary cells. Cell 2i is the open interval just below bounds[i], and cell 2i+1 is bounds[i] itself.
+        bounds = np.unique(rngs[np.isfinite(rngs)])
+        pos = np.searchsorted(bounds, area, side='left')
+        on_bound = np.append(bounds, np.inf)[pos] == area
+        self.cell = 2 * pos + on_bound
+        self.num_cells = 2 * len(bounds) + 1
+
+        # Membership of cells in ranges, num_cells x num_rngs
+        lower = np.concatenate([[-np.inf], bounds])  # lower end of each open interval
+        upper = np.concatenate([bounds, [np.inf]])  # upper end of each open interval
+        self.in_rng = np.zeros((self.num_cells, self.num_rngs), dtype=bool)
+        self.in_rng[0::2] = (rngs[:, 0][None, :] <= lower[:, None]) & (
+            upper[:, None] <= rngs[:, 1][None, :])
+        self.in_rng[1::2] = (rngs[:, 0][None, :] < bounds[:, None]) & (
+            bounds[:, None] < rngs[:, 1][None, :])
+
+        self.order = np.arange(len(category_id)) if order is None else order
+        self._rows_per_rng = {}
+
+    def count(self, codes: NDArray = None, num_codes: int = 1) -> NDArray:
+        """Count annotations per category, range and code in one pass.
+
+        Args:
+            codes (NDArray, optional): Codes of annotations. Negative codes are not counted. Defaults to counting all annotations.
+            num_codes (int, optional): Number of codes. Defaults to 1.
+
+        Returns:
+            NDArray: Counts, (num_cats + 1) x num_rngs x num_codes
+        """
+        if codes is None:
+            codes = np.zeros(len(self.cat_index), dtype=np.int64)
+        valid = (self.cat_index >= 0) & (codes >= 0)
+        key = (self.cat_index[valid] * self.num_cells +
+               self.cell[valid]) * num_codes + codes[valid]
+        counts_cell = np.bincount(key, minlength=self.num_cats * self.num_cells * num_codes).reshape(
+            self.num_cats, self.num_cells, num_codes)
+        counts = np.einsum('kcv,cr->krv', counts_cell,
+                           self.in_rng.astype(np.int64))
+        return np.concatenate([counts, counts.sum(axis=0, keepdims=True)])
+
+    def count_sparse(self, codes: NDArray) -> list:
+        """Count annotations per range and code, for too many codes to count densely, e.g. pairs of categories.
+
+        Annotations are grouped by code and cell once, and each range sums the groups of its cells.
+
+        Args:
+            codes (NDArray): Codes of annotations. Negative codes are not counted.
+
+        Returns:
+            list: (codes, counts) of each range, only codes of one or more annotations in ascending order
+        """
+        valid = codes >= 0
+        keys, counts = np.unique(codes[valid].astype(np.int64) * self.num_cells + self.cell[valid],
+                                 return_counts=True)
+        key_codes, key_cells = np.divmod(keys, self.num_cells)
+
+        results = []
+        for id_rng in range(self.num_rngs):
+            in_rng = self.in_rng[key_cells, id_rng]
+            # Keys are sorted by codes, so a code is a run of keys.
+            rng_codes, inverse = np.unique(
+                key_codes[in_rng], return_inverse=True)
+            results.append((rng_codes, np.bincount(
+                inverse, weights=counts[in_rng], minlength=len(rng_codes)).astype(np.int64)))
+        return results
+
+    def rows(self, id_cat: int, id_rng: int) -> NDArray:
+        """Rows of annotations in a category and an area range.
+
+        Args:
+            id_cat (int): Category index, num_cats for 'single_category'
+            id_rng (int): Range index
+
+        Returns:
+            NDArray: Rows in the order given at init
+        """
+        if id_rng not in self._rows_per_rng:
+            rows = self.order[self.in_rng[self.cell[self.order], id_rng] & (
+                self.cat_index[self.order] >= 0)]
+            rows_by_cat = rows[np.argsort(
+                self.cat_index[rows], kind='stable')]
+            bounds = np.searchsorted(
+                self.cat_index[rows_by_cat], np.arange(self.num_cats + 1))
+            self._rows_per_rng[id_rng] = (rows, rows_by_cat, bounds)
+
+        rows, rows_by_cat, bounds = self._rows_per_rng[id_rng]
+        if id_cat == self.num_cats:
+            return rows
+        return rows_by_cat[bounds[id_cat]:bounds[id_cat + 1]]
@@ -1,6 +1,7 @@
 from nptyping import NDArray
 from bokeh.plotting import figure
-from bokeh.palettes import Category20c
+from bokeh.palettes import Category20c, Blues256
+from bokeh.models import LinearColorMapper, ColorBar
 import pandas as pd
 from bokeh.transform import cumsum
 from math import pi
@@ -96,3 +97,105 @@ def draw_pr_curve(fig_title: str, recall: NDArray, precision: NDArray, recall_in
 
     p.legend.location = "top_left"
     return p
+
+
+def draw_bar_chart(fig_title: str, values: list, labels: list) -> None:
+    """ Draw a bar chart
+
+    Args:
+        fig_title (str): Output figure title and image name
+        values (list): Values
+        labels (list): Labels
+    Returns:
+        p (Figure): bokeh figure
+    """
+    p = figure(height=350, title=fig_title, toolbar_location=None,
+               tools=TOOLS, tooltips="@labels: @values", x_range=labels)
+
+    p.vbar(x='labels', top='values', width=0.8,
+           source={'labels': labels, 'values': values})
+    p.y_range.start = 0
+    p.xaxis.major_label_orientation = pi/4
+    return p
+
+
+def draw_stacked_bar_chart(fig_title: str, ratios: dict, labels: list) -> None:
+    """ Draw a stacked bar chart of ratios, e.g. the ratios of types of each model side by side.
+
+    Args:
+        fig_title (str): Output figure title and image name
+        ratios (dict): {stack name: values of labels}
+        labels (list): Labels
+    Returns:
+        p (Figure): bokeh figure
+    """
+    p = figure(height=350, title=fig_title, toolbar_location=None,
+               tools=TOOLS, tooltips="$name @labels: @$name", x_range=labels)
+
+    source = {'labels': labels}
+    source.update(ratios)
+    p.vbar_stack(list(ratios.keys()), x='labels', width=0.8, source=source,
+                 color=Category20c[max(3, len(ratios))][:len(ratios)], legend_label=list(ratios.keys()))
+    p.y_range.start = 0
+    p.xaxis.major_label_orientation = pi/4
+    p.legend.location = "top_left"
+    return p
+
+
+def draw_pr_curves(fig_title: str, recall_inter: NDArray, precisions_inter: dict) -> None:
+    """ Draw precision-recall curves of several models in one figure
+
+    Args:
+        fig_title (str): Output figure title and image name
+        recall_inter (NDArray): Recall for integral
+        precisions_inter (dict): {model name: precision for integral}
+    Returns:
+        p (Figure): bokeh figure
+    """
+    p = figure(title=fig_title,
+               toolbar_location="right",
+               tools=TOOLS,
+               tooltips="Data point @x has the value @y",
+               x_axis_label="Recall",
+               y_axis_label="Precision")
+
+    # Colors are reused if there are more than 20 models.
+    colors = Category20c[20]
+    for i, (name, precision_inter) in enumerate(precisions_inter.items()):
+        color = colors[i % len(colors)]
+        p.line(recall_inter, precision_inter, legend_label=name,
+               line_color=color)
+        p.circle(recall_inter, precision_inter, color=color, line_width=5)
+
+    p.legend.location = "top_right"
+    return p
+
+
+def draw_heatmap(fig_title: str, x_labels: list, y_labels: list, xs: list, ys: list, values: list) -> None:
+    """ Draw a heatmap of sparse cells, e.g. a confusion matrix. Only the given cells are drawn.
+
+    Args:
+        fig_title (str): Output figure title and image name
+        x_labels (list): Labels of the x axis
+        y_labels (list): Labels of the y axis, from top to bottom
+        xs (list): Labels of x of cells
+        ys (list): Labels of y of cells
+        values (list): Values of cells
+    Returns:
+        p (Figure): bokeh figure
+    """
+    # A cell is 15 pixels, so that labels of many categories do not overlap.
+    p = figure(title=fig_title, width=max(450, 15 * len(x_labels) + 150), height=max(450, 15 * len(y_labels) + 150),
+               toolbar_location="right", tools=TOOLS, tooltips="@y -> @x: @value",
+               x_range=x_labels, y_range=list(reversed(y_labels)), x_axis_location="above")
+
+    mapper = LinearColorMapper(palette=list(reversed(Blues256)), low=0, high=max(values, default=1))
+    p.rect(x='x', y='y', width=1, height=1, source={'x': xs, 'y': ys, 'value': values},
+           fill_color={'field': 'value', 'transform': mapper}, line_color=None)
+    p.add_layout(ColorBar(color_mapper=mapper), 'right')
+
+    p.grid.grid_line_color = None
+    p.xaxis.major_label_orientation = pi/2
+    p.xaxis.axis_label = "Detection"
+    p.yaxis.axis_label = "Ground truth"
+    return p
@@ -1,23 +1,33 @@
-import json
+import gzip
+import numpy as np
 from dataclasses import asdict
-from typing import List
+from typing import Iterator, List
 from pycocotools.coco import COCO
 from analytical_map.params import COCOParams
+from analytical_map.tools.ann_store import AnnStore
+from analytical_map.tools import json_backend
 import collections as cl
 import os
 import copy
-from typing import List
 
 
-def dump_middle_file_json(cocoGt: COCO, cocoDt: COCO, params: COCOParams, result_dir: str, middle_file: str = 'middle_file.json'):
+def dump_middle_file_json(cocoGt: COCO, cocoDt: COCO, storeGt: AnnStore, storeDt: AnnStore, params: COCOParams, result_dir: str, middle_file: str = 'middle_file.json', compact: bool = False):
     """Dump middle file
 
+    Annotations and detections are written one by one after the evaluation, so that the JSON document and the dicts
+    with 'eval' are not built in memory as a whole. Only the serialization overhead is removed: cocoGt, cocoDt and
+    the stores of the whole evaluation are still in memory while writing. COCOChunkEvaluator spills evaluations per
+    chunk of images for datasets larger than memory.
+
     Args:
         cocoGt (COCO): COCO ground truth
         cocoDt (COCO): COCO detections
+        storeGt (AnnStore): Evaluations of ground truth
+        storeDt (AnnStore): Evaluations of detections
         params (COCOParams): COCO params
         result_dir (str): Result directory path
-        middle_file (str): Middle file name.  Defaults to 'middle_file.json'.
+        middle_file (str): Middle file name, gzipped if it ends with '.gz'.  Defaults to 'middle_file.json'.
+        compact (bool, optional): Write without indents and spaces. Defaults to False.
 
     Returns:
     """
@@ -33,20 +43,19 @@ def dump_middle_file_json(cocoGt: COCO, cocoDt: COCO, params: COCOParams, result
         if query_list[i] == "images":
             tmp = images(cocoGt)
         if query_list[i] == "annotations":
-            tmp = annotations(cocoGt)
+            tmp = annotations(cocoGt, storeGt)
         if query_list[i] == "detections":
-            tmp = detections(cocoDt)
+            tmp = detections(cocoDt, storeDt)
         if query_list[i] == "params":
             tmp = param2dict(params)
         # save it
         js[query_list[i]] = tmp
     # write
     middle_file_path = os.path.join(result_dir, middle_file)
-    fw = open(middle_file_path, 'w')
-    json.dump(js, fw, indent=2)
+    dump_json_stream(js, middle_file_path, compact)
 
 
-def dump_final_results_json(cocoGt: COCO, params: COCOParams, results: list, result_dir: str, final_file: str = 'final_results.json'):
+def dump_final_results_json(cocoGt: COCO, params: COCOParams, results: list, result_dir: str, final_file: str = 'final_results.json', compact: bool = False):
     """Dump final results
 
     Args:
@@ -54,7 +63,8 @@ def dump_final_results_json(cocoGt: COCO, params: COCOParams, results: list, res
         params (COCOParams): COCO params
         results (list): result list
         result_dir (str): Result directory path
-        final_file (str, optional): Final result file name. Defaults to 'final_results.json'.
+        final_file (str, optional): Final result file name, gzipped if it ends with '.gz'. Defaults to 'final_results.json'.
+        compact (bool, optional): Write without indents and spaces. Defaults to False.
     """
 
     os.makedirs(result_dir, exist_ok=True)
@@ -71,8 +81,59 @@ def dump_final_results_json(cocoGt: COCO, params: COCOParams, results: list, res
         if query_list[i] == "results":
             tmp = results
         js[query_list[i]] = tmp
-    fw = open(os.path.join(result_dir, final_file), 'w')
-    json.dump(js, fw, indent=2)
+    dump_json_stream(js, os.path.join(result_dir, final_file), compact)
+
+
+def open_json(path: str, mode: str = 'r'):
+    """Open a JSON file as text, which is gzipped if the path ends with '.gz'.
+
+    Args:
+        path (str): JSON file path
+        mode (str, optional): 'r' or 'w'. Defaults to 'r'.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't')
+    return open(path, mode)
+
+
+def dump_json_stream(js: dict, path: str, compact: bool = False) -> None:
+    """Write a dict as JSON, where iterators of the values are written item by item as lists.
+
+    The output is the same as json.dump(js, fw, indent=2), or json.dump(js, fw, separators=(',', ':')) if compact,
+    except for the spellings of json_backend.dumps. Each item is encoded by the JSON backend.
+
+    Args:
+        js (dict): Dict to write. Its values can be iterators, e.g. generators of annotations.
+        path (str): JSON file path, gzipped if it ends with '.gz'
+        compact (bool, optional): Write without indents and spaces. Defaults to False.
+    """
+    def newline(depth):
+        return '' if compact else '\n' + '  ' * depth
+
+    def dumps(obj, depth):
+        if compact:
+            return json_backend.dumps(obj)
+        # Strings in JSON have no newlines, so the lines of obj are indented at the depth.
+        return json_backend.dumps(obj, indent=True).replace('\n', newline(depth))
+
+    key_separator = ':' if compact else ': '
+    with open_json(path, 'w') as fw:
+        if len(js) == 0:
+            fw.write('{}')
+            return
+        for id_key, (key, value) in enumerate(js.items()):
+            fw.write(('{' if id_key == 0 else ',') + newline(1) +
+                     json_backend.dumps(key) + key_separator)
+            if not isinstance(value, Iterator):
+                fw.write(dumps(value, 1))
+                continue
+            is_empty = True
+            for obj in value:
+                fw.write(('[' if is_empty else ',') +
+                         newline(2) + dumps(obj, 2))
+                is_empty = False
+            fw.write('[]' if is_empty else newline(1) + ']')
+        fw.write(newline(0) + '}')
 
 
 def images(cocoGt):
@@ -84,19 +145,29 @@ def categories(cocoGt):
     return cocoGt.loadCats(cocoGt.getCatIds())
 
 
-def annotations(cocoGt):
+def annotations(cocoGt, storeGt):
     annIds = cocoGt.getAnnIds()
-    return cocoGt.loadAnns(ids=annIds)
+    return with_eval(cocoGt.loadAnns(ids=annIds), storeGt)
 
 
-def detections(cocoDt):
+def detections(cocoDt, storeDt):
     annIds = cocoDt.getAnnIds()
-    return cocoDt.loadAnns(ids=annIds)
+    return with_eval(cocoDt.loadAnns(ids=annIds), storeDt)
+
+
+def with_eval(anns, store):
+    # Annotations are in the same order as the store, so that the i-th row is the i-th annotation.
+    for row, ann in enumerate(anns):
+        yield dict(ann, eval=store.eval_dict(row))
 
 
 def param2dict(params):
     _params = copy.deepcopy(params)
     _params.recall_inter = _params.recall_inter.tolist()
     _params.area_rng = _params.area_rng.tolist()
+    if _params.iou_threshs is not None:
+        _params.iou_threshs = np.asarray(_params.iou_threshs).tolist()
+    if _params.score_threshs is not None:
+        _params.score_threshs = np.asarray(_params.score_threshs).tolist()
     tmp = asdict(_params)
     return tmp
@@ -0,0 +1,108 @@
+import hashlib
+import numpy as np
+from nptyping import NDArray
+from typing import Tuple
+
+from analytical_map.tools.ann_store import AnnStore
+
+
+def image_fingerprints(store: AnnStore) -> dict:
+    """Fingerprints of the annotations of each image.
+
+    A fingerprint is a hash of boxes, categories and scores of the annotations in the order of the source list,
+    which are all inputs of the evaluation of an image. Ids are not hashed, because ids of detections are
+    renumbered when detections of other images change.
+
+    Args:
+        store (AnnStore): Ground truth or detection store
+
+    Returns:
+        dict: {image id: fingerprint}
+    """
+    order = np.argsort(store.image_id, kind='stable')
+    img_ids, starts = np.unique(store.image_id[order], return_index=True)
+    bbox = np.ascontiguousarray(store.bbox[order])
+    category_id = store.category_id[order]
+    score = store.score[order]
+
+    fingerprints = {}
+    for img_id, start, end in zip(img_ids.tolist(), starts, np.append(starts[1:], len(order))):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(bbox[start:end].tobytes())
+        h.update(category_id[start:end].tobytes())
+        h.update(score[start:end].tobytes())
+        fingerprints[img_id] = h.digest()
+    return fingerprints
+
+
+def unchanged_images(storeGt: AnnStore, storeDt: AnnStore, prevGt: AnnStore, prevDt: AnnStore, img_ids: list) -> list:
+    """Images whose gts and dts are the same as the ones of a previous evaluation.
+
+    Args:
+        storeGt (AnnStore): Ground truth store
+        storeDt (AnnStore): Detection store
+        prevGt (AnnStore): Ground truth store of the previous evaluation
+        prevDt (AnnStore): Detection store of the previous evaluation
+        img_ids (list): Image Ids
+
+    Returns:
+        list: Image Ids of unchanged images
+    """
+    gts, dts = image_fingerprints(storeGt), image_fingerprints(storeDt)
+    prev_gts, prev_dts = image_fingerprints(prevGt), image_fingerprints(prevDt)
+    # An image without annotations has no fingerprint, and is the same as another image without annotations.
+    return [img_id for img_id in img_ids
+            if gts.get(img_id) == prev_gts.get(img_id) and dts.get(img_id) == prev_dts.get(img_id)]
+
+
+def corresponding_rows(store: AnnStore, prev: AnnStore, img_ids: list) -> Tuple[NDArray, NDArray]:
+    """Rows of the same annotations in two stores, for images whose annotations are the same.
+
+    Args:
+        store (AnnStore): Store
+        prev (AnnStore): Previous store
+        img_ids (list): Image Ids of unchanged images
+
+    Returns:
+        Tuple[NDArray, NDArray]: Rows of store and rows of prev
+    """
+    if len(img_ids) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    rows = np.concatenate([store.rows_per_img(img_id) for img_id in img_ids])
+    prev_rows = np.concatenate([prev.rows_per_img(img_id)
+                               for img_id in img_ids])
+    return rows, prev_rows
+
+
+def copy_evaluations(store: AnnStore, prev: AnnStore, rows: NDArray, prev_rows: NDArray, other: AnnStore, prev_other: AnnStore, other_rows: NDArray, prev_other_rows: NDArray) -> None:
+    """Copy evaluations of unchanged annotations from a previous store.
+
+    corr_id is translated from the ids of the previous store of the other side (detections for gts) to the current ones,
+    since the corresponding boxes are in the same unchanged images.
+
+    Args:
+        store (AnnStore): Store to be updated
+        prev (AnnStore): Previous store
+        rows (NDArray): Rows of store
+        prev_rows (NDArray): Rows of prev corresponding to rows
+        other (AnnStore): Store of the other side
+        prev_other (AnnStore): Previous store of the other side
+        other_rows (NDArray): Rows of other
+        prev_other_rows (NDArray): Rows of prev_other corresponding to other_rows
+    """
+    store.count[rows] = prev.count[prev_rows]
+    store.type[rows] = prev.type[prev_rows]
+    store.iou[rows] = prev.iou[prev_rows]
+    if prev.type_sweep is not None:
+        store.update_eval_sweep(rows, prev.type_sweep[prev_rows])
+    if prev.type_scores is not None:
+        store.update_type_scores(rows, prev.type_scores[prev_rows])
+
+    prev_ids = prev_other.id[prev_other_rows]
+    order = np.argsort(prev_ids, kind='stable')
+    corr_ids = prev.corr_id[prev_rows]
+    has_corr = corr_ids != -1
+    inds = order[np.searchsorted(prev_ids[order], corr_ids[has_corr])]
+    new_corr_ids = np.full(len(rows), -1, dtype=np.int64)
+    new_corr_ids[has_corr] = other.id[other_rows[inds]]
+    store.corr_id[rows] = new_corr_ids
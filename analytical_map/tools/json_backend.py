@@ -0,0 +1,121 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # Optional, pip install orjson
+    orjson = None
+try:
+    import simdjson
+except ImportError:  # Optional, pip install pysimdjson
+    simdjson = None
+try:
+    import ujson
+except ImportError:  # Optional, pip install ujson
+    ujson = None
+
+# Backends in the order of preference. simdjson only parses, and dumps of the standard library is used with it.
+BACKENDS = ['orjson', 'simdjson', 'ujson', 'json']
+# Environment variable of the backend, which is inherited by worker processes.
+ENV_BACKEND = 'ANALYTICAL_MAP_JSON'
+
+_modules = {'orjson': orjson, 'simdjson': simdjson, 'ujson': ujson, 'json': json}
+_backend = None
+
+
+def available_backends() -> list:
+    """Installed backends in the order of preference.
+
+    Returns:
+        list: Names of the backends, always ending with 'json' of the standard library
+    """
+    return [name for name in BACKENDS if _modules[name] is not None]
+
+
+def set_backend(name: str = None) -> str:
+    """Select the backend of loads and dumps.
+
+    Args:
+        name (str, optional): 'orjson', 'simdjson', 'ujson' or 'json'. Defaults to the environment variable ANALYTICAL_MAP_JSON,
+            or the fastest installed backend.
+
+    Returns:
+        str: Name of the selected backend
+    """
+    global _backend
+    if name is None:
+        name = os.environ.get(ENV_BACKEND) or available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError('Unknown JSON backend ' + name + ', choose from ' + ', '.join(BACKENDS))
+    if _modules[name] is None:
+        raise ValueError('JSON backend ' + name + ' is not installed')
+    _backend = name
+    os.environ[ENV_BACKEND] = name
+    return name
+
+
+def get_backend() -> str:
+    if _backend is None:
+        return set_backend()
+    return _backend
+
+
+def loads(s):
+    """Decode a JSON document with the selected backend.
+
+    Documents which the backend can not decode, e.g. NaN written by the standard library, are decoded by the standard library.
+
+    Args:
+        s (str or bytes): JSON document
+
+    Returns:
+        Any: Decoded object
+    """
+    backend = get_backend()
+    if backend == 'json':
+        return json.loads(s)
+    try:
+        return _modules[backend].loads(s)
+    except (ValueError, RuntimeError):
+        return json.loads(s)
+
+
+def load(fr):
+    """Decode a JSON file object with the selected backend.
+
+    Args:
+        fr (TextIO): File object
+
+    Returns:
+        Any: Decoded object
+    """
+    return loads(fr.read())
+
+
+def dumps(obj, indent: bool = False) -> str:
+    """Encode an object as JSON with the selected backend.
+
+    The layout is the same as json.dumps(obj, indent=2), or json.dumps(obj, separators=(',', ':')) if not indent,
+    while floats may be spelled differently (e.g. 1e-5 for 1e-05), non-ASCII characters may be written without escapes,
+    and orjson writes NaN as null.
+    Objects which the backend can not encode, e.g. integers of more than 64 bits, are encoded by the standard library.
+
+    Args:
+        obj (Any): Object
+        indent (bool, optional): Indent by 2 spaces. Defaults to False.
+
+    Returns:
+        str: JSON document
+    """
+    backend = get_backend()
+    try:
+        if backend == 'orjson':
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            return orjson.dumps(obj, option=option).decode()
+        if backend == 'ujson':
+            return ujson.dumps(obj, indent=2 if indent else 0, escape_forward_slashes=False)
+    except (TypeError, OverflowError):
+        pass
+    if indent:
+        return json.dumps(obj, indent=2)
+    return json.dumps(obj, separators=(',', ':'))
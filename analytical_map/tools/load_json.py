@@ -0,0 +1,342 @@
+import copy
+import os
+import glob
+from typing import Iterator, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from pycocotools.coco import COCO
+
+from analytical_map.tools.ann_store import AnnStore
+from analytical_map.tools.middle_file_npz import load_middle_file_npz
+from analytical_map.tools.dump_json import open_json
+from analytical_map.tools import json_backend
+
+WHITESPACE = ' \t\n\r'
+# Extensions of shards in a directory
+SHARD_EXTS = ('.json', '.jsonl', '.json.gz', '.jsonl.gz')
+
+
+def iter_json_array(fr, chunk_size: int = 1 << 22) -> Iterator[dict]:
+    """Iterate over the elements of a JSON array of objects without decoding the whole file.
+
+    The file is read by chunks, and the complete elements in each chunk are decoded at once.
+
+    Args:
+        fr (TextIO): File object whose content is a JSON array of objects
+        chunk_size (int, optional): Number of characters read at once. Defaults to 1 << 22.
+
+    Yields:
+        Iterator[dict]: Elements of the array
+    """
+    buf = ''
+    started = False
+    eof = False
+
+    while not eof:
+        more = fr.read(chunk_size)
+        eof = not more
+        buf += more
+
+        if not started:
+            buf = buf.lstrip(WHITESPACE)
+            if not buf:
+                continue
+            if buf[0] != '[':
+                raise ValueError('Detections must be a JSON array')
+            buf = buf[1:]
+            started = True
+
+        # Drop the separator after the last decoded element.
+        buf = buf.lstrip(WHITESPACE)
+        if buf.startswith(','):
+            buf = buf[1:]
+
+        # The buffer is decoded up to the last '}' which closes an element.
+        # A '}' inside an element can not close a valid array, so it is skipped by the decode error.
+        end = len(buf)
+        while True:
+            end = buf.rfind('}', 0, end)
+            if end < 0:
+                break
+            try:
+                objs = json_backend.loads('[' + buf[:end + 1] + ']')
+            except ValueError:
+                continue
+            yield from objs
+            buf = buf[end + 1:]
+            break
+
+    if not started or buf.strip(WHITESPACE) != ']':
+        raise ValueError('Invalid JSON array')
+
+
+def iter_annotations(path: str) -> Iterator[dict]:
+    """Iterate over annotations of a JSON Lines file or a file of a JSON array without loading the whole file.
+
+    Args:
+        path (str): '.jsonl' file of one annotation per line, or JSON file of an array of annotations, gzipped if it ends with '.gz'
+
+    Yields:
+        Iterator[dict]: Annotations
+    """
+    with open_json(path) as fr:
+        if path.endswith('.jsonl') or path.endswith('.jsonl.gz'):
+            for line in fr:
+                if line.strip(WHITESPACE):
+                    yield json_backend.loads(line)
+        else:
+            yield from iter_json_array(fr)
+
+
+def group_by_image(anns: Iterator[dict]) -> Iterator[Tuple[int, list]]:
+    """Group annotations sorted by image id.
+
+    Args:
+        anns (Iterator[dict]): Annotations sorted by image id
+
+    Yields:
+        Iterator[Tuple[int, list]]: Image id and its annotations
+    """
+    img_id, group = None, []
+    for ann in anns:
+        if img_id is not None and ann['image_id'] != img_id:
+            if ann['image_id'] < img_id:
+                raise ValueError('Annotations must be sorted by image id')
+            yield img_id, group
+            group = []
+        img_id = ann['image_id']
+        group.append(ann)
+    if img_id is not None:
+        yield img_id, group
+
+
+def iter_image_chunks(gts: Iterator[dict], dts: Iterator[dict], chunk_size: int) -> Iterator[Tuple[list, list, list]]:
+    """Merge gts and dts sorted by image id into chunks of images.
+
+    Args:
+        gts (Iterator[dict]): Gts sorted by image id
+        dts (Iterator[dict]): Dts sorted by image id
+        chunk_size (int): Number of images per chunk
+
+    Yields:
+        Iterator[Tuple[list, list, list]]: Image ids, gts and dts of a chunk
+    """
+    gt_groups, dt_groups = group_by_image(gts), group_by_image(dts)
+    gt, dt = next(gt_groups, None), next(dt_groups, None)
+    img_ids, chunk_gts, chunk_dts = [], [], []
+    while gt is not None or dt is not None:
+        img_id = min([group[0] for group in [gt, dt] if group is not None])
+        img_ids.append(img_id)
+        if gt is not None and gt[0] == img_id:
+            chunk_gts += gt[1]
+            gt = next(gt_groups, None)
+        if dt is not None and dt[0] == img_id:
+            chunk_dts += dt[1]
+            dt = next(dt_groups, None)
+        if len(img_ids) == chunk_size:
+            yield img_ids, chunk_gts, chunk_dts
+            img_ids, chunk_gts, chunk_dts = [], [], []
+    if len(img_ids) > 0:
+        yield img_ids, chunk_gts, chunk_dts
+
+
+def is_sharded(path: str) -> bool:
+    """True if the path is a directory of shards or a glob pattern.
+    """
+    return os.path.isdir(path) or any([c in path for c in '*?['])
+
+
+def expand_paths(path: str) -> list:
+    """Files of a path, which is a file, a directory of shards or a glob pattern.
+
+    Shards of a directory are its files of SHARD_EXTS. Shards are sorted by name, so that ids of detections are the same in every run.
+
+    Args:
+        path (str): File path, directory path or glob pattern, e.g. 'dts/*.jsonl'
+
+    Returns:
+        list: File paths
+    """
+    if os.path.isdir(path):
+        return sorted([os.path.join(path, f) for f in os.listdir(path) if f.endswith(SHARD_EXTS)])
+    if is_sharded(path):
+        return sorted([f for f in glob.glob(path) if os.path.isfile(f)])
+    return [path]
+
+
+def map_shards(func, tasks: list, workers: int = 1) -> list:
+    """Apply func to tasks of shards, with a process pool if workers is more than 1.
+
+    Returns:
+        list: Results in the order of tasks
+    """
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            return list(executor.map(func, tasks))
+    return [func(task) for task in tasks]
+
+
+def _load_gt_shard(path: str) -> dict:
+    with open_json(path) as fr:
+        return json_backend.load(fr)
+
+
+def _load_dt_shard(task: tuple) -> list:
+    path, score_thresh = task
+    return [dt for dt in iter_annotations(path)
+            if dt['score'] >= score_thresh]  # remove low scores
+
+
+def load_coco(path: str) -> COCO:
+    """Load a COCO file like COCO(path), but parsed by the JSON backend.
+
+    Args:
+        path (str): COCO file path, gzipped if it ends with '.gz'
+
+    Returns:
+        COCO: COCO dataset
+    """
+    with open_json(path) as fr:
+        dataset = json_backend.load(fr)
+    assert type(dataset) == dict, 'annotation file format {} not supported'.format(
+        type(dataset))
+    coco = COCO()
+    coco.dataset = dataset
+    coco.createIndex()
+    return coco
+
+
+def load_ground_truth(cocoGt_file: str, workers: int = 1) -> COCO:
+    """Load COCO ground truth from a file, or from shards of COCO ground truth files parsed in parallel.
+
+    Images and annotations of shards are concatenated, and shards must have the same categories.
+
+    Args:
+        cocoGt_file (str): COCO ground truth path, a directory of shards or a glob pattern
+        workers (int, optional): Number of processes to parse shards. Defaults to 1.
+
+    Returns:
+        COCO: COCO ground truth
+    """
+    if not is_sharded(cocoGt_file):
+        return load_coco(cocoGt_file)
+
+    datasets = map_shards(_load_gt_shard, expand_paths(cocoGt_file), workers)
+    assert len(datasets) > 0, 'No shards of ' + cocoGt_file
+    assert all([dataset['categories'] == datasets[0]['categories'] for dataset in datasets]), \
+        'Shards have different categories'
+    dataset = {k: v for k, v in datasets[0].items() if k not in [
+        'images', 'annotations']}
+    # An image may be in several shards, e.g. shards of annotations of the same images.
+    images = {}
+    for shard in datasets:
+        images.update({img['id']: img for img in shard['images']})
+    dataset['images'] = list(images.values())
+    dataset['annotations'] = [ann for shard in datasets for ann in shard['annotations']]
+
+    cocoGt = COCO()
+    cocoGt.dataset = dataset
+    cocoGt.createIndex()
+    return cocoGt
+
+
+def load_detections(cocoGt: COCO, cocoDt_file: str, score_thresh: float, workers: int = 1) -> COCO:
+    """Load detections in one pass, dropping low scores while parsing.
+
+    The result is the same as cocoGt.loadRes on the detections whose scores are score_thresh or more,
+    but the detection file is streamed and the index is built only once.
+    Shards are parsed in parallel, and their detections are concatenated in the order of expand_paths.
+
+    Args:
+        cocoGt (COCO): COCO ground truth
+        cocoDt_file (str): COCO detection file path, '.jsonl' file, a directory of shards or a glob pattern
+        score_thresh (float): Detections with lower scores are dropped.
+        workers (int, optional): Number of processes to parse shards. Defaults to 1.
+
+    Returns:
+        COCO: COCO detections
+    """
+    shards = map_shards(_load_dt_shard, [(path, score_thresh)
+                                         for path in expand_paths(cocoDt_file)], workers)
+    anns = [dt for shard in shards for dt in shard]
+
+    return build_detections(cocoGt, anns)
+
+
+def build_detections(cocoGt: COCO, anns: list) -> COCO:
+    """Build COCO detections from detection dicts like COCO.loadRes, without copying them.
+
+    Args:
+        cocoGt (COCO): COCO ground truth
+        anns (list): Detections in COCO format. They are modified in place.
+
+    Returns:
+        COCO: COCO detections
+    """
+    img_ids = set(cocoGt.getImgIds())
+    assert all([ann['image_id'] in img_ids for ann in anns]), \
+        'Results do not correspond to current coco set'
+
+    # Same as the bounding box results of COCO.loadRes
+    for id, ann in enumerate(anns):
+        bb = ann['bbox']
+        x1, x2, y1, y2 = [bb[0], bb[0]+bb[2], bb[1], bb[1]+bb[3]]
+        if not 'segmentation' in ann:
+            ann['segmentation'] = [[x1, y1, x1, y2, x2, y2, x2, y1]]
+        ann['area'] = bb[2]*bb[3]
+        ann['id'] = id+1
+        ann['iscrowd'] = 0
+
+    cocoDt = COCO()
+    cocoDt.dataset['info'] = copy.deepcopy(cocoGt.dataset.get('info', {}))
+    cocoDt.dataset['images'] = [img for img in cocoGt.dataset['images']]
+    cocoDt.dataset['categories'] = copy.deepcopy(
+        cocoGt.dataset['categories'])
+    cocoDt.dataset['annotations'] = anns
+    cocoDt.createIndex()
+    return cocoDt
+
+
+def load_middle_file_json(middle_file: str) -> Tuple[COCO, COCO, AnnStore, AnnStore]:
+    """Load a JSON middle file with a single parse.
+
+    Ground truth and detections are indexed from one decoded document, and 'eval' of every annotation
+    is moved into the stores while they are built.
+
+    Args:
+        middle_file (str): Path of the middle file, gzipped if it ends with '.gz'
+
+    Returns:
+        Tuple[COCO, COCO, AnnStore, AnnStore]: cocoGt, cocoDt, storeGt, storeDt. None if an annotation is not evaluated.
+    """
+    with open_json(middle_file) as fr:
+        dataset = json_backend.load(fr)
+    dts = dataset.pop('detections')
+
+    cocoGt = COCO()
+    cocoGt.dataset = dataset
+    cocoGt.createIndex()
+    cocoDt = build_detections(cocoGt, dts)
+
+    try:
+        storeGt = AnnStore.from_anns(
+            cocoGt.dataset['annotations'], require_eval=True)
+        storeDt = AnnStore.from_anns(
+            cocoDt.dataset['annotations'], require_eval=True)
+    except ValueError:
+        return None
+    return cocoGt, cocoDt, storeGt, storeDt
+
+
+def load_middle_file(middle_file: str) -> Tuple[COCO, COCO, AnnStore, AnnStore]:
+    """Load a middle file. The format is selected by the extension, '.npz' or '.json'.
+
+    Args:
+        middle_file (str): Path of the middle file
+
+    Returns:
+        Tuple[COCO, COCO, AnnStore, AnnStore]: cocoGt, cocoDt, storeGt, storeDt. None if an annotation is not evaluated.
+    """
+    if os.path.splitext(middle_file)[1] == '.npz':
+        # Evaluations of npz middle files are always in the stores.
+        return load_middle_file_npz(middle_file)
+    return load_middle_file_json(middle_file)
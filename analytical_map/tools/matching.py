@@ -0,0 +1,433 @@
+import numpy as np
+from nptyping import NDArray
+from typing import Tuple
+
+# Type codes. The order follows the `type` list of the evaluator, and NONE marks a box which is not evaluated yet.
+TYPES = ['Match', 'LC', 'DC', 'Cls', 'Loc', 'Bkg', 'Miss']
+MATCH, LC, DC, CLS, LOC, BKG, MISS = range(len(TYPES))
+NONE = -1
+
+# Count codes.
+COUNTS = ['TP', 'FP', 'FN']
+TP, FP, FN = range(len(COUNTS))
+
+# Priority of each type code, the same as `type_order` of the evaluator.
+# The last element is the priority of NONE, so that TYPE_ORDER[NONE] works as well.
+TYPE_ORDER = (0, 1, 1, 2, 3, 4, 4, 5)
+
+
+def iou_matrix(gt_bbs: NDArray, dt_bbs: NDArray) -> NDArray:
+    """Calculate IoU between all gts and all dts in one broadcast.
+
+    Args:
+        gt_bbs (NDArray): NUM_gts x 4 Bounding boxes of gts
+        dt_bbs (NDArray): NUM_dts x 4 Bounding boxes of dts
+
+    Returns:
+        NDArray: IoU(NUM_gts x NUM_dts)
+    """
+    gt_bbs = gt_bbs[:, None, :]
+    dt_bbs = dt_bbs[None, :, :]
+
+    gt_areas = (gt_bbs[..., 2] + 1) \
+        * (gt_bbs[..., 3] + 1)
+
+    dt_areas = (dt_bbs[..., 2] + 1) \
+        * (dt_bbs[..., 3] + 1)
+
+    abx_min = np.maximum(gt_bbs[..., 0], dt_bbs[..., 0])  # xmin
+    aby_min = np.maximum(gt_bbs[..., 1], dt_bbs[..., 1])  # ymin
+    abx_max = np.minimum(gt_bbs[..., 0] + gt_bbs[..., 2],
+                         dt_bbs[..., 0] + dt_bbs[..., 2])  # xmax
+    aby_max = np.minimum(gt_bbs[..., 1] + gt_bbs[..., 3],
+                         dt_bbs[..., 1] + dt_bbs[..., 3])  # ymax
+
+    w = np.maximum(0, abx_max - abx_min + 1)
+    h = np.maximum(0, aby_max - aby_min + 1)
+    intersect = w*h
+
+    iou = intersect / (gt_areas + dt_areas - intersect)
+    return iou
+
+
+def iou_pairs(gt_bbs: NDArray, dt_bbs: NDArray, pair_gt: NDArray, pair_dt: NDArray) -> NDArray:
+    """Calculate IoU of pairs of gts and dts, the same as the elements of iou_matrix.
+
+    Args:
+        gt_bbs (NDArray): NUM_gts x 4 Bounding boxes of gts
+        dt_bbs (NDArray): NUM_dts x 4 Bounding boxes of dts
+        pair_gt (NDArray): Indices of gts of pairs
+        pair_dt (NDArray): Indices of dts of pairs
+
+    Returns:
+        NDArray: IoU of each pair
+    """
+    gt_bbs = gt_bbs[pair_gt]
+    dt_bbs = dt_bbs[pair_dt]
+
+    gt_areas = (gt_bbs[:, 2] + 1) * (gt_bbs[:, 3] + 1)
+    dt_areas = (dt_bbs[:, 2] + 1) * (dt_bbs[:, 3] + 1)
+
+    abx_min = np.maximum(gt_bbs[:, 0], dt_bbs[:, 0])
+    aby_min = np.maximum(gt_bbs[:, 1], dt_bbs[:, 1])
+    abx_max = np.minimum(gt_bbs[:, 0] + gt_bbs[:, 2],
+                         dt_bbs[:, 0] + dt_bbs[:, 2])
+    aby_max = np.minimum(gt_bbs[:, 1] + gt_bbs[:, 3],
+                         dt_bbs[:, 1] + dt_bbs[:, 3])
+
+    w = np.maximum(0, abx_max - abx_min + 1)
+    h = np.maximum(0, aby_max - aby_min + 1)
+    intersect = w*h
+
+    return intersect / (gt_areas + dt_areas - intersect)
+
+
+def overlapping_pairs(gt_bbs: NDArray, dt_bbs: NDArray, min_iou: float) -> Tuple[NDArray, NDArray, NDArray]:
+    """Find pairs of gts and dts whose IoU is min_iou or more with a grid, without the IoU matrix.
+
+    Boxes are bucketed into square cells of twice the median box size. Only boxes sharing a cell can overlap,
+    so IoU is calculated for them, and the cost is about O(NUM_gts + NUM_dts + overlaps) instead of O(NUM_gts x NUM_dts).
+
+    Args:
+        gt_bbs (NDArray): NUM_gts x 4 Bounding boxes of gts
+        dt_bbs (NDArray): NUM_dts x 4 Bounding boxes of dts
+        min_iou (float): Minimum IoU of pairs. All pairs are returned if it is 0 or less.
+
+    Returns:
+        Tuple[NDArray, NDArray, NDArray]: Indices of gts, indices of dts and IoUs of pairs, sorted by gts and dts.
+    """
+    num_gts, num_dts = len(gt_bbs), len(dt_bbs)
+    if num_gts == 0 or num_dts == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+
+    pairs = None
+    if min_iou > 0:
+        size = max(float(np.median(np.concatenate(
+            [gt_bbs[:, 2:], dt_bbs[:, 2:]]))), 1.0) * 2
+        origin = np.minimum(gt_bbs[:, :2].min(axis=0),
+                            dt_bbs[:, :2].min(axis=0)) - 1
+        cells_gt = _cells(gt_bbs, origin, size)
+        cells_dt = _cells(dt_bbs, origin, size)
+        # Bucketing is not worth it if boxes cover too many cells, e.g. some boxes are huge.
+        if len(cells_gt[0]) + len(cells_dt[0]) < num_gts * num_dts:
+            pairs = _pairs_in_same_cells(cells_gt, cells_dt, num_dts)
+    if pairs is None:
+        pairs = np.arange(num_gts * num_dts)
+
+    # Pair ids are sorted by gts and dts.
+    pair_gt, pair_dt = np.divmod(pairs, num_dts)
+    ious = iou_pairs(gt_bbs, dt_bbs, pair_gt, pair_dt)
+    keep = ious >= min_iou
+    return pair_gt[keep], pair_dt[keep], ious[keep]
+
+
+def _cells(bbs: NDArray, origin: NDArray, size: float) -> Tuple[NDArray, NDArray]:
+    # A box [x, x + w] overlaps others within [x - 1, x + w + 1] because the intersection adds 1.
+    lo = np.floor((bbs[:, :2] - 1 - origin) / size).astype(np.int64)
+    hi = np.floor((bbs[:, :2] + bbs[:, 2:] + 1 - origin) /
+                  size).astype(np.int64)
+    num_x = hi[:, 0] - lo[:, 0] + 1
+    num_y = hi[:, 1] - lo[:, 1] + 1
+    num_cells = num_x * num_y
+
+    ids = np.repeat(np.arange(len(bbs)), num_cells)
+    offsets = np.arange(num_cells.sum()) - \
+        np.repeat(np.cumsum(num_cells) - num_cells, num_cells)
+    cell_x = lo[ids, 0] + offsets // num_y[ids]
+    cell_y = lo[ids, 1] + offsets % num_y[ids]
+    # Cells are keyed by Cantor pairing, since they are not negative.
+    keys = (cell_x + cell_y) * (cell_x + cell_y + 1) // 2 + cell_y
+    return keys, ids
+
+
+def _pairs_in_same_cells(cells_gt: Tuple[NDArray, NDArray], cells_dt: Tuple[NDArray, NDArray], num_dts: int) -> NDArray:
+    keys_gt, ids_gt = cells_gt
+    keys_dt, ids_dt = cells_dt
+    order = np.argsort(keys_gt, kind='stable')
+    keys_gt, ids_gt = keys_gt[order], ids_gt[order]
+
+    start = np.searchsorted(keys_gt, keys_dt, side='left')
+    end = np.searchsorted(keys_gt, keys_dt, side='right')
+    counts = end - start
+    offsets = np.arange(counts.sum()) - \
+        np.repeat(np.cumsum(counts) - counts, counts)
+    pair_gt = ids_gt[np.repeat(start, counts) + offsets]
+    pair_dt = np.repeat(ids_dt, counts)
+    # Boxes can share more than one cell.
+    return np.unique(pair_gt * num_dts + pair_dt)
+
+
+def match_per_img(gt_bbs: NDArray, gt_cats: NDArray, dt_bbs: NDArray, dt_cats: NDArray,
+                  iou_thresh: float, iou_loc: float, spatial_index: bool = False) -> Tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]:
+    """Assign types to all gts and dts in one image.
+
+    Dts must be sorted by score in descending order.
+
+    Args:
+        gt_bbs (NDArray): NUM_gts x 4 Bounding boxes of gts
+        gt_cats (NDArray): NUM_gts Category ids of gts
+        dt_bbs (NDArray): NUM_dts x 4 Bounding boxes of dts
+        dt_cats (NDArray): NUM_dts Category ids of dts
+        iou_thresh (float): Threshold for IoU
+        iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+        spatial_index (bool, optional): Calculate IoU only for overlapping pairs found by overlapping_pairs,
+            instead of the IoU matrix. Types are the same. Defaults to False.
+
+    Returns:
+        Tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]:
+            gt_type, gt_corr, gt_iou, dt_type, dt_corr, dt_iou.
+            Types are type codes, corrs are indices of the corresponding dt or gt (-1 if none),
+            and ious are IoUs with them (nan if none).
+    """
+    if spatial_index:
+        pairs = overlapping_pairs(gt_bbs, dt_bbs, min(iou_thresh, iou_loc))
+        return assign_types_pairs(len(gt_bbs), len(dt_bbs), *pairs, gt_cats, dt_cats, iou_thresh, iou_loc)
+    return assign_types(iou_matrix(gt_bbs, dt_bbs), gt_cats, dt_cats, iou_thresh, iou_loc)
+
+
+def match_per_img_sweep(gt_bbs: NDArray, gt_cats: NDArray, dt_bbs: NDArray, dt_cats: NDArray,
+                        iou_thresh: float, iou_loc: float, iou_threshs: NDArray, spatial_index: bool = False) -> Tuple[tuple, NDArray, NDArray]:
+    """Assign types to all gts and dts in one image for iou_thresh and each of iou_threshs.
+
+    IoUs are calculated once and shared by all thresholds.
+
+    Args:
+        gt_bbs (NDArray): NUM_gts x 4 Bounding boxes of gts
+        gt_cats (NDArray): NUM_gts Category ids of gts
+        dt_bbs (NDArray): NUM_dts x 4 Bounding boxes of dts
+        dt_cats (NDArray): NUM_dts Category ids of dts
+        iou_thresh (float): Threshold for IoU
+        iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+        iou_threshs (NDArray): Thresholds for IoU to sweep
+        spatial_index (bool, optional): Same as match_per_img. Defaults to False.
+
+    Returns:
+        Tuple[tuple, NDArray, NDArray]: The result of match_per_img for iou_thresh, and type codes of gts and dts
+            for iou_threshs, NUM_gts x NUM_threshs and NUM_dts x NUM_threshs.
+    """
+    num_gts, num_dts = len(gt_bbs), len(dt_bbs)
+    pairs = match_pairs(gt_bbs, dt_bbs, min(
+        iou_thresh, iou_loc, *iou_threshs), spatial_index)
+    result = assign_types_pairs(
+        num_gts, num_dts, *pairs, gt_cats, dt_cats, iou_thresh, iou_loc)
+    return (result,) + assign_types_sweep(num_gts, num_dts, pairs, gt_cats, dt_cats, iou_loc, iou_threshs)
+
+
+def match_per_img_scores(gt_bbs: NDArray, gt_cats: NDArray, dt_bbs: NDArray, dt_cats: NDArray,
+                         iou_thresh: float, iou_loc: float, iou_threshs: NDArray = None, spatial_index: bool = False) -> Tuple[tuple, tuple, NDArray]:
+    """Assign types to all gts and dts in one image, and find the dts which decide types of gts at score thresholds.
+
+    Args:
+        gt_bbs (NDArray): NUM_gts x 4 Bounding boxes of gts
+        gt_cats (NDArray): NUM_gts Category ids of gts
+        dt_bbs (NDArray): NUM_dts x 4 Bounding boxes of dts
+        dt_cats (NDArray): NUM_dts Category ids of dts
+        iou_thresh (float): Threshold for IoU
+        iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+        iou_threshs (NDArray, optional): Thresholds for IoU to sweep. Defaults to None.
+        spatial_index (bool, optional): Same as match_per_img. Defaults to False.
+
+    Returns:
+        Tuple[tuple, tuple, NDArray]: The result of match_per_img, type codes of gts and dts for iou_threshs (None if iou_threshs is None),
+            and the result of type_dts_pairs.
+    """
+    num_gts, num_dts = len(gt_bbs), len(dt_bbs)
+    min_iou = min(iou_thresh, iou_loc) if iou_threshs is None else min(
+        iou_thresh, iou_loc, *iou_threshs)
+    pairs = match_pairs(gt_bbs, dt_bbs, min_iou, spatial_index)
+    result = assign_types_pairs(
+        num_gts, num_dts, *pairs, gt_cats, dt_cats, iou_thresh, iou_loc)
+    types_sweep = None
+    if iou_threshs is not None:
+        types_sweep = assign_types_sweep(
+            num_gts, num_dts, pairs, gt_cats, dt_cats, iou_loc, iou_threshs)
+    return result, types_sweep, type_dts_pairs(num_gts, num_dts, *pairs, gt_cats, dt_cats, iou_thresh, iou_loc)
+
+
+def match_pairs(gt_bbs: NDArray, dt_bbs: NDArray, min_iou: float, spatial_index: bool = False) -> Tuple[NDArray, NDArray, NDArray]:
+    """Pairs of gts and dts whose IoU is min_iou or more, sorted by gts and dts.
+
+    Args:
+        gt_bbs (NDArray): NUM_gts x 4 Bounding boxes of gts
+        dt_bbs (NDArray): NUM_dts x 4 Bounding boxes of dts
+        min_iou (float): Minimum IoU of pairs
+        spatial_index (bool, optional): Find pairs by overlapping_pairs instead of the IoU matrix. Defaults to False.
+
+    Returns:
+        Tuple[NDArray, NDArray, NDArray]: Indices of gts, indices of dts and IoUs of pairs
+    """
+    if spatial_index:
+        return overlapping_pairs(gt_bbs, dt_bbs, min_iou)
+    ious = iou_matrix(gt_bbs, dt_bbs)
+    pair_gt, pair_dt = np.nonzero(ious >= min_iou)
+    return pair_gt, pair_dt, ious[pair_gt, pair_dt]
+
+
+def assign_types_sweep(num_gts: int, num_dts: int, pairs: tuple, gt_cats: NDArray, dt_cats: NDArray,
+                       iou_loc: float, iou_threshs: NDArray) -> Tuple[NDArray, NDArray]:
+    """Type codes of gts and dts for each of iou_threshs, NUM_gts x NUM_threshs and NUM_dts x NUM_threshs.
+    """
+    gt_types = np.full((num_gts, len(iou_threshs)), NONE, dtype=np.int8)
+    dt_types = np.full((num_dts, len(iou_threshs)), NONE, dtype=np.int8)
+    for id_thresh, thresh in enumerate(iou_threshs):
+        gt_types[:, id_thresh], _, _, dt_types[:, id_thresh], _, _ = assign_types_pairs(
+            num_gts, num_dts, *pairs, gt_cats, dt_cats, thresh, iou_loc)
+    return gt_types, dt_types
+
+
+def type_dts_pairs(num_gts: int, num_dts: int, pair_gt: NDArray, pair_dt: NDArray, pair_iou: NDArray,
+                   gt_cats: NDArray, dt_cats: NDArray, iou_thresh: float, iou_loc: float) -> NDArray:
+    """Find the dt of the highest score which can make each gt LC, Cls and Loc.
+
+    Dts of lower scores than a dt do not change its type, because gts take dts in score order.
+    So, when dts below a score threshold are removed, a gt is Match if its Match dt remains, LC if a dt of the same category
+    and IoU of iou_thresh or more remains, Cls if a dt of another category and IoU of iou_thresh or more remains,
+    Loc if a dt of the same category and IoU between iou_loc and iou_thresh remains, and Miss otherwise.
+
+    Args:
+        num_gts (int): Number of gts
+        num_dts (int): Number of dts, sorted by score in descending order
+        pair_gt (NDArray): Indices of gts of pairs
+        pair_dt (NDArray): Indices of dts of pairs
+        pair_iou (NDArray): IoUs of pairs
+        gt_cats (NDArray): NUM_gts Category ids of gts
+        dt_cats (NDArray): NUM_dts Category ids of dts
+        iou_thresh (float): Threshold for IoU
+        iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+
+    Returns:
+        NDArray: NUM_gts x 3 Indices of dts for LC, Cls and Loc (-1 if none)
+    """
+    bool_cat = gt_cats[pair_gt] == dt_cats[pair_dt]
+    bool_iou = pair_iou >= iou_thresh
+    bool_loc = (pair_iou >= iou_loc) & np.logical_not(bool_iou)
+
+    # The first dt is the one of the highest score.
+    dts = np.full((num_gts, 3), num_dts, dtype=np.int64)
+    for col, mask in enumerate([bool_cat & bool_iou, np.logical_not(bool_cat) & bool_iou, bool_cat & bool_loc]):
+        np.minimum.at(dts[:, col], pair_gt[mask], pair_dt[mask])
+    dts[dts == num_dts] = -1
+    return dts
+
+
+def assign_types(ious: NDArray, gt_cats: NDArray, dt_cats: NDArray,
+                 iou_thresh: float, iou_loc: float) -> Tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]:
+    """Assign types to all gts and dts in one image from their IoU matrix.
+
+    Dts must be sorted by score in descending order.
+
+    Args:
+        ious (NDArray): IoU(NUM_gts x NUM_dts)
+        gt_cats (NDArray): NUM_gts Category ids of gts
+        dt_cats (NDArray): NUM_dts Category ids of dts
+        iou_thresh (float): Threshold for IoU
+        iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+
+    Returns:
+        Tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]: Same as match_per_img
+    """
+    # Pairs of lower IoUs have no types. np.nonzero sorts pairs by gts and dts.
+    pair_gt, pair_dt = np.nonzero(ious >= min(iou_thresh, iou_loc))
+    return assign_types_pairs(ious.shape[0], ious.shape[1], pair_gt, pair_dt, ious[pair_gt, pair_dt],
+                              gt_cats, dt_cats, iou_thresh, iou_loc)
+
+
+def assign_types_pairs(num_gts: int, num_dts: int, pair_gt: NDArray, pair_dt: NDArray, pair_iou: NDArray,
+                       gt_cats: NDArray, dt_cats: NDArray, iou_thresh: float, iou_loc: float) -> Tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]:
+    """Assign types to all gts and dts in one image from pairs of gts and dts whose IoU is min(iou_thresh, iou_loc) or more.
+
+    Pairs of lower IoUs can be included, and have no effects.
+
+    Args:
+        num_gts (int): Number of gts
+        num_dts (int): Number of dts, sorted by score in descending order
+        pair_gt (NDArray): Indices of gts of pairs, sorted by gts and dts
+        pair_dt (NDArray): Indices of dts of pairs
+        pair_iou (NDArray): IoUs of pairs
+        gt_cats (NDArray): NUM_gts Category ids of gts
+        dt_cats (NDArray): NUM_dts Category ids of dts
+        iou_thresh (float): Threshold for IoU
+        iou_loc (float): Threshold for IoU to define 'Localization(Loc)' error.
+
+    Returns:
+        Tuple[NDArray, NDArray, NDArray, NDArray, NDArray, NDArray]: Same as match_per_img
+    """
+    gt_type = [NONE] * num_gts
+    gt_corr = [-1] * num_gts
+    gt_iou = [np.nan] * num_gts
+    dt_type = [NONE] * num_dts
+    dt_corr = [-1] * num_dts
+    dt_iou = [np.nan] * num_dts
+
+    if num_gts and num_dts:
+
+        # Category match boolean.
+        bool_cat_all = gt_cats[pair_gt] == dt_cats[pair_dt]
+        # Match boolean for all categories.
+        bool_iou_all = pair_iou >= iou_thresh
+        # Loc boolean for all categories.
+        bool_loc_all = np.logical_and(
+            pair_iou >= iou_loc, pair_iou < iou_thresh)
+
+        Match_boolean = np.logical_and(bool_cat_all, bool_iou_all)
+        Loc_boolean = np.logical_and(bool_loc_all, bool_cat_all)
+        Cat_boolean = np.logical_and(
+            bool_iou_all, np.logical_not(Match_boolean))
+
+        # Pairs of each gt are a slice.
+        bounds = np.searchsorted(pair_gt, np.arange(num_gts + 1)).tolist()
+        for id_gt in range(num_gts):
+            pairs = slice(bounds[id_gt], bounds[id_gt + 1])
+            dets = pair_dt[pairs]
+            ious = pair_iou[pairs]
+
+            # Match, DC, FC
+            id_dets_match = dets[Match_boolean[pairs]].tolist()
+            ious_match = ious[Match_boolean[pairs]].tolist()
+            for id_det, iou in zip(id_dets_match, ious_match):
+                # TP if gt is not assinged and dt is not TP-
+                if gt_type[id_gt] != MATCH and dt_type[id_det] != MATCH:
+                    dt_type[id_det], dt_corr[id_det], dt_iou[id_det] = MATCH, id_gt, iou
+                    gt_type[id_gt], gt_corr[id_gt], gt_iou[id_gt] = MATCH, id_det, iou
+                    continue
+                # Double count if gt_assigned is assigned
+                elif gt_type[id_gt] == MATCH and dt_type[id_det] != MATCH:
+                    dt_type[id_det], dt_corr[id_det], dt_iou[id_det] = DC, id_gt, iou
+                # Less count(LC) if all detections are already assigned
+                if id_det == id_dets_match[-1]:
+                    if gt_type[id_gt] != MATCH and dt_type[id_det] == MATCH:
+                        gt_type[id_gt], gt_corr[id_gt], gt_iou[id_gt] = LC, id_dets_match[0], iou
+
+            # Cls
+            for id_det, iou in zip(dets[Cat_boolean[pairs]].tolist(), ious[Cat_boolean[pairs]].tolist()):
+                if TYPE_ORDER[dt_type[id_det]] > TYPE_ORDER[CLS]:
+                    dt_type[id_det], dt_corr[id_det], dt_iou[id_det] = CLS, id_gt, iou
+                if TYPE_ORDER[gt_type[id_gt]] > TYPE_ORDER[CLS]:
+                    gt_type[id_gt], gt_corr[id_gt], gt_iou[id_gt] = CLS, id_det, iou
+
+            # Loc
+            for id_det, iou in zip(dets[Loc_boolean[pairs]].tolist(), ious[Loc_boolean[pairs]].tolist()):
+                if TYPE_ORDER[dt_type[id_det]] > TYPE_ORDER[LOC]:
+                    dt_type[id_det], dt_corr[id_det], dt_iou[id_det] = LOC, id_gt, iou
+                if TYPE_ORDER[gt_type[id_gt]] > TYPE_ORDER[LOC]:
+                    gt_type[id_gt], gt_corr[id_gt], gt_iou[id_gt] = LOC, id_det, iou
+
+            # No match
+            if TYPE_ORDER[gt_type[id_gt]] >= TYPE_ORDER[NONE]:
+                gt_type[id_gt], gt_corr[id_gt], gt_iou[id_gt] = MISS, -1, np.nan
+
+        # Bkg, if detections are not assigned yet
+        for id_det in range(num_dts):
+            if TYPE_ORDER[dt_type[id_det]] > TYPE_ORDER[NONE]:
+                dt_type[id_det], dt_corr[id_det], dt_iou[id_det] = BKG, -1, np.nan
+
+    # Miss if there are gts but no dts exist.
+    elif num_gts:
+        gt_type = [MISS] * num_gts
+    # Bkg, if dts exist but no gts exist.
+    elif num_dts:
+        dt_type = [BKG] * num_dts
+
+    return (np.array(gt_type, dtype=np.int8), np.array(gt_corr, dtype=np.int64), np.array(gt_iou, dtype=np.float64),
+            np.array(dt_type, dtype=np.int8), np.array(dt_corr, dtype=np.int64), np.array(dt_iou, dtype=np.float64))
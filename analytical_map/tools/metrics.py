@@ -0,0 +1,265 @@
+import numpy as np
+from nptyping import NDArray
+from typing import Tuple
+
+from analytical_map.tools.matching import TYPES, MATCH, TP, FP
+
+
+def pr_curve(num_gts: int, is_tps: NDArray, recall_inter: NDArray) -> Tuple[NDArray, NDArray, NDArray]:
+    """Calculate a precision-recall curve with cumulative sums.
+
+    Args:
+        num_gts (int): Number of gts
+        is_tps (NDArray): True if the dt is TP. Dts are sorted by score in descending order.
+        recall_inter (NDArray): Points of recall to calculate average precision
+
+    Returns:
+        Tuple[NDArray, NDArray, NDArray]: precision, recall, precision_inter
+    """
+    num_dts = len(is_tps)
+    y_prec = np.zeros(num_dts)
+    y_recall = np.zeros(num_dts)
+    y_prec_inter = np.zeros(recall_inter.shape)
+
+    if num_gts != 0:
+        count_TP = np.cumsum(is_tps)
+        y_prec = count_TP / np.arange(1, num_dts + 1)
+        y_recall = count_TP / num_gts
+
+        _y_prec = np.concatenate([[1], y_prec, [0]])
+        _y_recall = np.concatenate([[0], y_recall, [1]])
+
+        ids = np.searchsorted(_y_recall, recall_inter, side='left')
+        y_prec_inter = np.maximum.accumulate(_y_prec[ids][::-1])[::-1]
+
+    return y_prec, y_recall, y_prec_inter
+
+
+def ap_per_type(num_gts: int, scores: NDArray, counts: NDArray, types: NDArray, recall_inter: NDArray) -> Tuple[dict, NDArray, NDArray, NDArray, NDArray]:
+    """Calculate AP, and AP when each type is regarded as TP.
+
+    Dts are sorted once, and the curve of each type is a cumulative sum over a boolean type mask.
+
+    Args:
+        num_gts (int): Number of gts
+        scores (NDArray): Scores of dts
+        counts (NDArray): Count codes of dts
+        types (NDArray): Type codes of dts
+        recall_inter (NDArray): Points of recall to calculate average precision
+
+    Returns:
+        Tuple[dict, NDArray, NDArray, NDArray, NDArray]: AP of each type, and score, precision, recall, precision_inter of 'Match'
+    """
+    inds = np.argsort(-scores, kind='mergesort')
+    is_tps = counts[inds] == TP
+    types = types[inds]
+
+    x_score = scores[inds] if num_gts != 0 else np.zeros(len(scores))
+    y_prec, y_recall, y_prec_inter = pr_curve(num_gts, is_tps, recall_inter)
+
+    # AP = 1/N sum(prec_inter)
+    ap = dict.fromkeys(TYPES, np.average(y_prec_inter))
+    for code, t in enumerate(TYPES):
+        # Regard type t as TP to see how much AP is improved without the error.
+        is_type = types == code
+        if code == MATCH or not np.any(is_type):
+            continue
+        _, _, prec_inter = pr_curve(
+            num_gts, is_tps | is_type, recall_inter)
+        ap[t] = np.average(prec_inter)
+
+    return ap, x_score, y_prec, y_recall, y_prec_inter
+
+
+def count_results(category_names: list, type_counts: NDArray, totals: NDArray) -> list:
+    """Build precision or recall results from the counts of types.
+
+    Args:
+        category_names (list): Category names
+        type_counts (NDArray): Counts of each type per category, num_cats x len(TYPES)
+        totals (NDArray): Number of dts (precision) or gts (recall) per category
+
+    Returns:
+        list: [{'category', 'score', 'ratio'}], scores and ratios are 0 for categories without boxes.
+    """
+    results = []
+    for id_cat, name in enumerate(category_names):
+        counts = {'Match': 0, 'Loc': 0, 'DC': 0, 'LC': 0,
+                  'Cls': 0, 'Bkg': 0, 'Miss': 0}
+        total = int(totals[id_cat])
+
+        for code, t in enumerate(TYPES):
+            counts[t] = int(type_counts[id_cat, code])
+
+        score = round(counts['Match'] / total, 3) if total != 0 else 0
+        ratio = {k: round(v / total, 3) if total != 0 else 0
+                 for k, v in counts.items()}
+        results.append({'category': name, 'score': score, 'ratio': ratio})
+    return results
+
+
+def ap_result(category: str, area: str, num_gts: int, scores: NDArray, counts: NDArray, types: NDArray, recall_inter: NDArray) -> dict:
+    """Build an AP result of one category and area range.
+
+    Args:
+        category (str): Category name
+        area (str): Area range name
+        num_gts (int): Number of gts
+        scores (NDArray): Scores of dts
+        counts (NDArray): Count codes of dts
+        types (NDArray): Type codes of dts
+        recall_inter (NDArray): Points of recall to calculate average precision
+
+    Returns:
+        dict: {'category', 'area', 'ap', 'ratio', 'score', 'recall_raw', 'prec_raw', 'recall_inter', 'prec_inter'}
+    """
+    ap, score, prec_raw, recall_raw, prec_inter = ap_per_type(
+        num_gts, scores, counts, types, recall_inter)
+
+    # Anotehr way of calculating mAP.
+    # for i in range(1, len(prec_inter)):
+    #     ap[t] += prec_inter[i]*(recall_inter[i] -
+    #                               recall_inter[i-1])
+
+    return {'category': category, 'area': area, 'ap': round(ap['Match'], 3), 'ratio': ap_ratio(ap),
+            'score': score.tolist(), 'recall_raw': recall_raw.tolist(), 'prec_raw': prec_raw.tolist(),
+            'recall_inter': recall_inter.tolist(), 'prec_inter': prec_inter.tolist()}
+
+
+def ap_ratio(ap: dict) -> dict:
+    """Normalized ratio of the AP and the AP improvement of each type.
+
+    Args:
+        ap (dict): AP of each type
+
+    Returns:
+        dict: Ratio of each type
+    """
+    ap_ratio = {k: round(v - ap['Match'], 3) if k != 'Match' else round(ap['Match'], 3)
+                for k, v in ap.items()}
+    return {k: v/sum(ap_ratio.values()) if v != 0 else 0
+            for k, v in ap_ratio.items()}
+
+
+def ap_sweep_result(category: str, area: str, iou_threshs: NDArray, num_gts: int, scores: NDArray, types_sweep: NDArray, recall_inter: NDArray) -> dict:
+    """Build AP results of one category and area range for each IoU threshold.
+
+    Args:
+        category (str): Category name
+        area (str): Area range name
+        iou_threshs (NDArray): Thresholds for IoU
+        num_gts (int): Number of gts
+        scores (NDArray): Scores of dts
+        types_sweep (NDArray): Type codes of dts for each threshold, NUM_dts x NUM_threshs
+        recall_inter (NDArray): Points of recall to calculate average precision
+
+    Returns:
+        dict: {'category', 'area', 'iou_thresh', 'ap', 'ap_mean', 'ratio'}, 'ap' and 'ratio' are lists over thresholds.
+    """
+    aps = []
+    ratios = []
+    for id_thresh in range(len(iou_threshs)):
+        types = types_sweep[:, id_thresh]
+        # Only Match dts are TP.
+        counts = np.where(types == MATCH, TP, FP)
+        ap, _, _, _, _ = ap_per_type(
+            num_gts, scores, counts, types, recall_inter)
+        aps.append(ap['Match'])
+        ratios.append(ap_ratio(ap))
+
+    return {'category': category, 'area': area, 'iou_thresh': np.asarray(iou_threshs).tolist(),
+            'ap': [round(ap, 3) for ap in aps], 'ap_mean': round(float(np.mean(aps)), 3) if len(aps) else 0, 'ratio': ratios}
+
+
+def best_f1(num_gts: int, scores: NDArray, is_tps: NDArray) -> dict:
+    """Find the score threshold of the best F1 score.
+
+    Only the last dt of dts of the same score is a candidate, since a threshold keeps all or none of them.
+
+    Args:
+        num_gts (int): Number of gts
+        scores (NDArray): Scores of dts sorted in descending order
+        is_tps (NDArray): True if the dt is TP
+
+    Returns:
+        dict: {'score_thresh', 'precision', 'recall', 'f1'}, all 0 if there are no gts or dts.
+    """
+    if num_gts == 0 or len(scores) == 0:
+        return {'score_thresh': 0, 'precision': 0, 'recall': 0, 'f1': 0}
+
+    count_TP = np.cumsum(is_tps)
+    ends = np.append(np.nonzero(scores[1:] != scores[:-1])[0], len(scores) - 1)
+    prec = count_TP[ends] / (ends + 1)
+    recall = count_TP[ends] / num_gts
+    with np.errstate(invalid='ignore'):
+        f1 = np.nan_to_num(2 * prec * recall / (prec + recall))
+
+    best = int(np.argmax(f1))
+    return {'score_thresh': float(scores[ends[best]]), 'precision': round(float(prec[best]), 3),
+            'recall': round(float(recall[best]), 3), 'f1': round(float(f1[best]), 3)}
+
+
+def score_sweep_result(category: str, score_threshs: NDArray, dt_type_counts: NDArray, num_dts: NDArray, gt_type_counts: NDArray, num_gts: int,
+                       scores: NDArray, is_tps: NDArray) -> dict:
+    """Build precision and recall results of one category for each score threshold, and its best F1 point.
+
+    Args:
+        category (str): Category name
+        score_threshs (NDArray): Thresholds for scores
+        dt_type_counts (NDArray): Counts of each type of dts for each threshold, NUM_threshs x len(TYPES)
+        num_dts (NDArray): Number of dts for each threshold
+        gt_type_counts (NDArray): Counts of each type of gts for each threshold, NUM_threshs x len(TYPES)
+        num_gts (int): Number of gts
+        scores (NDArray): Scores of all dts sorted in descending order
+        is_tps (NDArray): True if the dt is TP
+
+    Returns:
+        dict: {'category', 'score_thresh', 'precision', 'recall', 'f1', 'precision_ratio', 'recall_ratio', 'best_f1'},
+            the values except 'best_f1' are lists over thresholds.
+    """
+    num_threshs = len(score_threshs)
+    precisions = count_results([category] * num_threshs, dt_type_counts, num_dts)
+    recalls = count_results([category] * num_threshs, gt_type_counts,
+                            np.full(num_threshs, num_gts))
+
+    # F1 = 2TP / (dts + gts)
+    f1s = [round(2 * int(num_tps) / (int(num) + num_gts), 3) if num + num_gts != 0 else 0
+           for num_tps, num in zip(dt_type_counts[:, MATCH], num_dts)]
+
+    return {'category': category, 'score_thresh': np.asarray(score_threshs).tolist(),
+            'precision': [precision['score'] for precision in precisions], 'recall': [recall['score'] for recall in recalls], 'f1': f1s,
+            'precision_ratio': [precision['ratio'] for precision in precisions], 'recall_ratio': [recall['ratio'] for recall in recalls],
+            'best_f1': best_f1(num_gts, scores, is_tps)}
+
+
+def confusion_result(area: str, category_names: list, codes: NDArray, counts: NDArray) -> dict:
+    """Build a sparse confusion matrix of one area range.
+
+    Rows are categories of gts and 'Bkg', and columns are categories of dts and 'Miss'.
+
+    Args:
+        area (str): Area range name
+        category_names (list): Category names
+        codes (NDArray): Cells of the matrix, row x (len(category_names) + 1) + column
+        counts (NDArray): Counts of the cells
+
+    Returns:
+        dict: {'area', 'rows', 'cols', 'row', 'col', 'count'}, only cells of one or more boxes.
+    """
+    row, col = np.divmod(codes, len(category_names) + 1)
+    return {'area': area, 'rows': category_names + ['Bkg'], 'cols': category_names + ['Miss'],
+            'row': row.tolist(), 'col': col.tolist(), 'count': np.asarray(counts).tolist()}
+
+
+def area_names(area_rng: NDArray, area_all: list) -> list:
+    """Names of area ranges, e.g. 'area_0.0_1024.0', and 'area_all' for area_all.
+
+    Args:
+        area_rng (NDArray): Area ranges
+        area_all (list): Range of all areas
+
+    Returns:
+        list: Names
+    """
+    return ['area_' + str(area[0]) + '_' + str(area[1]) if not np.all(area == area_all)
+            else 'area_all' for area in area_rng]
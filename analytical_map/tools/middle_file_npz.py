@@ -0,0 +1,212 @@
+import os
+import shutil
+import struct
+import zipfile
+import numpy as np
+from pycocotools.coco import COCO
+from typing import Tuple
+
+from analytical_map.params import COCOParams
+from analytical_map.tools.ann_store import AnnStore
+from analytical_map.tools.dump_json import images, categories, param2dict
+from analytical_map.tools import json_backend
+
+# Columns of AnnStore saved in the middle file. Gts do not have scores, and 'type_sweep' and 'type_scores' are saved only if they exist.
+COLUMNS = ['id', 'image_id', 'category_id', 'bbox', 'area',
+           'score', 'count', 'type', 'corr_id', 'iou', 'type_sweep', 'type_scores']
+# Keys of annotations which are saved as columns, the others are saved as JSON.
+COLUMN_KEYS = ['id', 'image_id', 'category_id', 'bbox', 'area', 'score']
+
+
+def dump_middle_file_npz(cocoGt: COCO, cocoDt: COCO, storeGt: AnnStore, storeDt: AnnStore, params: COCOParams, result_dir: str, middle_file: str = 'middle_file.npz'):
+    """Dump a middle file as uncompressed npz.
+
+    Boxes and evaluations are saved as columns which can be memory-mapped.
+    Images, categories and params are saved in a JSON header, and the other keys of annotations
+    (e.g. segmentation) are saved as JSON which is read only by load_annotations_npz.
+
+    Args:
+        cocoGt (COCO): COCO ground truth
+        cocoDt (COCO): COCO detections
+        storeGt (AnnStore): Evaluations of ground truth
+        storeDt (AnnStore): Evaluations of detections
+        params (COCOParams): COCO params
+        result_dir (str): Result directory path
+        middle_file (str): Middle file name.  Defaults to 'middle_file.npz'.
+    """
+    os.makedirs(result_dir, exist_ok=True)
+
+    header = {"licenses": "", "info": "", "categories": categories(cocoGt), "images": images(cocoGt),
+              "params": param2dict(params), "segment_info": ""}
+    arrays = {'header': to_bytes(header)}
+    for prefix, coco, store in [('gt', cocoGt, storeGt), ('dt', cocoDt, storeDt)]:
+        for column in COLUMNS:
+            if getattr(store, column) is not None:
+                arrays[prefix + '_' + column] = getattr(store, column)
+        anns = coco.loadAnns(coco.getAnnIds())
+        arrays[prefix + '_extra'] = to_bytes([{k: v for k, v in ann.items() if k not in COLUMN_KEYS}
+                                              for ann in anns])
+
+    # np.savez does not compress arrays, so that they can be memory-mapped.
+    np.savez(os.path.join(result_dir, middle_file), **arrays)
+
+
+class NpzColumnWriter():
+    def __init__(self, npz_file: str) -> None:
+        """Write columns of an uncompressed npz file by chunks, without holding the columns in memory.
+
+        Chunks of each column are appended to a temporary file, and close() writes the npz file from them,
+        which load_npz_mmap can memory-map.
+
+        Args:
+            npz_file (str): npz file path
+        """
+        self.npz_file = npz_file
+        self.columns = {}
+
+    def append(self, name: str, array: np.ndarray) -> None:
+        """Append a chunk of a column. Chunks of a column must have the same dtype and the same shape except the first axis.
+
+        Args:
+            name (str): Column name
+            array (np.ndarray): Chunk
+        """
+        array = np.ascontiguousarray(array)
+        if name not in self.columns:
+            self.columns[name] = {'file': self.npz_file + '.' + name + '.tmp', 'dtype': array.dtype,
+                                  'shape': array.shape[1:], 'length': 0}
+            open(self.columns[name]['file'], 'wb').close()
+        column = self.columns[name]
+        assert array.dtype == column['dtype'] and array.shape[1:] == column['shape'], \
+            'Chunks of ' + name + ' have different dtypes or shapes'
+        with open(column['file'], 'ab') as fw:
+            fw.write(array.tobytes())
+        column['length'] += len(array)
+
+    def close(self, arrays: dict = None) -> None:
+        """Write the npz file of the appended columns and arrays, and remove the temporary files.
+
+        Args:
+            arrays (dict, optional): Other arrays, e.g. a header. Defaults to None.
+        """
+        with zipfile.ZipFile(self.npz_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name, column in self.columns.items():
+                header = {'descr': np.lib.format.dtype_to_descr(column['dtype']), 'fortran_order': False,
+                          'shape': (column['length'],) + column['shape']}
+                with zf.open(name + '.npy', 'w', force_zip64=True) as fw, open(column['file'], 'rb') as fr:
+                    np.lib.format.write_array_header_2_0(fw, header)
+                    shutil.copyfileobj(fr, fw)
+                os.remove(column['file'])
+            for name, array in (arrays or {}).items():
+                with zf.open(name + '.npy', 'w', force_zip64=True) as fw:
+                    np.lib.format.write_array(fw, np.asarray(array))
+        self.columns = {}
+
+
+def to_bytes(obj) -> np.ndarray:
+    return np.frombuffer(json_backend.dumps(obj).encode(), dtype=np.uint8)
+
+
+def from_bytes(array: np.ndarray):
+    return json_backend.loads(array.tobytes())
+
+
+def load_npz_mmap(npz_file: str) -> dict:
+    """Memory-map the arrays of an uncompressed npz file.
+
+    Each member of the zip file is an npy file, so its array starts after the local file header of the zip
+    and the npy header.
+
+    Args:
+        npz_file (str): npz file path
+
+    Returns:
+        dict: {name: np.memmap}
+    """
+    arrays = {}
+    with zipfile.ZipFile(npz_file) as zf, open(npz_file, 'rb') as fr:
+        for info in zf.infolist():
+            assert info.compress_type == zipfile.ZIP_STORED, \
+                'Compressed npz can not be memory-mapped'
+            # The local file header is 30 bytes, and is followed by the file name and the extra field.
+            fr.seek(info.header_offset)
+            local_header = fr.read(30)
+            name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+            fr.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(fr)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(
+                    fr)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(
+                    fr)
+            name = info.filename[:-len('.npy')]
+            if np.prod(shape) == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(npz_file, dtype=dtype, mode='r', offset=fr.tell(), shape=shape,
+                                     order='F' if fortran_order else 'C')
+    return arrays
+
+
+def load_middle_file_npz(middle_file: str) -> Tuple[COCO, COCO, AnnStore, AnnStore]:
+    """Load a middle file dumped by dump_middle_file_npz.
+
+    Columns are memory-mapped and read lazily. cocoGt and cocoDt have images and categories,
+    and boxes and evaluations are in the stores.
+
+    Args:
+        middle_file (str): Path of the middle file
+
+    Returns:
+        Tuple[COCO, COCO, AnnStore, AnnStore]: cocoGt, cocoDt, storeGt, storeDt
+    """
+    arrays = load_npz_mmap(middle_file)
+    header = from_bytes(arrays['header'])
+
+    cocos = []
+    for _ in range(2):
+        coco = COCO()
+        coco.dataset = {k: header[k] for k in [
+            'info', 'licenses', 'categories', 'images', 'params']}
+        coco.dataset['annotations'] = []
+        coco.createIndex()
+        cocos.append(coco)
+
+    storeGt, storeDt = stores_from_arrays(arrays)
+    return cocos[0], cocos[1], storeGt, storeDt
+
+
+def stores_from_arrays(arrays: dict) -> Tuple[AnnStore, AnnStore]:
+    # Columns which are not saved, e.g. boxes of a middle file of COCOChunkEvaluator, are None.
+    return tuple(AnnStore(**{column: arrays.get(prefix + '_' + column) for column in COLUMNS})
+                 for prefix in ['gt', 'dt'])
+
+
+def load_annotations_npz(middle_file: str) -> Tuple[list, list]:
+    """Load annotations and detections of a middle file as dicts, which are the same as the ones of the JSON middle file.
+
+    Args:
+        middle_file (str): Path of the middle file
+
+    Returns:
+        Tuple[list, list]: Annotations and detections
+    """
+    arrays = load_npz_mmap(middle_file)
+    storeGt, storeDt = stores_from_arrays(arrays)
+
+    results = []
+    for prefix, store in [('gt', storeGt), ('dt', storeDt)]:
+        anns = []
+        for row, extra in enumerate(from_bytes(arrays[prefix + '_extra'])):
+            ann = {'id': int(store.id[row]), 'image_id': int(store.image_id[row]),
+                   'category_id': int(store.category_id[row]), 'bbox': store.bbox[row].tolist(),
+                   'area': float(store.area[row])}
+            if not np.isnan(store.score[row]):
+                ann['score'] = float(store.score[row])
+            ann.update(extra)
+            ann['eval'] = store.eval_dict(row)
+            anns.append(ann)
+        results.append(anns)
+    return results[0], results[1]
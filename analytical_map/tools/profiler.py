@@ -0,0 +1,219 @@
+import json
+import os
+import time
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb(who: str = 'self') -> float:
+    """Peak resident set size of this process, or of its terminated child processes, over their whole lifetimes.
+
+    The peak never decreases, so it is the largest peak of all former stages, not the peak of the current stage.
+
+    Args:
+        who (str, optional): 'self' or 'children'. Defaults to 'self'.
+
+    Returns:
+        float: Peak RSS in MB, None if it is not available.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(
+        resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux.
+    return round(usage.ru_maxrss / 1024, 1)
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process now.
+
+    Returns:
+        float: RSS in MB, None if it is not available, e.g. not on Linux.
+    """
+    try:
+        with open('/proc/self/statm') as fr:
+            pages = int(fr.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def children_cpu_time() -> float:
+    """CPU time of terminated child processes, e.g. workers of a process pool.
+    """
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Profiler():
+    def __init__(self, interval: float = 0.01) -> None:
+        """Record wall time, CPU time, peak RSS and item counts of stages.
+
+        Stages can be nested, and a nested stage is named with the path of its parents, e.g. 'evaluate/eval_per_img'.
+        The peak RSS of a stage is measured in the stage: RSS is sampled by a thread while stages are open,
+        and if the stage raised the peak of the process, the peak of the process is exact.
+
+        Args:
+            interval (float, optional): Seconds between samples of RSS. Defaults to 0.01.
+        """
+        self.stages = []
+        self.stack = []
+        self.interval = interval
+        self.sampler = None
+        self.stop = threading.Event()
+
+    def sample(self) -> None:
+        # Runs in the sampler thread, and raises the peaks of all open stages.
+        while not self.stop.wait(self.interval):
+            rss = current_rss_mb()
+            if rss is None:
+                return
+            for frame in list(self.stack):
+                frame['peak'] = max(frame['peak'], rss)
+
+    def start_sampler(self) -> None:
+        self.stop.clear()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+
+    def stop_sampler(self) -> None:
+        self.stop.set()
+        self.sampler.join()
+        self.sampler = None
+
+    @contextmanager
+    def stage(self, name: str, **counts):
+        """Record a stage.
+
+        Args:
+            name (str): Stage name
+            counts: Item counts of the stage, e.g. images=10. They can be added by count() in the stage.
+        """
+        record = {'name': '/'.join([s['name'] for s in self.stack] + [name]),
+                  'counts': dict(counts)}
+        # Records are ordered by their starts, and filled at their ends.
+        self.stages.append(record)
+        rss = current_rss_mb()
+        process_peak = peak_rss_mb('self')
+        self.stack.append({'name': name, 'record': record, 'peak': rss})
+        if len(self.stack) == 1 and rss is not None:
+            self.start_sampler()
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        cpu_children = children_cpu_time()
+        try:
+            yield record
+        finally:
+            frame = self.stack.pop()
+            if len(self.stack) == 0 and self.sampler is not None:
+                self.stop_sampler()
+            record['wall_time'] = round(time.perf_counter() - wall, 4)
+            record['cpu_time'] = round(time.process_time() - cpu, 4)
+            record['cpu_time_children'] = round(
+                children_cpu_time() - cpu_children, 4)
+            record['rss_start_mb'] = round(rss, 1) if rss is not None else None
+            record['peak_rss_mb'] = stage_peak_rss_mb(
+                frame['peak'], current_rss_mb(), process_peak, peak_rss_mb('self'))
+            # Peaks over the lifetimes of the process and of its terminated workers, which are not per stage.
+            record['process_peak_rss_mb'] = peak_rss_mb('self')
+            record['process_peak_rss_children_mb'] = peak_rss_mb('children')
+
+    def count(self, **counts) -> None:
+        """Add item counts to the current stage.
+        """
+        if len(self.stack) > 0:
+            self.stack[-1]['record']['counts'].update(
+                {k: int(v) for k, v in counts.items()})
+
+    def report(self) -> dict:
+        return {'stages': self.stages}
+
+    def dump(self, result_dir: str, profile_file: str = 'profile.json') -> None:
+        """Dump the report as JSON.
+
+        Args:
+            result_dir (str): Result directory path
+            profile_file (str, optional): Profile file name. Defaults to 'profile.json'.
+        """
+        os.makedirs(result_dir, exist_ok=True)
+        with open(os.path.join(result_dir, profile_file), 'w') as fw:
+            json.dump(self.report(), fw, indent=2)
+
+
+def stage_peak_rss_mb(sampled: float, end: float, process_peak_start: float, process_peak_end: float) -> float:
+    """Peak RSS of a stage.
+
+    Args:
+        sampled (float): Largest sampled RSS in the stage, including its start
+        end (float): RSS at the end of the stage
+        process_peak_start (float): Peak RSS of the process at the start of the stage
+        process_peak_end (float): Peak RSS of the process at the end of the stage
+
+    Returns:
+        float: Peak RSS in MB, None if RSS is not available
+    """
+    peaks = [rss for rss in [sampled, end] if rss is not None]
+    # The stage raised the peak of the process, so the peak of the process is its peak.
+    if process_peak_start is not None and process_peak_end > process_peak_start:
+        peaks.append(process_peak_end)
+    if len(peaks) == 0:
+        return None
+    return round(max(peaks), 1)
+
+
+def profile_stage(owner, name: str, **counts):
+    """Stage of the profiler of owner, or nothing if owner is not profiled.
+
+    Args:
+        owner: Object which can have a profiler as 'profiler'
+        name (str): Stage name
+    """
+    profiler = getattr(owner, 'profiler', None)
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name, **counts)
+
+
+def profile_count(owner, **counts) -> None:
+    """Add item counts to the current stage of the profiler of owner, if owner is profiled.
+    """
+    profiler = getattr(owner, 'profiler', None)
+    if profiler is not None:
+        profiler.count(**counts)
+
+
+def profiled(method):
+    """Record a method as a stage named after the method, if its object is profiled.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with profile_stage(self, method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def num_iou_pairs(gt_image_ids: np.ndarray, dt_image_ids: np.ndarray) -> int:
+    """Number of pairs of gts and dts in the same images, i.e. the number of IoUs calculated.
+
+    Args:
+        gt_image_ids (np.ndarray): Image ids of gts
+        dt_image_ids (np.ndarray): Image ids of dts
+
+    Returns:
+        int: Sum of num_gts x num_dts of images
+    """
+    img_ids, num_gts = np.unique(gt_image_ids, return_counts=True)
+    dt_img_ids, num_dts = np.unique(dt_image_ids, return_counts=True)
+    _, ids_gt, ids_dt = np.intersect1d(
+        img_ids, dt_img_ids, assume_unique=True, return_indices=True)
+    return int(np.sum(num_gts[ids_gt].astype(np.int64) * num_dts[ids_dt]))
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+from analytical_map.params import COCOParams
+from analytical_map.tools.ann_store import AnnStore
+from analytical_map.tools.dump_json import param2dict
+from analytical_map.tools.load_json import is_sharded, expand_paths
+from analytical_map.tools import json_backend
+
+# Columns of AnnStore which are results of the evaluation.
+EVAL_COLUMNS = ['count', 'type', 'corr_id', 'iou', 'type_sweep', 'type_scores']
+# Params which change the evaluation. The others change only the calculation.
+EVAL_PARAMS = ['iou_thresh', 'score_thresh', 'iou_loc', 'iou_threshs']
+
+
+def eval_params(params: COCOParams) -> dict:
+    """Params which change the evaluation.
+
+    score_threshs changes only whether the evaluation has 'type_scores', and not their values.
+    """
+    params_dict = param2dict(params)
+    eval_dict = {k: params_dict[k] for k in EVAL_PARAMS}
+    eval_dict['type_scores'] = params.score_threshs is not None
+    return eval_dict
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fr:
+        for chunk in iter(lambda: fr.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def dict_hash(obj: dict) -> str:
+    # Encoded by the standard library, so that keys do not depend on the JSON backend.
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+
+
+def input_hash(path: str) -> str:
+    # Shards are hashed with their names, since the order of shards decides ids of detections.
+    if not is_sharded(path):
+        return file_hash(path)
+    return dict_hash({'shards': [[os.path.basename(f), file_hash(f)] for f in expand_paths(path)]})
+
+
+class ResultCache():
+    def __init__(self, cache_dir: str, cocoGt_file: str, cocoDt_file: str, params: COCOParams, max_mb: float = 1024) -> None:
+        """Cache of evaluations and final results keyed by hashes of the ground truth, the detections and the params.
+
+        Each entry is a directory of an evaluation and final results of its calculations, and the least recently used entries
+        are evicted when the cache is larger than max_mb.
+
+        Args:
+            cache_dir (str): Cache directory
+            cocoGt_file (str): COCO ground truth path, a directory of shards or a glob pattern
+            cocoDt_file (str): COCO detection file path, a directory of shards or a glob pattern
+            params (COCOParams): Parameters for evaluations and calculations
+            max_mb (float, optional): Maximum size of the cache directory in MB. Defaults to 1024.
+        """
+        self.cache_dir = cache_dir
+        self.max_mb = max_mb
+
+        self.eval_key = dict_hash({'gt': input_hash(cocoGt_file), 'dt': input_hash(cocoDt_file),
+                                   'params': eval_params(params)})
+        self.results_key = dict_hash(param2dict(params))
+        self.entry_dir = os.path.join(cache_dir, self.eval_key)
+
+    def load_evaluation(self, storeGt: AnnStore, storeDt: AnnStore) -> bool:
+        """Copy a cached evaluation into the stores.
+
+        Args:
+            storeGt (AnnStore): Ground truth store
+            storeDt (AnnStore): Detection store
+
+        Returns:
+            bool: True if the evaluation is cached.
+        """
+        path = os.path.join(self.entry_dir, 'evaluation.npz')
+        if not os.path.isfile(path):
+            return False
+        with np.load(path) as arrays:
+            # Annotations must be the same ones in the same order.
+            if not (np.array_equal(arrays['gt_id'], storeGt.id) and np.array_equal(arrays['dt_id'], storeDt.id)):
+                return False
+            for prefix, store in [('gt', storeGt), ('dt', storeDt)]:
+                for column in EVAL_COLUMNS:
+                    if prefix + '_' + column in arrays:
+                        setattr(store, column, arrays[prefix + '_' + column])
+        self.touch()
+        return True
+
+    def save_evaluation(self, storeGt: AnnStore, storeDt: AnnStore) -> None:
+        """Cache an evaluation.
+
+        Args:
+            storeGt (AnnStore): Ground truth store
+            storeDt (AnnStore): Detection store
+        """
+        arrays = {'gt_id': storeGt.id, 'dt_id': storeDt.id}
+        for prefix, store in [('gt', storeGt), ('dt', storeDt)]:
+            for column in EVAL_COLUMNS:
+                if getattr(store, column) is not None:
+                    arrays[prefix + '_' + column] = getattr(store, column)
+        os.makedirs(self.entry_dir, exist_ok=True)
+        # Written to a temporary file first, so that a broken file is never read.
+        tmp = os.path.join(self.entry_dir, 'evaluation.tmp.npz')
+        np.savez(tmp, **arrays)
+        os.replace(tmp, os.path.join(self.entry_dir, 'evaluation.npz'))
+        self.evict()
+
+    def load_results(self) -> dict:
+        """Cached final results.
+
+        Returns:
+            dict: Results, None if they are not cached.
+        """
+        path = os.path.join(self.entry_dir, 'results_' +
+                            self.results_key + '.json')
+        if not os.path.isfile(path):
+            return None
+        with open(path) as fr:
+            results = json_backend.load(fr)
+        self.touch()
+        return results
+
+    def save_results(self, results: dict) -> None:
+        """Cache final results.
+
+        Args:
+            results (dict): Results
+        """
+        os.makedirs(self.entry_dir, exist_ok=True)
+        path = os.path.join(self.entry_dir, 'results_' +
+                            self.results_key + '.json')
+        with open(path + '.tmp', 'w') as fw:
+            fw.write(json_backend.dumps(results))
+        os.replace(path + '.tmp', path)
+        self.evict()
+
+    def touch(self) -> None:
+        # The modification time of an entry is its last use.
+        os.utime(self.entry_dir)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache is not larger than max_mb. The current entry is kept.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(entry_dir):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, f))
+                       for f in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(entry_dir), entry_dir, size))
+
+        total = sum(size for _, _, size in entries)
+        for _, entry_dir, size in sorted(entries):
+            if total <= self.max_mb * (1 << 20):
+                break
+            if entry_dir == self.entry_dir:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
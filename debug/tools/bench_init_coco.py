@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pycocotools.coco import COCO
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', '..'))
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(
+        description='Compare peak memory of loading detections with loadRes twice and with load_detections')
+
+    parser.add_argument('gt', help='ground truth')
+    parser.add_argument('dt', help='dt')
+    parser.add_argument('--score_thresh', type=float, default=0.0001)
+    parser.add_argument('--mode', choices=['loadres', 'stream'],
+                        help='run one mode in this process')
+    args = parser.parse_args()
+
+    return args
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def load(gt_path, dt_path, score_thresh, mode):
+    cocoGt = COCO(gt_path)
+    gt_rss = peak_rss_mb()
+    if mode == 'loadres':
+        # The former COCOEvaluator.init_coco
+        _cocoDt = cocoGt.loadRes(dt_path)
+        dts_tmp = [dt for dt in _cocoDt.dataset['annotations']
+                   if dt['score'] >= score_thresh]
+        cocoDt = cocoGt.loadRes(dts_tmp)
+    else:
+        from analytical_map.tools.load_json import load_detections
+        cocoDt = load_detections(cocoGt, dt_path, score_thresh)
+    return len(cocoDt.dataset['annotations']), gt_rss
+
+
+if __name__ == '__main__':
+    args = get_arguments()
+    if args.mode is not None:
+        tic = time.time()
+        num_dts, gt_rss = load(
+            args.gt, args.dt, args.score_thresh, args.mode)
+        print(json.dumps({'mode': args.mode, 'num_dts': num_dts, 'time': round(time.time() - tic, 2),
+                          'peak_rss_mb': peak_rss_mb(), 'peak_rss_for_dts_mb': round(peak_rss_mb() - gt_rss, 1)}))
+    else:
+        # Each mode runs in its own process so that peak RSS is not shared.
+        for mode in ['loadres', 'stream']:
+            out = subprocess.run([sys.executable, __file__, args.gt, args.dt, '--score_thresh', str(args.score_thresh), '--mode', mode],
+                                 capture_output=True, text=True, check=True).stdout
+            print(out.strip().splitlines()[-1])
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+from pycocotools.coco import COCO
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', '..'))
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(
+        description='Compare load time and peak memory of reading a middle file with two parses and with one parse')
+
+    parser.add_argument('middle_file', help='middle file')
+    parser.add_argument('--make', type=int, default=0,
+                        help='write a synthetic middle file with this number of annotations (gts + dts) first')
+    parser.add_argument('--mode', choices=['twice', 'single'],
+                        help='run one mode in this process')
+    args = parser.parse_args()
+
+    return args
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def make_middle_file(middle_file, num_anns, num_imgs=10000, num_cats=10, seed=0):
+    rng = np.random.default_rng(seed)
+    num_gts = num_anns // 2
+    num_dts = num_anns - num_gts
+
+    def anns(num, is_dt):
+        img_ids = rng.integers(1, num_imgs + 1, num)
+        cat_ids = rng.integers(1, num_cats + 1, num)
+        bbs = np.round(rng.uniform(0, 200, (num, 4)), 2)
+        for i in range(num):
+            ann = {'id': i + 1, 'image_id': int(img_ids[i]), 'category_id': int(cat_ids[i]),
+                   'bbox': bbs[i].tolist(), 'area': float(bbs[i, 2] * bbs[i, 3]), 'iscrowd': 0,
+                   'eval': {'count': 'TP', 'type': 'Match', 'corr_id': i + 1, 'iou': 0.8}}
+            if is_dt:
+                ann['score'] = float(rng.random())
+            yield ann
+
+    js = {'licenses': '', 'info': '',
+          'categories': [{'id': i, 'name': 'cat' + str(i)} for i in range(1, num_cats + 1)],
+          'images': [{'id': i, 'file_name': str(i) + '.jpg', 'width': 640, 'height': 480} for i in range(1, num_imgs + 1)],
+          'annotations': list(anns(num_gts, False)), 'detections': list(anns(num_dts, True)), 'params': {}, 'segment_info': ''}
+    with open(middle_file, 'w') as fw:
+        json.dump(js, fw)
+
+
+def load(middle_file, mode):
+    from analytical_map.tools.ann_store import AnnStore
+    from analytical_map.tools.load_json import load_middle_file_json
+    if mode == 'twice':
+        # The former COCOCalculator.read_middle_file
+        cocoGt = COCO(middle_file)
+        _cocoDt = json.load(open(middle_file))['detections']
+        cocoDt = cocoGt.loadRes(_cocoDt)
+        assert all(['eval' in ann for ann in cocoGt.loadAnns(cocoGt.getAnnIds())]) and \
+            all(['eval' in ann for ann in cocoDt.loadAnns(cocoDt.getAnnIds())])
+        storeGt = AnnStore.from_anns(cocoGt.dataset['annotations'])
+        storeDt = AnnStore.from_anns(cocoDt.dataset['annotations'])
+    else:
+        cocoGt, cocoDt, storeGt, storeDt = load_middle_file_json(middle_file)
+    return len(storeGt) + len(storeDt)
+
+
+if __name__ == '__main__':
+    args = get_arguments()
+    if args.mode is not None:
+        tic = time.time()
+        num_anns = load(args.middle_file, args.mode)
+        print(json.dumps({'mode': args.mode, 'num_anns': num_anns, 'time': round(time.time() - tic, 2),
+                          'peak_rss_mb': peak_rss_mb()}))
+    else:
+        if args.make > 0:
+            make_middle_file(args.middle_file, args.make)
+        # Each mode runs in its own process so that peak RSS is not shared.
+        for mode in ['twice', 'single']:
+            out = subprocess.run([sys.executable, __file__, args.middle_file, '--mode', mode],
+                                 capture_output=True, text=True, check=True).stdout
+            print(out.strip().splitlines()[-1])